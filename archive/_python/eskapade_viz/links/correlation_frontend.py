@@ -31,6 +31,7 @@ import plotly.figure_factory as ff
 import pandas as pd
 import numpy as np
 
+from .residuals_cache import ResidualsCache
 
 
 class CorrelationFrontend(Link):
@@ -46,6 +47,11 @@ class CorrelationFrontend(Link):
     Currently only equally spaced bins are supported, but the dashboard
     can be used to see the results for different numbers of bins.
 
+    In incremental mode (the default) the residuals of every pair are cached
+    per binning. When the binning of a column changes, only the cached pairs
+    involving that column are dropped, and the hypothesis tester is executed
+    for the displayed pair only if it is not in the cache yet.
+
     """
 
     def __init__(self, **kwargs):
@@ -61,6 +67,8 @@ class CorrelationFrontend(Link):
         :param str residuals_key: key of residulas map (see
             UncorrelationHypothesisTester.sk_residuals_map)
         :param list[str] columns: only include these columns from the data
+        :param bool incremental: only re-execute the hypothesis tester for
+            pairs that are not cached for the current binning (default True)
 
         """
         # initialize Link, pass name from kwargs
@@ -76,6 +84,7 @@ class CorrelationFrontend(Link):
             hypotest_link="UncorrelationHypothesisTester",
             residuals_key="residuals",
             columns=[],
+            incremental=True,
         )
 
         # check residual kwargs; exit if any present
@@ -89,6 +98,7 @@ class CorrelationFrontend(Link):
         :returns: status code of initialization
         :rtype: StatusCode
         """
+        self._residuals_cache = ResidualsCache()
 
         return StatusCode.Success
 
@@ -145,6 +155,10 @@ class CorrelationFrontend(Link):
         except KeyError:
             residuals_df = ds[self.residuals_key][f'{first_y}:{first_x}']  # OR maybe y,x
 
+        if self.incremental:
+            self._residuals_cache.put(first_x, first_y, hypotest.var_number_of_bins.get(first_x),
+                                      hypotest.var_number_of_bins.get(first_y), residuals_df)
+
         first_heatmapT, first_edges_x, first_edges_y = extract_matrix(
             residuals_df, first_x, first_y, "normResid",
         )
@@ -258,24 +272,34 @@ class CorrelationFrontend(Link):
             state=[State(Ids.x_col, "value"), State(Ids.y_col, "value")],
         )
         def heatmap_edges_callback(edges_x, edges_y, x_col, y_col):
-            hypotest.var_number_of_bins[x_col] = len(edges_x)
-            hypotest.var_number_of_bins[y_col] = len(edges_y)
-
-            hypotest.columns = [x_col, y_col]
-            hypotest.combinations = [[x_col, y_col]]
-
-            # TODO: Also choose bins
-            # TODO: Improve this error catching
-
-            try:
-                hypotest.execute()
-            except:
-                return
-
-            try:
-                residuals_df = ds[self.residuals_key][f'{x_col}:{y_col}']  # OR maybe y,x
-            except KeyError:
-                residuals_df = ds[self.residuals_key][f'{y_col}:{x_col}']  # OR maybe y,x
+            n_x, n_y = len(edges_x), len(edges_y)
+            hypotest.var_number_of_bins[x_col] = n_x
+            hypotest.var_number_of_bins[y_col] = n_y
+
+            residuals_df = None
+            if self.incremental:
+                # only pairs with a binning that was not computed before are computed
+                residuals_df = self._residuals_cache.get(x_col, y_col, n_x, n_y)
+
+            if residuals_df is None:
+                hypotest.columns = [x_col, y_col]
+                hypotest.combinations = [[x_col, y_col]]
+
+                # TODO: Also choose bins
+
+                try:
+                    hypotest.execute()
+                except Exception as err:
+                    self.logger.error('Hypothesis tester failed for {x}:{y}: {err}', x=x_col, y=y_col, err=err)
+                    return dash.no_update
+
+                try:
+                    residuals_df = ds[self.residuals_key][f'{x_col}:{y_col}']  # OR maybe y,x
+                except KeyError:
+                    residuals_df = ds[self.residuals_key][f'{y_col}:{x_col}']  # OR maybe y,x
+
+                if self.incremental:
+                    self._residuals_cache.put(x_col, y_col, n_x, n_y, residuals_df)
 
             zT, x, y = extract_matrix(
                 residuals_df, x_col, y_col, "normResid",
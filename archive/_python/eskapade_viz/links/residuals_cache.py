@@ -0,0 +1,62 @@
+"""Project: Eskapade - A _python-based package for data analysis.
+
+Class: ResidualsCache
+
+Description:
+    Residuals of the UncorrelationHypothesisTester per pair and binning
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+from collections import OrderedDict
+
+
+class ResidualsCache:
+
+    """Residuals of pairs of columns, keyed by the pair and the number of bins of both columns.
+
+    The number of bins is part of the key, so re-binning a column never returns residuals
+    of another binning, and going back to an earlier binning finds its residuals again.
+    The least recently used residuals are dropped when there are more than max_entries.
+
+    """
+
+    def __init__(self, max_entries=64):
+        """Initialize an empty cache.
+
+        :param int max_entries: number of residuals to keep
+        """
+        self.max_entries = max_entries
+        # residuals per pair, keyed by (x_col, y_col, n_x, n_y)
+        self._residuals = OrderedDict()
+
+    def __len__(self):
+        return len(self._residuals)
+
+    def put(self, x_col, y_col, n_x, n_y, residuals_df):
+        """Store the residuals of one pair.
+
+        :param str x_col: name of the first column
+        :param str y_col: name of the second column
+        :param int n_x: number of bins of the first column the residuals were computed with
+        :param int n_y: number of bins of the second column the residuals were computed with
+        :param residuals_df: the residuals
+        """
+        key = (x_col, y_col, n_x, n_y)
+        self._residuals[key] = residuals_df
+        self._residuals.move_to_end(key)
+        if len(self._residuals) > self.max_entries:
+            self._residuals.popitem(last=False)
+
+    def get(self, x_col, y_col, n_x, n_y):
+        """Return the residuals of a pair, stored in either order, or None."""
+        for key in ((x_col, y_col, n_x, n_y), (y_col, x_col, n_y, n_x)):
+            if key in self._residuals:
+                self._residuals.move_to_end(key)
+                return self._residuals[key]
+        return None
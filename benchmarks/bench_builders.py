@@ -0,0 +1,255 @@
+"""
+Benchmarks of the dash_utils figure builders on synthetic data.
+
+Every builder runs over synthetic frames of 10k up to 10M rows, with hue columns of
+different cardinalities. Per case the best time of a few calls, the peak memory allocated by
+Python (tracemalloc) and the size of the JSON payload sent to the browser are
+recorded. The roundtrip cases also serialise the figure and parse it again, as the
+browser does, once with JSON lists and once with typed arrays (see du.encode_figure).
+
+Run from the root of the repository:
+
+    python benchmarks/bench_builders.py                          # compare with the baseline
+    python benchmarks/bench_builders.py --sizes 10000 100000     # only the small frames
+    python benchmarks/bench_builders.py --save benchmarks/baseline.json
+
+The run fails (exit code 1) if a case is slower, uses more memory or sends a larger
+payload than the baseline allows, see --time-tolerance and --size-tolerance.
+Times depend on the machine: store a baseline per machine for a strict comparison.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dash_utils as du  # noqa: E402
+from dash_utils.encoding import decode_array  # noqa: E402
+from dash_utils.instrumentation import json_size  # noqa: E402
+
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+HUE_CARDINALITIES = (3, 30)
+HEATMAP_BINS = (10, 100)
+# make_table puts every row in the layout, larger frames are not realistic
+MAX_TABLE_ROWS = 100_000
+# encodings of the roundtrip cases: float32 argument of du.encode_figure, None for JSON lists
+ENCODINGS = {'json': None, 'binary': False, 'float32': True}
+# JSON lists of tens of millions of numbers take minutes
+MAX_ROUNDTRIP_ROWS = 1_000_000
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def synthetic_frame(n_rows, seed=42):
+    """
+    Frame with two float columns and a hue column per cardinality in HUE_CARDINALITIES.
+
+    :param int n_rows: number of rows
+    :param int seed: random seed
+    :return pd.DataFrame: the data
+    """
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({'x': rng.normal(size=n_rows),
+                       'y': rng.exponential(size=n_rows)})
+    for n_hue in HUE_CARDINALITIES:
+        df[f'hue_{n_hue}'] = pd.Categorical(rng.randint(n_hue, size=n_rows).astype(str))
+    return df
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if 'bdata' in value:
+            return decode_array(value)
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def roundtrip(figure, float32):
+    """
+    Serialise a figure like a callback does and parse it again like the browser, turning
+    typed arrays into arrays.
+
+    :param dict figure: output of a builder
+    :param float32: see ENCODINGS
+    :return dict: the figure as sent
+    """
+    if float32 is not None:
+        figure = du.encode_figure(figure, float32=float32)
+    _decode(json.loads(json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)))
+    return figure
+
+
+def cases(df):
+    """
+    The builder calls to benchmark on one frame.
+
+    :param pd.DataFrame df: the data
+    :return: list of (name, function without arguments)
+    """
+    n_rows = len(df)
+    result = [(f'histogram/rows={n_rows}', lambda: du.make_histogram(df, 'x', 50)),
+              (f'scatter/rows={n_rows}', lambda: du.make_scatter(df, 'x', 'y'))]
+
+    for n_hue in HUE_CARDINALITIES:
+        hue = f'hue_{n_hue}'
+        result.append((f'histogram/rows={n_rows}/hue={n_hue}',
+                       lambda hue=hue: du.make_histogram(df, 'x', 50, color_filter=hue)))
+        result.append((f'scatter/rows={n_rows}/hue={n_hue}',
+                       lambda hue=hue: du.make_scatter(df, 'x', 'y', color_filter=hue)))
+
+    for n_bins in HEATMAP_BINS:
+        def heatmap(n_bins=n_bins):
+            values, _, _ = np.histogram2d(df['x'].values, df['y'].values, bins=n_bins)
+            return du.make_heatmap(values, n_bins, n_bins, values.astype(str), colorscale=[0, values.max()],
+                                   cmap=[[0, '#440154'], [1, '#fde725']])
+        result.append((f'heatmap/rows={n_rows}/bins={n_bins}', heatmap))
+
+    if n_rows <= MAX_TABLE_ROWS:
+        result.append((f'table/rows={n_rows}', lambda: du.make_table(columns=list(df.columns), data=df)))
+
+    if n_rows <= MAX_ROUNDTRIP_ROWS:
+        values, _, _ = np.histogram2d(df['x'].values, df['y'].values, bins=100)
+        builders = {'histogram': lambda: du.make_histogram(df, 'x', 50),
+                    'scatter': lambda: du.make_scatter(df, 'x', 'y'),
+                    'heatmap': lambda: du.make_heatmap(values, None, None, None, colorscale=[0, values.max()],
+                                                       cmap=[[0, '#440154'], [1, '#fde725']])}
+        for builder, build in builders.items():
+            for encoding, float32 in ENCODINGS.items():
+                result.append((f'roundtrip/{builder}/rows={n_rows}/{encoding}',
+                               lambda build=build, float32=float32: roundtrip(build(), float32)))
+
+    dataset = du.Dataset(df)
+    sort_by = [{'column_id': 'y', 'direction': 'desc'}]
+    # the sort order is built once per dataset, the benchmark is about the requests after that
+    dataset.sort_order('y', ascending=False)
+    result.append((f'table_page/rows={n_rows}',
+                   lambda: du.table_page(dataset, 3, 50, sort_by, '{x} > 0 && {hue_3} contains 1')[0]))
+
+    return result
+
+
+def payload(output):
+    """JSON size of a figure dict or a dash component."""
+    if hasattr(output, 'to_plotly_json'):
+        output = output.to_plotly_json()
+    return json_size(output)
+
+
+def measure(func, repeat):
+    """
+    Best time of repeat calls, peak memory and payload size of one call.
+
+    :param func: function without arguments
+    :param int repeat: number of timed calls
+    :return dict: time in seconds, peak_memory and payload in bytes
+    """
+    times = []
+    # like timeit, the garbage collector does not run during the timed calls
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    output = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'time': min(times), 'peak_memory': peak, 'payload': payload(output)}
+
+
+def run(sizes, repeat, pattern=None):
+    """
+    Run all cases for all frame sizes.
+
+    :param list sizes: number of rows of the frames
+    :param int repeat: number of timed calls per case
+    :param str pattern: only run the cases with this substring in their name
+    :return dict: measurements by case name
+    """
+    results = {}
+    for n_rows in sizes:
+        df = synthetic_frame(n_rows)
+        for name, func in cases(df):
+            if pattern and pattern not in name:
+                continue
+            results[name] = measure(func, repeat if n_rows < 1_000_000 else 1)
+            print(f"{name:45s} {results[name]['time']:9.4f} s {results[name]['peak_memory'] / 1e6:9.1f} MB "
+                  f"{results[name]['payload'] / 1e6:9.2f} MB json")
+    return results
+
+
+def compare(results, baseline, time_tolerance, size_tolerance):
+    """
+    Find the cases that are worse than the baseline.
+
+    :param dict results: measurements by case name
+    :param dict baseline: stored measurements by case name
+    :param float time_tolerance: allowed ratio of time to baseline time
+    :param float size_tolerance: allowed ratio of peak memory and payload to the baseline
+    :return list: descriptions of the regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key, tolerance in (('time', time_tolerance), ('peak_memory', size_tolerance),
+                               ('payload', size_tolerance)):
+            # times below 10 ms and sizes below 1 kB are too noisy to compare
+            floor = 1e-2 if key == 'time' else 1024
+            if result[key] > tolerance * max(baseline[name][key], floor):
+                regressions.append(f'{name}: {key} {result[key]:.4g} > {tolerance} * {baseline[name][key]:.4g}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='number of rows of the frames')
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per case below 1M rows')
+    parser.add_argument('--cases', default=None, help='only run cases with this substring in their name')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline to compare with')
+    parser.add_argument('--save', default=None, help='store the results as a baseline in this file')
+    parser.add_argument('--time-tolerance', type=float, default=1.5, help='allowed time / baseline time')
+    parser.add_argument('--size-tolerance', type=float, default=1.1,
+                        help='allowed peak memory and payload / baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.cases)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'machine': platform.platform(), 'python': platform.python_version(),
+                       'results': results}, f, indent=1, sort_keys=True)
+        print(f'Saved baseline to {args.save}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, nothing to compare with')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.time_tolerance, args.size_tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Load test of the callbacks of a Dash app, by replaying recorded callback requests.
+
+Record a session first: start the multi-page app with DASH_RECORD_REQUESTS set, click
+through it (upload a file, change dropdowns, drag sliders) and stop it:
+
+    cd demos && DASH_RECORD_REQUESTS=../benchmarks/session.jsonl python index.py
+
+Then replay the session with an increasing number of concurrent users, either in
+process through the Flask test client of the app (one server process, no network):
+
+    python benchmarks/bench_load.py benchmarks/session.jsonl --app index:app
+
+or against a running server, e.g. gunicorn with several workers:
+
+    cd demos && gunicorn -w 4 -b 127.0.0.1:8050 index:server
+    python benchmarks/bench_load.py benchmarks/session.jsonl --url http://127.0.0.1:8050
+
+Every user replays the whole session in order, again and again, for --duration seconds
+per concurrency step. Per step and callback the throughput and the p50/p95/p99 latency
+are reported.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dash_utils.instrumentation import percentiles, QUANTILES  # noqa: E402
+
+ENDPOINT = '/_dash-update-component'
+
+
+def load_session(path):
+    """
+    Read recorded callback requests.
+
+    :param str path: JSON lines file written by dash_utils.record_requests
+    :return list: request bodies
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def callback_name(body):
+    """The callback id of a request: its output(s)."""
+    output = body.get('output', '')
+    # multi output callbacks are sent as ..a.b...c.d..
+    return ','.join(part for part in output.strip('.').split('...')) if output.startswith('..') else output
+
+
+def client_sender(app_spec, demos_dir):
+    """
+    Send requests through the Flask test client of an app, in this process.
+
+    :param str app_spec: module:attribute of the Dash app, e.g. index:app
+    :param str demos_dir: directory to import the module from
+    :return: function that creates a send function per user
+    """
+    sys.path.insert(0, demos_dir)
+    os.chdir(demos_dir)
+    module_name, _, attribute = app_spec.partition(':')
+    app = getattr(importlib.import_module(module_name), attribute or 'app')
+    server = app.server if hasattr(app, 'server') else app
+
+    def make_sender():
+        client = server.test_client()
+
+        def send(body):
+            response = client.post(ENDPOINT, json=body)
+            return response.status_code, len(response.get_data())
+
+        return send
+
+    return make_sender
+
+
+def http_sender(url):
+    """
+    Send requests to a running server.
+
+    :param str url: base url of the app, e.g. http://127.0.0.1:8050
+    :return: function that creates a send function per user
+    """
+    def make_sender():
+
+        def send(body):
+            request = urllib.request.Request(url.rstrip('/') + ENDPOINT, data=json.dumps(body).encode(),
+                                             headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return response.status, len(response.read())
+            except urllib.error.HTTPError as e:
+                return e.code, 0
+
+        return send
+
+    return make_sender
+
+
+def run_step(make_sender, session, concurrency, duration):
+    """
+    Replay the session with a number of concurrent users.
+
+    :param make_sender: function that creates a send function per user
+    :param list session: request bodies
+    :param int concurrency: number of users
+    :param float duration: seconds to run
+    :return: latencies by callback, errors by callback, elapsed seconds
+    """
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def user():
+        send = make_sender()
+        while time.perf_counter() < stop:
+            for body in session:
+                name = callback_name(body)
+                start = time.perf_counter()
+                try:
+                    status, _ = send(body)
+                except Exception:
+                    status = None
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies[name].append(elapsed)
+                    # 204 is PreventUpdate, not an error
+                    if status not in (200, 204):
+                        errors[name] += 1
+                if time.perf_counter() >= stop:
+                    break
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def report(latencies, errors, elapsed, concurrency):
+    """
+    Throughput and tail latency per callback, plus a row for all callbacks together.
+
+    :return pd.DataFrame: one row per callback
+    """
+    rows = []
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    for name, values in list(latencies.items()) + [('all', all_latencies)]:
+        row = {'users': concurrency, 'callback': name, 'requests': len(values),
+               'errors': sum(errors.values()) if name == 'all' else errors[name],
+               'requests/s': len(values) / elapsed}
+        for q, value in zip(QUANTILES, percentiles(values)):
+            row[f'p{int(100 * q)} ms'] = 1000 * value
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('session', help='recorded requests, see dash_utils.record_requests')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--app', default='index:app', help='module:attribute of the app to test in process')
+    target.add_argument('--url', default=None, help='base url of a running server')
+    parser.add_argument('--demos-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                                                            'demos'), help='directory of the app module')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='numbers of concurrent users to ramp through')
+    parser.add_argument('--duration', type=float, default=10., help='seconds per concurrency step')
+    parser.add_argument('--output', default=None, help='write the report to this csv file')
+    args = parser.parse_args(argv)
+
+    session = load_session(args.session)
+    make_sender = http_sender(args.url) if args.url else client_sender(args.app,
+                                                                           os.path.abspath(args.demos_dir))
+
+    reports = []
+    for concurrency in args.concurrency:
+        latencies, errors, elapsed = run_step(make_sender, session, concurrency, args.duration)
+        reports.append(report(latencies, errors, elapsed, concurrency))
+        print(reports[-1].round(2).to_string(index=False), end='\n\n')
+
+    if args.output:
+        pd.concat(reports, ignore_index=True).to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
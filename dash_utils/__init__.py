@@ -1 +1,17 @@
-from .dash_utils import *
\ No newline at end of file
+from .dash_utils import *
+from .binning import BinnedColumnCache, ContingencyEngine, bin_edges, bin_codes, category_codes, contingency_table
+from .instrumentation import CallbackStats, instrument, metrics_response, record_requests
+from .dtypes import format_bytes, memory_size, optimise_dtypes
+from .encoding import decode_array, encode_array, encode_figure
+from .figures import strict_figures
+from .theme import base_figure, register_template
+from .patches import FigureStates, figure_patch
+from .rebinning import MAX_BINS, bin_counts, clientside_histogram, histogram_counts
+from .grid import FigureGrid, grid_layout, triggered_grid_ids
+from .cache import FigureCache, cache_key, fingerprint, register_fingerprint
+from .hashing import column_hashes, content_hash, dataset_fingerprint, hash_upload, index_hash
+from .dataset import Dataset, DatasetStore
+from .table_query import filter_mask, table_page
+from .selection import (intersect_selections, range_selection, selected_ranges, selected_rows, selection_positions,
+                        trace_rows, trace_values)
+from .filters import CategoryIndex, filter_rows
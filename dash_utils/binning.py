@@ -0,0 +1,337 @@
+"""
+Binned integer code columns, shared by all interactions that bin the same data.
+
+A column is binned into compact unsigned integer codes (uint8 for up to 254 bins,
+uint16 for up to 65534 bins). The largest value of the dtype marks rows that do not
+fall in any bin: missing values, underflow and overflow. Contingency tables of two
+coded columns are a single bincount of the combined codes.
+
+ContingencyEngine keeps a contingency table up to date while bin edges are dragged,
+by moving only the rows between the old and new position of an edge.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def code_dtype(n_bins):
+    """
+    Smallest unsigned integer dtype that holds n_bins codes plus the missing code.
+
+    :param int n_bins: number of bins
+    :return: numpy dtype
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_bins < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def missing_code(codes):
+    """
+    The code of rows that are not in any bin, for an array of codes.
+
+    :param np.array codes: array of codes
+    :return int: largest value of the dtype of the codes
+    """
+    return np.iinfo(codes.dtype).max
+
+
+def is_interval(series):
+    """
+    Check if a column is treated as an interval variable, i.e. if it needs to be binned.
+
+    :param pd.Series series: the column
+    :return bool: True for numeric, non-boolean columns
+    """
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def bin_edges(values, n_bins, quantile=False):
+    """
+    Uniform or quantile bin edges, equal to the ones of phik.binning.bin_edges.
+
+    :param np.array values: the values to bin, nan values are ignored
+    :param int n_bins: number of bins
+    :param bool quantile: uniform bins (False) or bins based on quantiles (True)
+    :return np.array: n_bins + 1 edges
+    """
+    values = values[~np.isnan(values)]
+    if quantile:
+        edges = np.quantile(values, np.linspace(0, 1, n_bins + 1))
+        edges[0] -= max(1e-14 * abs(edges[0]), sys.float_info.min)
+    else:
+        min_value = np.min(values)
+        constant = max(1e-14 * abs(min_value), sys.float_info.min)
+        edges = np.linspace(min_value - constant, np.max(values), n_bins + 1)
+    return edges
+
+
+def bin_codes(values, edges):
+    """
+    Bin values into codes with np.searchsorted. A value equal to an edge falls in the
+    bin to the left of it, like in phik.
+
+    :param np.array values: float values
+    :param list edges: increasing bin edges
+    :return np.array: codes, with the missing code for nan, underflow and overflow
+    """
+    edges = np.asarray(edges, dtype=float)
+    n_bins = len(edges) - 1
+    dtype = code_dtype(n_bins)
+
+    # position 0 is underflow, n_bins + 1 overflow (and nan, which sorts last)
+    positions = np.searchsorted(edges, values)
+    positions[positions > n_bins] = 0
+    codes = (positions - 1).astype(dtype)  # underflow wraps around to the missing code
+    return codes
+
+
+def category_codes(series):
+    """
+    Code a column by its sorted unique values.
+
+    :param pd.Series series: the column
+    :return: codes, labels
+    """
+    codes, labels = pd.factorize(series, sort=True)
+    dtype = code_dtype(len(labels))
+    return codes.astype(dtype), np.asarray(labels)  # nan (-1) wraps around to the missing code
+
+
+def contingency_table(x_codes, y_codes, n_x, n_y):
+    """
+    Create the contingency table of two coded columns. Rows with a missing code
+    in either column are not counted.
+
+    :param np.array x_codes: codes of the first column
+    :param np.array y_codes: codes of the second column
+    :param int n_x: number of bins of the first column
+    :param int n_y: number of bins of the second column
+    :return np.array: n_x * n_y array of counts
+    """
+    combined = x_codes.astype(np.int64) * n_y + y_codes
+    valid = (x_codes != missing_code(x_codes)) & (y_codes != missing_code(y_codes))
+    return np.bincount(combined[valid], minlength=n_x * n_y).reshape(n_x, n_y)
+
+
+class BinnedColumnCache:
+    """
+    Cache of binned code columns of one DataFrame.
+
+    Interval columns are binned per set of edges, categorical columns once. The float
+    values of interval columns are extracted once as well. At most max_entries code
+    arrays are kept; the least recently used ones are dropped first.
+
+    :param pd.DataFrame df: the data
+    :param int max_entries: maximum number of cached code arrays
+    """
+
+    def __init__(self, df, max_entries=128):
+        self.df = df
+        self.max_entries = max_entries
+        self._values = {}
+        self._labels = {}
+        self._edges = {}
+        self._sort_index = {}
+        self._codes = OrderedDict()
+
+    def is_interval(self, col):
+        return is_interval(self.df[col])
+
+    def values(self, col):
+        """Float values of an interval column."""
+        if col not in self._values:
+            self._values[col] = self.df[col].values.astype(float)
+        return self._values[col]
+
+    def sort_index(self, col):
+        """
+        Rows of an interval column sorted by value, nan values last.
+
+        :param str col: name of the column
+        :return: row order, sorted values, position of every row in the order
+        """
+        if col not in self._sort_index:
+            values = self.values(col)
+            order = np.argsort(values, kind='stable')
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+            self._sort_index[col] = order, values[order], position
+        return self._sort_index[col]
+
+    def labels(self, col):
+        """Sorted unique values of a categorical column."""
+        self.codes(col)
+        return self._labels[col]
+
+    def edges(self, col, n_bins, quantile=False):
+        """
+        Uniform or quantile bin edges of an interval column.
+
+        :param str col: name of the column
+        :param int n_bins: number of bins
+        :param bool quantile: uniform bins (False) or bins based on quantiles (True)
+        :return np.array: n_bins + 1 edges
+        """
+        key = (col, n_bins, quantile)
+        if key not in self._edges:
+            self._edges[key] = bin_edges(self.values(col), n_bins, quantile)
+        return self._edges[key]
+
+    def codes(self, col, edges=None):
+        """
+        Codes of a column. Interval columns are binned with the edges, categorical
+        columns are coded by their sorted unique values and ignore the edges.
+
+        :param str col: name of the column
+        :param list edges: bin edges of an interval column
+        :return: codes, number of bins
+        """
+        interval = self.is_interval(col)
+        if interval and edges is None:
+            raise ValueError(f"Bin edges are required for interval column {col}")
+        key = (col, tuple(np.asarray(edges, dtype=float)) if interval else None)
+
+        if key in self._codes:
+            self._codes.move_to_end(key)
+            return self._codes[key]
+
+        if interval:
+            codes = bin_codes(self.values(col), edges), len(edges) - 1
+        else:
+            codes, labels = category_codes(self.df[col])
+            self._labels[col] = labels
+            codes = codes, len(labels)
+
+        self._codes[key] = codes
+        if len(self._codes) > self.max_entries:
+            self._codes.popitem(last=False)
+        return codes
+
+    def contingency(self, x, y, x_edges=None, y_edges=None):
+        """
+        Contingency table of two columns.
+
+        :param str x: name of the first column
+        :param str y: name of the second column
+        :param list x_edges: bin edges, if the first column is an interval column
+        :param list y_edges: bin edges, if the second column is an interval column
+        :return np.array: contingency table
+        """
+        x_codes, n_x = self.codes(x, x_edges)
+        y_codes, n_y = self.codes(y, y_edges)
+        return contingency_table(x_codes, y_codes, n_x, n_y)
+
+
+class _SortedAxis:
+    """Rows sorted by one interval column, with the codes of the other column in that order."""
+
+    def __init__(self, cache, col, edges, other_codes):
+        self.order, self.sorted_values, self.position = cache.sort_index(col)
+        self.edges = np.array(edges, dtype=float)
+        self.boundaries = self.boundary(self.edges)
+        self.other_codes = other_codes[self.order]
+
+    def boundary(self, edges):
+        # a value equal to an edge is in the bin left of it
+        return np.searchsorted(self.sorted_values, edges, side='right')
+
+
+class ContingencyEngine:
+    """
+    Contingency table of two columns that follows moving bin edges incrementally.
+
+    The rows are kept sorted by each interval column. When one edge moves, only the
+    rows between its old and new position change bin: they are moved to the
+    neighbouring bin, which costs O(rows moved) instead of O(rows). Any other change
+    (a different number of bins, an edge passing its neighbour) rebuilds the table.
+
+    :param BinnedColumnCache cache: binned columns of the data
+    :param str x: name of the first column
+    :param str y: name of the second column
+    :param list x_edges: bin edges, if the first column is an interval column
+    :param list y_edges: bin edges, if the second column is an interval column
+    """
+
+    def __init__(self, cache, x, y, x_edges=None, y_edges=None):
+        self.cache = cache
+        self.x = x
+        self.y = y
+        self._lock = threading.Lock()
+        self._rebuild(x_edges, y_edges)
+
+    def _rebuild(self, x_edges, y_edges):
+        x_codes, n_x = self.cache.codes(self.x, x_edges)
+        y_codes, n_y = self.cache.codes(self.y, y_edges)
+        self.table = contingency_table(x_codes, y_codes, n_x, n_y)
+
+        self.x_axis = _SortedAxis(self.cache, self.x, x_edges, y_codes) if self.cache.is_interval(self.x) else None
+        self.y_axis = _SortedAxis(self.cache, self.y, y_edges, x_codes) if self.cache.is_interval(self.y) else None
+
+    def _move_edge(self, axis, other_axis, table, i, new_edge):
+        """
+        Move edge i of an axis. table is oriented with the bins of this axis as rows.
+
+        :return bool: False if the move is not incremental and a rebuild is needed
+        """
+        n_bins = len(axis.edges) - 1
+        old = axis.boundaries[i]
+        new = axis.boundary(new_edge)
+        lower = axis.boundaries[i - 1] if i > 0 else 0
+        upper = axis.boundaries[i + 1] if i < n_bins else len(axis.sorted_values)
+        if not lower <= new <= upper:
+            return False
+
+        # rows right of the edge are in bin i, left of it in bin i - 1
+        if new > old:
+            source, target, rows = i, i - 1, slice(old, new)
+        else:
+            source, target, rows = i - 1, i, slice(new, old)
+
+        other_codes = axis.other_codes[rows]
+        other_codes = other_codes[other_codes != missing_code(other_codes)]
+        counts = np.bincount(other_codes, minlength=table.shape[1])
+        if 0 <= source < n_bins:
+            table[source] -= counts
+        if 0 <= target < n_bins:
+            table[target] += counts
+
+        if other_axis is not None:
+            # keep the codes of this column in the order of the other column up to date
+            codes = other_axis.other_codes
+            code = target if 0 <= target < n_bins else missing_code(codes)
+            codes[other_axis.position[axis.order[rows]]] = code
+
+        axis.edges[i] = new_edge
+        axis.boundaries[i] = new
+        return True
+
+    def _move_edges(self, axis, other_axis, table, edges):
+        if axis is None or edges is None:
+            return True
+        edges = np.asarray(edges, dtype=float)
+        if len(edges) != len(axis.edges):
+            return False
+        for i in np.flatnonzero(edges != axis.edges):
+            if not self._move_edge(axis, other_axis, table, i, edges[i]):
+                return False
+        return True
+
+    def update(self, x_edges=None, y_edges=None):
+        """
+        Move the bin edges and return the contingency table.
+
+        :param list x_edges: bin edges, if the first column is an interval column
+        :param list y_edges: bin edges, if the second column is an interval column
+        :return np.array: copy of the contingency table
+        """
+        with self._lock:
+            incremental = (self._move_edges(self.x_axis, self.y_axis, self.table, x_edges) and
+                           self._move_edges(self.y_axis, self.x_axis, self.table.T, y_edges))
+            if not incremental:
+                self._rebuild(x_edges, y_edges)
+            return self.table.copy()
@@ -0,0 +1,348 @@
+"""
+Cache of the results of the figure builders, shared by all sessions of a process.
+
+make_histogram, make_scatter, make_heatmap, data_profile_tables and the like are pure
+functions of the data and their arguments, so users that look at the same dataset with
+the same settings get the same figure. FigureCache.memoize wraps a builder so that its
+result is computed once.
+
+The key of a call is a hash of the name of the builder and its normalised arguments.
+A DataFrame argument is replaced by its fingerprint: a Dataset registers the fingerprint
+it computed when the data was stored (see register_fingerprint and dash_utils.hashing),
+other frames are hashed once per object. Frames are therefore treated as immutable. Arrays and long
+strings are replaced by a hash of their contents.
+
+Results are kept serialised with pickle. The memory tier is bounded by the size of the
+serialised results, least recently used ones are dropped first. With a directory the
+results are also written to disk, one file per key, where other worker processes and
+restarts of the server find them. The disk tier is read and bounded from the directory
+itself, so all processes that share it keep it under max_disk_bytes together; the
+modification time of a file is its last use. Hits and misses are counted per builder,
+see summary and prometheus.
+
+Loading a pickle can run any code, so the directory must only be writable by the
+server. With a secret every entry is signed with HMAC-SHA256, and files without a
+valid signature are ignored and removed.
+"""
+import functools
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .hashing import column_hashes, dataset_fingerprint, index_hash
+
+# strings longer than this are hashed instead of put in the key as they are
+MAX_KEY_STRING = 256
+
+# bytes of the HMAC-SHA256 signature in front of a signed result on disk
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+# fingerprints of DataFrames by id, removed when the frame is garbage collected
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def _hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def register_fingerprint(df, fingerprint):
+    """
+    Set the fingerprint of a DataFrame, e.g. the key of its Dataset.
+
+    :param pd.DataFrame df: the data, which must not be changed afterwards
+    :param str fingerprint: identifier of the contents of the data
+    """
+    key = id(df)
+    with _fingerprints_lock:
+        _fingerprints[key] = (weakref.ref(df, lambda _: _forget(key)), fingerprint)
+
+
+def _forget(key):
+    with _fingerprints_lock:
+        _fingerprints.pop(key, None)
+
+
+def fingerprint(df):
+    """
+    Identifier of the contents of a DataFrame, computed once per DataFrame object.
+
+    :param pd.DataFrame df: the data
+    :return str: the fingerprint
+    """
+    with _fingerprints_lock:
+        ref, value = _fingerprints.get(id(df), (None, None))
+    if ref is not None and ref() is df:
+        return value
+
+    value = dataset_fingerprint(column_hashes(df), index_hash(df.index))
+    register_fingerprint(df, value)
+    return value
+
+
+def _normalise(value):
+    """A JSON serialisable form of an argument, equal for equal arguments."""
+    if isinstance(value, pd.DataFrame):
+        return {'DataFrame': fingerprint(value)}
+    if isinstance(value, pd.Series):
+        return {'Series': _hash(pd.util.hash_pandas_object(value).to_numpy().tobytes()), 'name': str(value.name)}
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return {'array': _normalise(value.tolist())}
+        return {'array': _hash(np.ascontiguousarray(value).tobytes()), 'dtype': str(value.dtype),
+                'shape': list(value.shape)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, str):
+        return value if len(value) <= MAX_KEY_STRING else {'str': _hash(value.encode())}
+    if isinstance(value, dict):
+        return {'dict': sorted([str(key), _normalise(item)] for key, item in value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(item) for item in value]
+    if hasattr(value, 'to_plotly_json'):
+        return _normalise(value.to_plotly_json())
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return repr(value)
+
+
+def cache_key(name, args, kwargs):
+    """
+    Key of a call of a builder.
+
+    :param str name: name of the builder
+    :param tuple args: positional arguments
+    :param dict kwargs: keyword arguments
+    :return str: the key
+    """
+    normalised = [name, _normalise(list(args)), _normalise(kwargs)]
+    return _hash(json.dumps(normalised, sort_keys=True).encode())
+
+
+class FigureCache:
+    """
+    Results of builders by the key of their call, in memory and optionally on disk.
+
+    :param int max_bytes: size of the serialised results to keep in memory
+    :param str directory: directory of the disk tier, None to only keep them in memory
+    :param int max_disk_bytes: size of the results to keep on disk, by all processes together
+    :param str secret: key to sign the results on disk with, None to not sign them
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20, directory=None, max_disk_bytes=2 * 2 ** 30, secret=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._secret = secret.encode() if isinstance(secret, str) else secret
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _count(self, name, outcome):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'memory': 0, 'disk': 0, 'miss': 0})
+            counts[outcome] += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _sign(self, key, data):
+        return hmac.new(self._secret, key.encode() + data, hashlib.sha256).digest()
+
+    def _disk_files(self):
+        """Path, size and modification time of the results on disk, least recently used first."""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.pkl'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # removed by another process
+                        continue
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(files, key=lambda file: file[2])
+
+    def _load_disk(self, key):
+        """The serialised result of a key on disk, None if there is none."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # the modification time orders the files for the limit of the disk tier
+            os.utime(path)
+        except OSError:
+            return None
+        if self._secret is not None:
+            signature, data = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+            if not hmac.compare_digest(signature, self._sign(key, data)):
+                self._remove(path)
+                return None
+        return data
+
+    def _load(self, key):
+        """The serialised result of a key, and where it was found."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key], 'memory'
+        if self.directory is not None:
+            # also the results written by other processes
+            data = self._load_disk(key)
+            if data is not None:
+                self._store_memory(key, data)
+                return data, 'disk'
+        return None, 'miss'
+
+    def _store_memory(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_bytes:
+                _, dropped = self._memory.popitem(last=False)
+                self._memory_bytes -= len(dropped)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _store_disk(self, key, data):
+        if self._secret is not None:
+            data = self._sign(key, data) + data
+        if len(data) > self.max_disk_bytes:
+            return
+        # written to a temporary file first, so readers never see a partial result
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+
+        # the limit holds for the files of all processes
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def get(self, name, key, compute):
+        """
+        The result of a call, computed with compute() if it is not in the cache.
+
+        :param str name: name of the builder, for the statistics
+        :param str key: key of the call, see cache_key
+        :param compute: function without arguments that computes the result
+        :return: the result, a copy for every caller
+        """
+        data, outcome = self._load(key)
+        if data is not None:
+            try:
+                result = pickle.loads(data)
+            except Exception:
+                # e.g. a file of another version of the builders, it is written again
+                with self._lock:
+                    self._memory_bytes -= len(self._memory.pop(key, b''))
+                outcome = 'miss'
+            else:
+                self._count(name, outcome)
+                return result
+        self._count(name, outcome)
+
+        result = compute()
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store_memory(key, data)
+        if self.directory is not None:
+            self._store_disk(key, data)
+        return result
+
+    def memoize(self, function, name=None):
+        """
+        The builder with its results cached, e.g. make_histogram = cache.memoize(du.make_histogram).
+
+        :param function: a pure function of its arguments
+        :param str name: name of the builder in the key and the statistics, default its name
+        :return: the wrapped function
+        """
+        name = name or function.__name__
+
+        @functools.wraps(function)
+        def cached(*args, **kwargs):
+            return self.get(name, cache_key(name, args, kwargs), lambda: function(*args, **kwargs))
+
+        return cached
+
+    def clear(self):
+        """Remove all results, also from disk."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.directory is not None:
+            for path, _, _ in self._disk_files():
+                self._remove(path)
+
+    @property
+    def hit_rate(self):
+        """Fraction of the calls answered from memory or disk, nan before the first call."""
+        with self._lock:
+            hits = sum(counts['memory'] + counts['disk'] for counts in self._counts.values())
+            calls = hits + sum(counts['miss'] for counts in self._counts.values())
+        return hits / calls if calls else np.nan
+
+    def summary(self):
+        """
+        Calls, hits in memory, hits on disk, misses and hit rate per builder.
+
+        :return pd.DataFrame: one row per builder
+        """
+        with self._lock:
+            rows = [OrderedDict(builder=name, calls=sum(counts.values()), memory_hits=counts['memory'],
+                                disk_hits=counts['disk'], misses=counts['miss'])
+                    for name, counts in self._counts.items()]
+        summary = pd.DataFrame(rows, columns=['builder', 'calls', 'memory_hits', 'disk_hits', 'misses'])
+        summary['hit_rate'] = (summary['memory_hits'] + summary['disk_hits']) / summary['calls']
+        return summary
+
+    def prometheus(self, prefix='dash_figure_cache'):
+        """
+        The statistics in the Prometheus text exposition format.
+
+        :param str prefix: prefix of the metric names
+        :return str: the text
+        """
+        lines = [f'# HELP {prefix}_requests_total Calls of cached builders by outcome',
+                 f'# TYPE {prefix}_requests_total counter']
+        with self._lock:
+            for name, counts in self._counts.items():
+                for outcome, count in counts.items():
+                    lines.append(f'{prefix}_requests_total{{builder="{name}",outcome="{outcome}"}} {count}')
+            tiers = {'memory': (self._memory_bytes, len(self._memory))}
+        if self.directory is not None:
+            files = self._disk_files()
+            tiers['disk'] = (sum(size for _, size, _ in files), len(files))
+        for i, (metric, description) in enumerate((('bytes', 'Size of the serialised results'),
+                                                   ('entries', 'Number of results'))):
+            lines.append(f'# HELP {prefix}_{metric} {description}')
+            lines.append(f'# TYPE {prefix}_{metric} gauge')
+            lines.extend(f'{prefix}_{metric}{{tier="{tier}"}} {values[i]}' for tier, values in tiers.items())
+        return '\n'.join(lines) + '\n'
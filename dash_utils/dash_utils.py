@@ -3,6 +3,9 @@ Utility functions used with
 
 Author: Susanne Groothuis Groothuis.susanne@kpmg.nl
 """
+import functools
+
+import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_table
@@ -11,6 +14,10 @@ import plotly.graph_objs as go
 import numpy as np
 import pandas as pd
 import seaborn as sns
+from matplotlib import pyplot as plt
+
+from . import figures, theme
+from .selection import intersect_selections, selected_rows, trace_values
 
 
 def column(children, style={}, className='five columns'):
@@ -40,23 +47,24 @@ def row(children, style={}, className='row'):
 def figure_grid(n_figures, figures=None, fig_names=None,
                 layout_kwargs=None):
     """Convenience function to return a grid of Graph objects. The grid is created
-    based on the amount of figures passed.
+    based on the amount of figures passed. Every graph needs its own callback, see
+    FigureGrid for graphs that share one callback.
 
     :param int n_figures: Number of figures to make a grid for. Max allowed = 6
     :param list figures: list of plotly.graph_objs
     :param list fig_names: Optional list of figure names.
     :param layout_kwargs: Optional layout arguments passed on to the go.Layout object.
+                          Default the figures use the registered template (see du.theme),
+                          so callbacks can update them with du.FigureStates.
     """
 
     if fig_names is None:
         fig_names = [f"Graph {i}" for i in range(n_figures)]
-    if layout_kwargs is None:
-        layout_kwargs = dict(plot_bgcolor='#263740',
-                             paper_bgcolor='#1d2930',
-                             font=dict(color='white'),
-                             margin=go.layout.Margin(b=30, l=30,
-                                                     r=30, t=40,
-                                                     pad=5))
+
+    def empty_figure(i):
+        if layout_kwargs is None:
+            return theme.base_figure(title=f'Graph {i}')
+        return {'data': [], 'layout': go.Layout(title=f'Graph {i}', **layout_kwargs)}
 
     if n_figures > 1:
         if n_figures % 2 == 0:
@@ -69,9 +77,7 @@ def figure_grid(n_figures, figures=None, fig_names=None,
             row_childs = []
             for i in ll:
                 row_childs.append(dcc.Graph(id=f'fig_{i}',
-                                            figure={'data': [],
-                                                    'layout': go.Layout(title=f"Graph {i}",
-                                                                        **layout_kwargs)},
+                                            figure=empty_figure(i),
                                             style={'width': '100%'}))
 
             childs.append(column(row_childs, className='five columns'))
@@ -80,9 +86,7 @@ def figure_grid(n_figures, figures=None, fig_names=None,
             # -- add the last figure for uneven amount
             i = int(n_figures-1)
             row_childs = [dcc.Graph(id=f'fig_{i}',
-                                    figure={'data': [],
-                                            'layout': go.Layout(title=f'Graph {i}',
-                                                                **layout_kwargs)},
+                                    figure=empty_figure(i),
                                     style={'width': '100%'})]
 
             childs.append(row([column(row_childs, className='ten columns')]))
@@ -123,47 +127,31 @@ def control_grid(controls):
     return childs
 
 
-def _return_selection(points1, points2, df):
+def triggered_ids():
     """
-    Lel I dont know what this does
+    Ids of the components whose properties triggered the current callback. Use this
+    instead of comparing n_clicks with a count kept in the process: the request itself
+    says what changed, so it works for every session and every server worker.
 
-    :param points1:
-    :param points2:
-    :param df:
-    :return:
+    :return set: component ids, empty on the initial call of a callback
     """
+    return {trigger['prop_id'].rsplit('.', 1)[0] for trigger in dash.callback_context.triggered
+            if trigger['prop_id'] != '.'}
 
-    if points1 is not None:
-        try:
-            sel1 = [x['pointNumbers'] for x in points1['points']]
-            sel1 = [k for elem in sel1 for k in elem]
-
-        except KeyError:
-            sel1 = None
-    else:
-        sel1 = []
-
-    if points2 is not None:
-        print(points2['points'][0].keys())
 
-        try:
-            sel2 = [x['pointNumber'] for x in points2['points']]
-        except KeyError:
-            sel2 = None
-    else:
-        sel2 = []
-
-    if (sel1 == []) & (sel2 == []):
-        sel = df.index.values
-    elif not sel1:
-        sel = sel2
-    elif not sel2:
-        sel = sel1
-    else:
-        sel = np.array(sel1)[np.isin(sel1, sel2)] if sel1 > sel2 else np.array(sel2)[np.isin(sel2, sel1)]
-        print(sel[:10])
+def _return_selection(points1, points2, df):
+    """
+    Rows selected in both a histogram (points1) and a scatter plot (points2) of df,
+    both made without a color filter. See du.selection for figures with color filters.
 
-    return sel
+    :param dict points1: selectedData of the histogram
+    :param dict points2: selectedData of the scatter plot
+    :param pd.DataFrame df: the data of both figures
+    :return np.array: row positions, all rows if nothing is selected
+    """
+    selections = [selected_rows(points, [None], len(df)) for points in (points1, points2)]
+    sel = intersect_selections(*selections)
+    return np.arange(len(df)) if sel is None else sel
 
 
 def make_histogram(df, col, bins, color_filter=None, layout_kwargs={}, sel=None,):
@@ -175,38 +163,32 @@ def make_histogram(df, col, bins, color_filter=None, layout_kwargs={}, sel=None,
     :param int bins: Number of bins
     :param str color_filter: Name of the df columns used to filter/group by in color
     :param dict layout_kwargs: layout arguments for the graph object
-    :param sel: TODO: use
+    :param sel: rows to plot, as a boolean mask or row positions (see du.selection). Default all rows
 
     :return dict: Dictionary containing 'data' and 'layout' as keys
     """
-    if sel is None:
-        sel = df.index
-    elif col is not None:
-        sel = df.loc[sel, col].index
     if col is None:
-        return {'data': [],
-                'layout': go.Layout(title="Please select a variable",
-                                    **layout_kwargs)}
+        return figures.figure([], figures.layout(title="Please select a variable", **layout_kwargs))
+
+    values_per_trace, names = trace_values(df, [col], color_filter, sel)
     if color_filter is None:
-        return {'data': [go.Histogram(x=df[col].values, nbinsx=bins,
-                                      )],
-                'layout': go.Layout(title=f'{col.capitalize()}', **layout_kwargs)}
+        return figures.figure([figures.trace('histogram', x=values_per_trace[0][0], nbinsx=bins)],
+                              figures.layout(title=f'{col.capitalize()}', **layout_kwargs))
 
     else:
 
-        pal = sns.palettes.color_palette('viridis', n_colors=len(df[color_filter].unique()))
-        pal = pal.as_hex()
-        return {'data': [go.Histogram(x=df.loc[df[color_filter] == x, col],
-                                      marker=dict(color=pal[i]),
-                                      nbinsx=bins,
-                                      name=str(x),
-                                      )
-                         for i, x in enumerate(df[color_filter].unique())],
-                'layout': go.Layout(title=f'{col.capitalize()}',
-                                    **layout_kwargs)}
+        pal = color_palette('viridis', len(names))
+        return figures.figure([figures.trace('histogram',
+                                             x=values[0],
+                                             marker=dict(color=pal[i]),
+                                             nbinsx=bins,
+                                             name=str(x),
+                                             )
+                               for i, (x, values) in enumerate(zip(names, values_per_trace))],
+                              figures.layout(title=f'{col.capitalize()}', **layout_kwargs))
 
 
-def make_table(columns=None, data=None, id=None, layout_kwargs={}):
+def make_table(columns=None, data=None, id=None, layout_kwargs={}, page_size=None):
     """
     Create a dash table based on a dataframe as input. Makes porting everything to dicts a bit easier
 
@@ -214,6 +196,9 @@ def make_table(columns=None, data=None, id=None, layout_kwargs={}):
     :param pd.DataFrame data: input dataframe, can be none when initializing table
     :param str id: identifier for table object (for callbacks)
     :param dict layout_kwargs: layout options for table
+    :param int page_size: rows per page. If given, paging, sorting and filtering are done
+                          by a callback on the server (see du.table_page) and only the first
+                          page of data is put in the table
     :return: dash_table object
     """
 
@@ -224,6 +209,14 @@ def make_table(columns=None, data=None, id=None, layout_kwargs={}):
         if isinstance(columns[0], str):
             columns = [{'name': c, 'id': c} for c in columns]
 
+    if page_size is not None:
+        layout_kwargs = dict(dict(page_action='custom', sort_action='custom', filter_action='custom',
+                                  sort_mode='multi', page_current=0, page_size=page_size, page_count=1),
+                             **layout_kwargs)
+        if isinstance(data, pd.DataFrame):
+            layout_kwargs['page_count'] = max(1, int(np.ceil(len(data) / page_size)))
+            data = data.iloc[:page_size]
+
     if isinstance(data, pd.DataFrame):
         data = data.to_dict('records')
 
@@ -247,45 +240,39 @@ def make_table(columns=None, data=None, id=None, layout_kwargs={}):
 
 def make_scatter(df, x, y, color_filter=None, layout_kwargs={}, sel=None):
     """
-    Returns a go object used on the figure argument of the graph object
+    Returns a dictionary used on the figure argument of the graph object
     in dash.
     :param pd.DataFrame df: The data
     :param str x: x value for the scatter plot
     :param str y: y value for the scatter plot
     :param str color_filter: value to filter on (hue in seaborn)
     :param dict layout_kwargs: arguments for the layout of the plot
-    :param sel: selection of datapoints TODO: use them?
+    :param sel: rows to plot, as a boolean mask or row positions (see du.selection). Default all rows
 
     :return:
     """
-    if sel is None:
-        sel = df.index
-
     if (x is None) or (y is None):
-        return{'data': [],
-               'layout': go.Layout(title='',
-                                   **layout_kwargs)}
-
-    elif color_filter is None:
-        return {'data': [go.Scattergl(x=df[x].values,
-                                      y=df[y].values,
-                                      mode='markers',
-                                      )],
-                'layout': go.Layout(title=f'{x.capitalize()} vs {y.capitalize()}',
-                                    **layout_kwargs)}
+        return figures.figure([], figures.layout(title='', **layout_kwargs))
+
+    values_per_trace, names = trace_values(df, [x, y], color_filter, sel)
+    if color_filter is None:
+        return figures.figure([figures.trace('scattergl',
+                                             x=values_per_trace[0][0],
+                                             y=values_per_trace[0][1],
+                                             mode='markers',
+                                             )],
+                              figures.layout(title=f'{x.capitalize()} vs {y.capitalize()}', **layout_kwargs))
     else:
-        n_colors = len(df[color_filter].unique())
-        pal = sns.palettes.color_palette('viridis', n_colors=n_colors)
-        pal = pal.as_hex()
-        return {'data': [go.Scattergl(x=df.loc[df[color_filter] == hue, x],
-                                      y=df.loc[df[color_filter] == hue, y],
-                                      mode='markers',
-                                      name=str(hue),
-                                      marker=dict(color=pal[i]),
-                                      )
-                         for i, hue in enumerate(df[color_filter].unique())],
-                'layout': go.Layout(title=f'{x.capitalize()} vs {y.capitalize()}',
-                                    **layout_kwargs)}
+        pal = color_palette('viridis', len(names))
+        return figures.figure([figures.trace('scattergl',
+                                             x=values[0],
+                                             y=values[1],
+                                             mode='markers',
+                                             name=str(hue),
+                                             marker=dict(color=pal[i]),
+                                             )
+                               for i, (hue, values) in enumerate(zip(names, values_per_trace))],
+                              figures.layout(title=f'{x.capitalize()} vs {y.capitalize()}', **layout_kwargs))
 
 
 def make_heatmap(values, xbins, ybins, labels, colorscale,
@@ -298,35 +285,36 @@ def make_heatmap(values, xbins, ybins, labels, colorscale,
     :param int ybins: Number of bins in the y direction
     :param np.array labels: n*n array of hover labels for the
     :param list colorscale: where to snap the min and max of the colorscale (ex, [0, 1])
-    :param colormap cmap: plotly colorscale, see du.matplotlib_to_plotly
+    :param colormap cmap: plotly colorscale, or a matplotlib colormap or its name (default viridis),
+                          see du.matplotlib_to_plotly
     :param dict layout_kwargs: Layout options for figure
     :return:
     """
 
+    if cmap is None:
+        cmap = 'viridis'
     if not isinstance(cmap, list):
         # if the cmap is a colormap, try to parse it to a plotly colorscale
         cmap = matplotlib_to_plotly(cmap, 4)
 
     if (xbins is None) or (ybins is None):  # wait what we don't do anything with the bins??
-        return{'data': [go.Heatmap(z=values.T,
-                                   colorscale=cmap,
-                                   zmin=colorscale[0],
-                                   zmax=colorscale[-1],
-                                   zsmooth='best')],
-               'layout': go.Layout(title=title,
-                                   **layout_kwargs)}
+        return figures.figure([figures.trace('heatmap',
+                                             z=values.T,
+                                             colorscale=cmap,
+                                             zmin=colorscale[0],
+                                             zmax=colorscale[-1],
+                                             zsmooth='best')],
+                              figures.layout(title=title, **layout_kwargs))
     else:
-        return {'data': [go.Heatmap(z=values.T,
-                                    colorscale=cmap,
-                                    zsmooth='best',
-                                    zmin=colorscale[0],
-                                    zmax=colorscale[-1],
-                                    text=labels.T,
-                                    hoverinfo=['text', 'z'])],
-                'layout': go.Layout(title=title,
-                                    height=800,
-                                    width=800,
-                                    **layout_kwargs,)}
+        return figures.figure([figures.trace('heatmap',
+                                             z=values.T,
+                                             colorscale=cmap,
+                                             zsmooth='best',
+                                             zmin=colorscale[0],
+                                             zmax=colorscale[-1],
+                                             text=labels.T,
+                                             hoverinfo=['text', 'z'])],
+                              figures.layout(title=title, height=800, width=800, **layout_kwargs))
 
 
 def make_go_list(go_strings):
@@ -362,22 +350,42 @@ def make_control_list(control_strings):
     return control_list
 
 
+@functools.lru_cache(maxsize=256)
+def _colorscale(rgb, pl_entries):
+    """Plotly colorscale of pl_entries colors, given as the bytes of an (pl_entries, 3) uint8 array."""
+    levels = np.linspace(0, 1, pl_entries)
+    colors = np.frombuffer(rgb, dtype=np.uint8).reshape(pl_entries, 3)
+    return tuple((float(level), f'rgb({r}, {g}, {b})') for level, (r, g, b) in zip(levels, colors))
+
+
 def matplotlib_to_plotly(cmap, pl_entries):
     """
-    Convert a matplotlib color map to a plotly colormap
+    Convert a matplotlib color map to a plotly colormap. The colormap is sampled in one
+    call and the conversion is cached by the sampled colors, so colormaps with the same
+    name but different colors get their own colorscale.
 
-    :param cmap cmap: matplotlib colormap. ex matplotlib.cm.get_cmap('viridis')
+    :param cmap cmap: matplotlib colormap or its name. ex matplotlib.cm.get_cmap('viridis')
     :param int pl_entries: number of colors
     :return: plotly colorscale
     """
-    h = 1.0/(pl_entries-1)
-    pl_colorscale = []
+    if isinstance(cmap, str):
+        cmap = plt.get_cmap(cmap)
+
+    rgb = (cmap(np.linspace(0, 1, pl_entries))[:, :3] * 255).astype(np.uint8)
+    # copies, so a caller can not change the cached colorscale
+    return [list(entry) for entry in _colorscale(rgb.tobytes(), pl_entries)]
 
-    for k in range(pl_entries):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
 
-    return pl_colorscale
+@functools.lru_cache(maxsize=256)
+def color_palette(name, n_colors):
+    """
+    Hex colors of a seaborn palette, cached by name and number of colors.
+
+    :param str name: name of the palette, ex 'viridis'
+    :param int n_colors: number of colors
+    :return tuple: hex color strings
+    """
+    return tuple(sns.palettes.color_palette(name, n_colors=n_colors).as_hex())
 
 
 def data_profile_tables(input_vars={}, col='', layout_kwargs={}, id=None):
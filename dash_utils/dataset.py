@@ -0,0 +1,218 @@
+"""
+Datasets shared by all callbacks of a process.
+
+The demos keep the uploaded data as a JSON string in a hidden container. Parsing it
+in every callback is expensive, so a DatasetStore parses every distinct string once
+and keeps the resulting Dataset under a key. The key is stored next to the data, e.g.
+in a dcc.Store, so callbacks find the Dataset by its key without reading the string;
+the string is only parsed when the key is not known, e.g. after a restart or on
+another worker process. A Dataset holds the DataFrame and indexes over it
+that are built on first use, such as the sort order of a column, the sorted values
+of a column that is brushed on (range queries) and the bitmaps of the values of a
+column that is filtered on (see dash_utils.filters). The parsed columns are stored in
+compact dtypes (see dash_utils.dtypes). The columns are hashed once when they are
+stored (see dash_utils.hashing), and the fingerprint of the Dataset keys its figures
+in the figure cache (see dash_utils.cache). Uploaded files are recognised by the hash of
+their bytes, so a file that is uploaded again is not parsed again.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .cache import register_fingerprint
+from .dtypes import optimise_dtypes
+from .filters import CategoryIndex
+from .hashing import column_hashes, dataset_fingerprint, hash_upload, index_hash
+
+
+class Dataset:
+    """
+    A DataFrame with lazily built indexes.
+
+    :param pd.DataFrame df: the data
+    :param str key: identifier of the data, e.g. a hash of its source
+    :param dict memory: (bytes as read, bytes stored) by column, see optimise_dtypes
+    :param dict hashes: content hash by column, computed if not given, see column_hashes
+    """
+
+    def __init__(self, df, key=None, memory=None, hashes=None):
+        self.df = df
+        self.key = key
+        self.memory = memory
+        self.column_hashes = hashes if hashes is not None else column_hashes(df)
+        self.fingerprint = dataset_fingerprint(self.column_hashes, index_hash(df.index))
+        register_fingerprint(df, self.fingerprint)
+        self._ranks = {}
+        self._orders = {}
+        self._category_indexes = {}
+        self._range_indexes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def ranks(self, col):
+        """
+        Dense rank of every row in a column, missing values rank last.
+
+        :param str col: name of the column
+        :return: integer ranks, number of distinct non-missing values
+        """
+        with self._lock:
+            if col not in self._ranks:
+                series = self.df[col]
+                try:
+                    codes, uniques = pd.factorize(series, sort=True)
+                except TypeError:
+                    # unorderable mix of types, sort on the string representation
+                    codes, uniques = pd.factorize(series.astype(str).where(series.notnull()), sort=True)
+                self._ranks[col] = np.where(codes < 0, len(uniques), codes), len(uniques)
+            return self._ranks[col]
+
+    def sort_order(self, col, ascending=True):
+        """
+        Row positions sorted by a column, missing values last. Ties keep the row order.
+
+        :param str col: name of the column
+        :param bool ascending: sort direction
+        :return np.array: row positions
+        """
+        ranks, n_unique = self.ranks(col)
+        key = (col, ascending)
+        with self._lock:
+            if key not in self._orders:
+                if not ascending:
+                    ranks = np.where(ranks < n_unique, n_unique - 1 - ranks, n_unique)
+                self._orders[key] = np.argsort(ranks, kind='stable')
+            return self._orders[key]
+
+    def range_index(self, col):
+        """
+        Rows of a numeric column sorted by value, missing values last.
+
+        :param str col: name of the column
+        :return: row positions, sorted values
+        """
+        with self._lock:
+            if col not in self._range_indexes:
+                values = self.df[col].to_numpy(dtype=float)
+                # NaN sorts last, so searches for finite bounds never include it
+                order = np.argsort(values, kind='stable')
+                self._range_indexes[col] = order, values[order]
+            return self._range_indexes[col]
+
+    def range_rows(self, col, low=None, high=None):
+        """
+        Rows with low <= value <= high, found with two binary searches in the range index.
+
+        :param str col: name of the column
+        :param float low: lower bound, None for no lower bound
+        :param float high: upper bound, None for no upper bound
+        :return np.array: row positions in the order of the values
+        """
+        order, values = self.range_index(col)
+        start = 0 if low is None else np.searchsorted(values, low, side='left')
+        stop = np.searchsorted(values, np.inf, side='right') if high is None else \
+            np.searchsorted(values, high, side='right')
+        return order[start:stop]
+
+    def category_index(self, col):
+        """
+        Bitmap index of the values of a column, see dash_utils.filters.
+
+        :param str col: name of the column
+        :return CategoryIndex: the index
+        """
+        with self._lock:
+            if col not in self._category_indexes:
+                self._category_indexes[col] = CategoryIndex(self.df[col])
+            return self._category_indexes[col]
+
+
+class DatasetStore:
+    """
+    Datasets by the key of the JSON string they are parsed from, least recently used ones are dropped.
+
+    :param int max_entries: number of datasets to keep
+    :param bool optimise: store the columns in compact dtypes
+    """
+
+    def __init__(self, max_entries=4, optimise=True):
+        self.max_entries = max_entries
+        self.optimise = optimise
+        self._datasets = OrderedDict()
+        self._uploads = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(raw_data):
+        return hashlib.blake2b(raw_data.encode(), digest_size=16).hexdigest()
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                return self._datasets[key]
+        return None
+
+    def get(self, raw_data, key=None):
+        """
+        Return the dataset of a JSON string in the 'split' orientation, parsing it if needed.
+
+        :param str raw_data: the data as stored in the data container
+        :param str key: the key of the dataset, see Dataset.key; a known key is found
+                        without reading raw_data
+        :return Dataset: the dataset, None if there is no data
+        """
+        if key is not None:
+            dataset = self._lookup(key)
+            if dataset is not None:
+                return dataset
+        if not raw_data:
+            return None
+        if isinstance(raw_data, list):
+            raw_data = raw_data[0]
+
+        key = self.make_key(raw_data)
+        dataset = self._lookup(key)
+        if dataset is not None:
+            return dataset
+
+        df = pd.read_json(io.StringIO(raw_data), orient='split')
+        memory = None
+        if self.optimise:
+            df, memory = optimise_dtypes(df)
+        dataset = Dataset(df, key=key, memory=memory)
+        with self._lock:
+            self._datasets[key] = dataset
+            if len(self._datasets) > self.max_entries:
+                self._datasets.popitem(last=False)
+        return dataset
+
+    def upload(self, contents, read):
+        """
+        Store an uploaded file. A file with the same bytes as an earlier upload is not read
+        again, it gets the data of that upload, and with it its Dataset and cached figures.
+
+        :param str contents: the 'contents' of a dcc.Upload, a base64 data URL
+        :param read: function that reads the bytes of the file into a DataFrame
+        :return: the data as stored in the data container and the key of its Dataset, see get
+        """
+        upload_hash, decoded = hash_upload(contents)
+        with self._lock:
+            if upload_hash in self._uploads:
+                self._uploads.move_to_end(upload_hash)
+                return self._uploads[upload_hash]
+
+        raw_data = read(decoded).to_json(orient='split')
+        # parsed, compacted and hashed once, for all callbacks
+        key = self.get(raw_data).key
+        with self._lock:
+            self._uploads[upload_hash] = raw_data, key
+            if len(self._uploads) > self.max_entries:
+                self._uploads.popitem(last=False)
+        return raw_data, key
@@ -0,0 +1,141 @@
+"""
+Compact dtypes for uploaded data.
+
+pd.read_csv and pd.read_json give int64 and float64 columns and Python object strings.
+optimise_dtypes stores every column in the smallest dtype that keeps its values:
+
+* integers in the smallest (unsigned) integer dtype of their range
+* floats in float32 when every value survives the round trip, float64 otherwise
+* text with few distinct values (e.g. the hue columns 'cut', 'color', 'clarity') as
+  category, which keeps one small integer code per row
+
+The memory of every column before and after is reported, e.g. for the 'Memory size'
+row of data_profile_tables.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# text columns with at most this fraction of distinct values become categorical
+CATEGORY_FRACTION = 0.5
+
+
+def _downcast_integers(series):
+    if series.empty:
+        return series
+    low, high = series.min(), series.max()
+    candidates = (np.uint8, np.uint16, np.uint32) if low >= 0 else (np.int8, np.int16, np.int32)
+    for dtype in candidates:
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            if np.dtype(dtype).itemsize < series.dtype.itemsize:
+                return series.astype(dtype)
+            break
+    return series
+
+
+def _downcast_floats(series):
+    if series.dtype.itemsize <= 4:
+        return series
+    values = series.to_numpy()
+    with np.errstate(over='ignore'):
+        compact = values.astype(np.float32)
+    # only when no value changes, NaN stays NaN
+    if np.array_equal(compact.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(compact, index=series.index, name=series.name)
+    return series
+
+
+def _to_category(series, category_fraction):
+    if not len(series):
+        return series
+    try:
+        codes, uniques = pd.factorize(series, sort=True)
+    except TypeError:
+        # unorderable mix of types
+        return series
+    if len(uniques) > category_fraction * len(series):
+        return series
+    return pd.Series(pd.Categorical.from_codes(codes, uniques), index=series.index, name=series.name)
+
+
+def _memory(series, optimised):
+    """Bytes of a column before and after optimising it."""
+    after = int(optimised.memory_usage(index=False, deep=True))
+    if optimised is not series and series.dtype == object and isinstance(optimised.dtype, pd.CategoricalDtype):
+        # the deep size of an object column is the sum of the sizes of its objects; equal
+        # strings have equal sizes, so the categories and their counts give it quickly
+        codes = optimised.cat.codes.to_numpy()
+        sizes = np.array([sys.getsizeof(value) for value in optimised.cat.categories], dtype=np.int64)
+        counts = np.bincount(codes[codes >= 0], minlength=len(sizes))
+        missing = series.iloc[np.flatnonzero(codes < 0)]
+        before = series.to_numpy().nbytes + int(sizes @ counts) + \
+            int(missing.memory_usage(index=False, deep=True)) - missing.to_numpy().nbytes
+        return before, after
+    return int(series.memory_usage(index=False, deep=True)), after
+
+
+def optimise_series(series, category_fraction=CATEGORY_FRACTION):
+    """
+    The column in the smallest dtype that keeps its values.
+
+    :param pd.Series series: the column
+    :param float category_fraction: text columns with at most this fraction of distinct values become categorical
+    :return pd.Series: the column, itself if the dtype does not change
+    """
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return series
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        return _downcast_integers(series)
+    if pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        return _downcast_floats(series)
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return _to_category(series, category_fraction)
+    return series
+
+
+def optimise_dtypes(df, category_fraction=CATEGORY_FRACTION):
+    """
+    Store every column of a DataFrame in the smallest dtype that keeps its values.
+
+    :param pd.DataFrame df: the data, it is not changed
+    :param float category_fraction: text columns with at most this fraction of distinct values become categorical
+    :return: optimised DataFrame, dict of (bytes before, bytes after) by column
+    """
+    columns = []
+    memory = {}
+    for col, series in df.items():
+        optimised = optimise_series(series, category_fraction)
+        columns.append(optimised)
+        memory[col] = _memory(series, optimised)
+
+    if not columns:
+        return df.copy(), memory
+    return pd.concat(columns, axis=1), memory
+
+
+def format_bytes(n_bytes):
+    """
+    Human readable size, e.g. '1.5 MiB'.
+
+    :param int n_bytes: number of bytes
+    :return str: the size
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(n_bytes) < 1024 or unit == 'GiB':
+            return f'{n_bytes:.0f} {unit}' if unit == 'B' else f'{n_bytes:.1f} {unit}'
+        n_bytes /= 1024
+
+
+def memory_size(before, after):
+    """
+    Text for the 'Memory size' row of data_profile_tables, e.g. '1.2 MiB (was 7.6 MiB, -84%)'.
+
+    :param int before: bytes of the column as read
+    :param int after: bytes of the optimised column
+    :return str: the text
+    """
+    if after >= before:
+        return format_bytes(after)
+    return f'{format_bytes(after)} (was {format_bytes(before)}, -{1 - after / before:.0%})'
@@ -0,0 +1,80 @@
+"""
+Figures as plain dicts.
+
+Graph objects (go.Histogram, go.Layout, ...) validate every property when they are made
+and copy every array, which costs more than building the figure itself for large data or
+many traces. The builders of dash_utils therefore make figures as plain dicts in plotly's
+schema with trace and layout, which dash sends to the browser as they are.
+
+Mistakes in property names are then only noticed by plotly.js. In strict mode, which the
+tests switch on with strict_figures() or by setting the environment variable
+DASH_UTILS_STRICT_FIGURES=1, every figure is also validated by the graph objects and an
+invalid property raises a ValueError.
+"""
+import contextlib
+import os
+
+import plotly.graph_objs as go
+
+_strict = os.environ.get('DASH_UTILS_STRICT_FIGURES', '') not in ('', '0')
+
+
+@contextlib.contextmanager
+def strict_figures(strict=True):
+    """
+    Validate the figures made within the context with plotly's graph objects.
+
+    :param bool strict: switch validation on or off
+    """
+    global _strict
+    previous, _strict = _strict, strict
+    try:
+        yield
+    finally:
+        _strict = previous
+
+
+def _title(props):
+    # a string title is the short form of {'text': title}, which plotly.js 3 no longer reads
+    if isinstance(props.get('title'), str):
+        props['title'] = {'text': props['title']}
+    return props
+
+
+def trace(trace_type, **props):
+    """
+    A trace, e.g. trace('histogram', x=values, nbinsx=10).
+
+    :param str trace_type: the plotly type of the trace, e.g. 'scattergl'
+    :param props: properties of the trace
+    :return dict: the trace
+    """
+    return {'type': trace_type, **props}
+
+
+def layout(**props):
+    """
+    A layout. Titles of the figure and of the axes may be given as strings.
+
+    :param props: properties of the layout, values may be dicts or graph objects
+    :return dict: the layout
+    """
+    _title(props)
+    for key, value in props.items():
+        if key.startswith(('xaxis', 'yaxis')) and isinstance(value, dict):
+            props[key] = _title(dict(value))
+    return props
+
+
+def figure(data, layout):
+    """
+    A figure for the 'figure' property of a dcc.Graph, validated in strict mode.
+
+    :param list data: the traces
+    :param dict layout: the layout
+    :return dict: dict with 'data' and 'layout'
+    """
+    result = {'data': data, 'layout': layout}
+    if _strict:
+        go.Figure(result)
+    return result
@@ -0,0 +1,168 @@
+"""
+Row filters on category values, evaluated with bitmap indexes.
+
+For every column that is filtered on, a CategoryIndex stores one packed bitmap
+(np.packbits, one bit per row) per distinct value. It is built once per Dataset,
+in one pass over the rows. A filter expression is then evaluated
+with bitwise operations on those bitmaps, which touches n_rows / 8 bytes per
+operand instead of comparing every row. Missing values are a value of their own,
+None. Columns with more than MAX_BITMAP_VALUES distinct values, e.g. identifiers,
+would need about a bitmap per row; their index keeps the integer codes of the values and
+evaluates a condition with np.isin instead.
+
+Filter expressions:
+
+* ``{'column': 'cut', 'values': ['Ideal', 'Good']}``: rows with one of the values
+* ``{'and': [expression, ...]}`` and ``{'or': [expression, ...]}``
+* ``{'not': expression}``
+* ``{'cut': ['Ideal', 'Good'], 'color': ['E']}``: shorthand for the 'and' of one
+  condition per column
+
+A condition without values does not restrict the rows. The result of a filter is a
+boolean mask (filter_rows) that can be passed as sel to make_histogram, make_scatter
+and table_page.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# columns with more distinct values are filtered with np.isin instead of bitmaps
+MAX_BITMAP_VALUES = 64
+
+
+def _is_missing(value):
+    return value is None or (pd.api.types.is_scalar(value) and pd.isna(value))
+
+
+def packed_bitmaps(codes, n_values):
+    """
+    Packed bitmap of the rows of every code, in one pass over the rows.
+
+    The rows are taken eight at a time, one per bit of a byte. For every bit the
+    byte of each group of eight rows is set in the bitmap of the code of its row,
+    so the work does not grow with the number of codes.
+
+    :param np.array codes: integer code of every row, from 0 to n_values - 1
+    :param int n_values: number of codes
+    :return np.array: uint8 array of shape (n_values, ceil(n_rows / 8))
+    """
+    n_bytes = math.ceil(len(codes) / 8)
+    # the padding rows of the last byte go to an extra bitmap that is dropped
+    bitmaps = np.zeros((n_values + 1, n_bytes), dtype=np.uint8)
+    padded = np.full(n_bytes * 8, n_values, dtype=np.min_scalar_type(n_values))
+    padded[:len(codes)] = codes
+    padded = padded.reshape(n_bytes, 8)
+    columns = np.arange(n_bytes)
+    for bit in range(8):
+        bitmaps[padded[:, bit], columns] |= np.uint8(128 >> bit)
+    return bitmaps[:n_values]
+
+
+class CategoryIndex:
+    """
+    Packed bitmap of the rows of every value of a column.
+
+    :param pd.Series series: the column
+    :param int max_values: number of distinct values up to which bitmaps are built
+    """
+
+    def __init__(self, series, max_values=MAX_BITMAP_VALUES):
+        codes, uniques = pd.factorize(series)
+        self.values = list(uniques)
+        if (codes < 0).any():
+            # missing values can be selected as None
+            codes = np.where(codes < 0, len(uniques), codes)
+            self.values.append(None)
+        codes = codes.astype(np.min_scalar_type(len(self.values)), copy=False)
+
+        self.n_rows = len(series)
+        self._positions = {value: i for i, value in enumerate(self.values)}
+        if len(self.values) <= max_values:
+            self.bitmaps, self.codes = packed_bitmaps(codes, len(self.values)), None
+        else:
+            self.bitmaps, self.codes = None, codes
+
+    def bitmap(self, values):
+        """
+        Rows with any of the values. Values that do not occur select no rows.
+
+        :param list values: the values, None or nan for the missing values
+        :return np.array: packed bitmap
+        """
+        values = [None if _is_missing(value) else value for value in values]
+        positions = [self._positions[value] for value in values if value in self._positions]
+        if not positions:
+            return self.empty()
+        if self.bitmaps is None:
+            return np.packbits(np.isin(self.codes, positions))
+        return np.bitwise_or.reduce(self.bitmaps[positions], axis=0)
+
+    def empty(self):
+        return np.zeros(math.ceil(self.n_rows / 8), dtype=np.uint8)
+
+
+def to_mask(bitmap, n_rows):
+    """
+    Boolean mask of a packed bitmap.
+
+    :param np.array bitmap: packed bitmap
+    :param int n_rows: number of rows
+    :return np.array: boolean mask
+    """
+    return np.unpackbits(bitmap, count=n_rows).view(bool)
+
+
+def evaluate(dataset, expression):
+    """
+    Evaluate a filter expression to a packed bitmap.
+
+    :param Dataset dataset: the data, which caches the category indexes
+    :param dict expression: filter expression, see the module documentation
+    :return np.array: packed bitmap, None if the expression does not restrict the rows
+    """
+    if not expression:
+        return None
+
+    if 'column' in expression:
+        values = expression.get('values')
+        if values is None or (isinstance(values, (list, tuple)) and len(values) == 0):
+            return None
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        return dataset.category_index(expression['column']).bitmap(values)
+
+    if 'not' in expression:
+        bitmap = evaluate(dataset, expression['not'])
+        if bitmap is None:
+            return None
+        # the padding bits of the last byte stay set, to_mask ignores them
+        return np.invert(bitmap)
+
+    if 'and' in expression or 'or' in expression:
+        operator = 'and' if 'and' in expression else 'or'
+        bitmaps = [evaluate(dataset, part) for part in expression[operator]]
+        if operator == 'or' and any(bitmap is None for bitmap in bitmaps):
+            # one part allows all rows
+            return None
+        bitmaps = [bitmap for bitmap in bitmaps if bitmap is not None]
+        if not bitmaps:
+            return None
+        ufunc = np.bitwise_and if operator == 'and' else np.bitwise_or
+        return ufunc.reduce(bitmaps, axis=0)
+
+    return evaluate(dataset, {'and': [{'column': column, 'values': values}
+                                      for column, values in expression.items()]})
+
+
+def filter_rows(dataset, expression):
+    """
+    Boolean mask of the rows that match a filter expression.
+
+    :param Dataset dataset: the data
+    :param dict expression: filter expression, see the module documentation
+    :return np.array: boolean mask, None if the expression does not restrict the rows
+    """
+    bitmap = evaluate(dataset, expression)
+    return None if bitmap is None else to_mask(bitmap, len(dataset))
@@ -0,0 +1,199 @@
+"""
+Grids of graphs with pattern-matching ids, served by one callback per grid.
+
+figure_grid gives its graphs the ids fig_0, fig_1, ... and every graph needs its own
+callback, so the number of callbacks, and the work of dash to resolve them, grows with
+the number of graphs. A FigureGrid gives its graphs and their controls dict ids
+{'grid': name, 'kind': kind, 'index': i}. One callback with MATCH ids then serves all
+graphs of the grid: when the controls of one graph change, dash calls it for that graph
+only, and a shared input such as a filter calls it once per graph.
+
+    histograms = FigureGrid('histogram', 12)
+    bins = histograms.controls('bins', dcc.Slider, min=1, max=100, value=30)
+
+    @histograms.callback(app, [Input(histograms.id('bins'), 'value')])
+    def make_histograms(index, bins):
+        return make_histogram(df, columns[index], bins)
+
+The callback returns the figure of graph index, or None to leave it as it is. Updates
+are encoded (see encode_figure) and sent as differences with the figure in the browser
+(see FigureStates).
+
+With per_tab, the graphs are put on tabs of per_tab graphs and only the graphs of the
+open tab are computed. A graph on another tab is marked stale when its inputs change,
+and computed when its tab is opened.
+"""
+import dash
+import dash_core_components as dcc
+from dash.dependencies import ALL, MATCH, Input, Output, State
+
+from . import theme
+from .dash_utils import column, row
+from .encoding import encode_figure
+from .patches import FigureStates
+
+_WIDTHS = ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'eleven', 'twelve']
+
+
+def grid_layout(children, n_columns=2, width=10):
+    """
+    Rows of n_columns components.
+
+    :param list children: the components, or lists of components, e.g. graphs
+    :param int n_columns: number of columns
+    :param int width: width of a row, in columns of the twelve column layout
+    :return list: html.Div rows
+    """
+    class_name = f'{_WIDTHS[max(width // n_columns, 1) - 1]} columns'
+    return [row([column(child if isinstance(child, list) else [child], className=class_name)
+                 for child in children[start:start + n_columns]])
+            for start in range(0, len(children), n_columns)]
+
+
+def triggered_grid_ids():
+    """
+    Pattern-matching ids of the components that triggered the current callback.
+
+    :return list: dict ids, empty on the initial call of a callback
+    """
+    return [component_id for component_id in dash.callback_context.triggered_prop_ids.values()
+            if isinstance(component_id, dict)]
+
+
+class FigureGrid:
+    """
+    Graphs with pattern-matching ids, and the controls of every graph.
+
+    :param str name: name of the grid, unique in the app
+    :param int n_figures: number of graphs
+    :param list fig_names: titles of the empty graphs
+    :param int per_tab: number of graphs per tab, None to show all graphs
+    """
+
+    def __init__(self, name, n_figures, fig_names=None, per_tab=None):
+        self.name = name
+        self.n_figures = n_figures
+        self.fig_names = fig_names or [f'{name} {i}' for i in range(n_figures)]
+        self.per_tab = per_tab
+        self.figure_states = FigureStates(max_entries=max(64, 4 * n_figures))
+
+    def tab(self, index):
+        """The tab of a graph, 0 without tabs."""
+        return index // self.per_tab if self.per_tab else 0
+
+    def id(self, kind, index=MATCH):
+        """
+        Id of a component of the grid.
+
+        :param str kind: kind of component, 'graph', 'token' or the name of a control
+        :param index: index of the graph, or MATCH or ALL
+        :return dict: the id
+        """
+        return {'grid': self.name, 'kind': kind, 'index': index}
+
+    def graphs(self, **kwargs):
+        """
+        The graphs, each followed by the dcc.Store with the token of its figure and with
+        tabs by the stores that say if it is visible and if it is stale.
+
+        :param kwargs: other arguments of dcc.Graph
+        :return list: the components
+        """
+        kwargs.setdefault('style', {'width': '100%'})
+        graphs = []
+        for i in range(self.n_figures):
+            graph = [dcc.Graph(id=self.id('graph', i), figure=theme.base_figure(title=self.fig_names[i]), **kwargs),
+                     dcc.Store(id=self.id('token', i))]
+            if self.per_tab:
+                graph += [dcc.Store(id=self.id('visible', i), data=self.tab(i) == 0),
+                          dcc.Store(id=self.id('stale', i), data=True)]
+            graphs.append(graph)
+        return graphs
+
+    def layout(self, n_columns=2, width=10, **kwargs):
+        """
+        The graphs in rows of n_columns, the pattern-matching version of figure_grid.
+
+        :param int n_columns: number of columns
+        :param int width: width of a row, in columns of the twelve column layout
+        :param kwargs: other arguments of dcc.Graph
+        :return list: html.Div rows, or a dcc.Tabs with the rows of every tab
+        """
+        graphs = self.graphs(**kwargs)
+        if not self.per_tab:
+            return grid_layout(graphs, n_columns, width)
+
+        n_tabs = self.tab(self.n_figures - 1) + 1
+        tabs = [dcc.Tab(grid_layout(graphs[tab * self.per_tab:(tab + 1) * self.per_tab], n_columns, width),
+                        label=f'{tab * self.per_tab} - {min((tab + 1) * self.per_tab, self.n_figures) - 1}',
+                        value=str(tab))
+                for tab in range(n_tabs)]
+        return [dcc.Tabs(tabs, id=self.id('tabs', 0), value='0')]
+
+    def controls(self, kind, component, values=None, **kwargs):
+        """
+        A control of every graph, e.g. controls('bins', dcc.Slider, min=1, max=100).
+
+        :param str kind: name of the control, used in its id
+        :param component: component class, e.g. dcc.Dropdown
+        :param list values: the initial value of the control of every graph
+        :param kwargs: other arguments of the component
+        :return list: the controls, by index
+        """
+        controls = []
+        for i in range(self.n_figures):
+            if values is not None:
+                kwargs['value'] = values[i]
+            controls.append(component(id=self.id(kind, i), **kwargs))
+        return controls
+
+    def callback(self, app, inputs, state=()):
+        """
+        Register one callback for the figures of all graphs.
+
+        The decorated function gets the index of the graph and the values of the inputs
+        and state, and returns the figure or None. With tabs it is only called for the
+        graphs of the open tab.
+
+        :param app: the Dash app
+        :param list inputs: dash Inputs, MATCH ids of the grid for the controls of a graph
+        :param list state: dash States
+        """
+        inputs, n_inputs = list(inputs), len(inputs)
+
+        def decorator(function):
+            if not self.per_tab:
+                @app.callback([Output(self.id('graph'), 'figure'), Output(self.id('token'), 'data')],
+                              inputs, [*state, State(self.id('token'), 'data')])
+                def update(*args):
+                    *args, token = args
+                    return self._update(function, args, token)
+                return function
+
+            @app.callback([Output(self.id('graph'), 'figure'), Output(self.id('token'), 'data'),
+                           Output(self.id('stale'), 'data')],
+                          [*inputs, Input(self.id('visible'), 'data')],
+                          [*state, State(self.id('token'), 'data'), State(self.id('stale'), 'data')])
+            def update_visible(*args):
+                visible, token, stale = args[n_inputs], args[-2], args[-1]
+                tab_changed = {i['kind'] for i in triggered_grid_ids()} == {'visible'}
+                if not visible:
+                    # computed when its tab is opened, if its inputs changed in the meantime
+                    return dash.no_update, dash.no_update, dash.no_update if tab_changed else True
+                if tab_changed and not stale:
+                    return dash.no_update, dash.no_update, dash.no_update
+                return (*self._update(function, args[:n_inputs] + args[n_inputs + 1:-2], token), False)
+
+            @app.callback(Output(self.id('visible', ALL), 'data'), [Input(self.id('tabs', 0), 'value')])
+            def update_tabs(tab):
+                return [self.tab(output['id']['index']) == int(tab) for output in dash.callback_context.outputs_list]
+
+            return function
+        return decorator
+
+    def _update(self, function, args, token):
+        index = dash.callback_context.outputs_list[0]['id']['index']
+        figure = function(index, *args)
+        if figure is None or figure is dash.no_update:
+            return dash.no_update, dash.no_update
+        return self.figure_states.update(token, encode_figure(figure))
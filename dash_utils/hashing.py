@@ -0,0 +1,123 @@
+"""
+Content hashes of the columns of a DataFrame, computed once when the data is stored.
+
+A cache in front of the builders needs a key for the data. Hashing a large frame with
+pd.util.hash_pandas_object on every callback costs more than most of the work it saves,
+so DatasetStore hashes every column once when it parses the data and keeps the hashes
+with the Dataset. Numeric, boolean and datetime columns are hashed over their raw
+buffers, categorical columns over their codes and categories, and other columns, e.g.
+strings, over the row hashes of pandas. The column hashes are combined into the
+fingerprint of the dataset, which keys the figure cache (see dash_utils.cache).
+
+hash_upload decodes a file uploaded with dcc.Upload and hashes its bytes, so an upload
+of a file that is already stored is recognised before it is parsed.
+
+The hashes use xxhash (xxh3_128) when it is installed, and blake2b otherwise. Both give
+the same hash in every process, but not the same hash as each other.
+"""
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+# bytes hashed at a time
+UPLOAD_CHUNK = 4 * 2 ** 20
+
+
+def _hasher():
+    return xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+
+
+def _buffers(values):
+    """Byte buffers with the contents of a Series or Index."""
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        yield np.ascontiguousarray(values.cat.codes.to_numpy() if isinstance(values, pd.Series)
+                                   else values.codes).view(np.uint8)
+        yield from _buffers(pd.Series(dtype.categories))
+    elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        yield np.ascontiguousarray(values.to_numpy()).view(np.uint8)
+    elif isinstance(values.array, (pd.arrays.BooleanArray, pd.arrays.IntegerArray, pd.arrays.FloatingArray)):
+        # nullable dtypes: the values and the mask of missing values
+        yield np.ascontiguousarray(values.to_numpy(dtype=dtype.numpy_dtype, na_value=0)).view(np.uint8)
+        yield np.ascontiguousarray(values.isna()).view(np.uint8)
+    else:
+        yield pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy().view(np.uint8)
+
+
+def content_hash(values, name=None):
+    """
+    Hash of the name, dtype and values of a Series or Index.
+
+    :param values: pd.Series or pd.Index
+    :param name: name to include in the hash, default the name of the values
+    :return str: hex digest
+    """
+    hasher = _hasher()
+    name = values.name if name is None else name
+    hasher.update(json.dumps([str(name), str(values.dtype), len(values)]).encode())
+    for buffer in _buffers(values):
+        hasher.update(buffer)
+    return hasher.hexdigest()
+
+
+def column_hashes(df):
+    """
+    Content hash of every column of a DataFrame.
+
+    :param pd.DataFrame df: the data
+    :return OrderedDict: hex digest by column name
+    """
+    return OrderedDict((col, content_hash(df[col], name=col)) for col in df.columns)
+
+
+def index_hash(index):
+    """
+    Hash of an index, without reading a RangeIndex.
+
+    :param pd.Index index: the index
+    :return str: hex digest
+    """
+    if isinstance(index, pd.RangeIndex):
+        hasher = _hasher()
+        hasher.update(json.dumps(['RangeIndex', index.start, index.stop, index.step]).encode())
+        return hasher.hexdigest()
+    return content_hash(index, name='index')
+
+
+def dataset_fingerprint(hashes, index=None):
+    """
+    Fingerprint of a dataset from the hashes of its columns, in their order.
+
+    :param dict hashes: hex digest by column name, see column_hashes
+    :param str index: hash of the index, see index_hash
+    :return str: hex digest
+    """
+    hasher = _hasher()
+    hasher.update(json.dumps([[str(col), value] for col, value in hashes.items()] + [index]).encode())
+    return hasher.hexdigest()
+
+
+def hash_upload(contents, chunk_size=UPLOAD_CHUNK):
+    """
+    Decode an upload and hash its bytes.
+
+    :param str contents: the 'contents' of a dcc.Upload, a base64 data URL
+    :param int chunk_size: number of bytes to hash at a time
+    :return: hex digest, the decoded bytes
+    """
+    decoded = base64.b64decode(contents.split(',', 1)[1])
+    hasher = _hasher()
+    view = memoryview(decoded)
+    for start in range(0, len(view), chunk_size):
+        hasher.update(view[start:start + chunk_size])
+    return hasher.hexdigest(), decoded
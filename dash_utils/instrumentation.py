@@ -0,0 +1,259 @@
+"""
+Latency and payload size instrumentation of Dash callbacks.
+
+instrument(app) wraps every callback registered on the app after the call. Per
+callback id (the outputs of the callback, e.g. ``heatmap.figure``) it records the
+wall time, the CPU time of the handling thread, and the sizes of the request and of
+the response. The sizes are the Content-Length of the HTTP messages, so the response
+is not serialised a second time to measure it. The last samples are kept to report
+percentiles, totals are kept since the start of the process.
+
+The numbers are available as a table (CallbackStats.summary) and in the Prometheus
+text format (CallbackStats.prometheus), see metrics_response to serve them from the
+Flask server of the app. record_requests stores the callback requests of a session
+for the load test in benchmarks/bench_load.py.
+"""
+import functools
+import json
+import threading
+import time
+from collections import deque, OrderedDict
+
+import dash
+import numpy as np
+import pandas as pd
+import plotly
+from flask import Response, g, has_request_context, request
+
+# name, help text and unit of every recorded metric
+METRICS = OrderedDict([
+    ('wall', ('Wall time of the callback', 'seconds')),
+    ('cpu', ('CPU time of the thread handling the callback', 'seconds')),
+    ('response', ('Size of the callback response', 'bytes')),
+    ('input', ('Size of the callback request with the inputs and states', 'bytes')),
+])
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentiles(values, quantiles=QUANTILES):
+    """
+    Percentiles of a list of samples.
+
+    :param list values: the samples
+    :param tuple quantiles: quantiles between 0 and 1
+    :return list: one value per quantile, nan if there are no samples
+    """
+    if len(values) == 0:
+        return [np.nan] * len(quantiles)
+    return list(np.percentile(values, [100 * q for q in quantiles]))
+
+
+def json_size(obj):
+    """Number of bytes of obj serialised the way Dash does it, 0 if it is not serialisable."""
+    if obj is dash.no_update:
+        return 0
+    try:
+        return len(json.dumps(obj, cls=plotly.utils.PlotlyJSONEncoder))
+    except (TypeError, ValueError):
+        return 0
+
+
+def callback_id(output):
+    """
+    Id of a callback: its outputs as ``component_id.property``, separated by commas.
+
+    :param output: Output or list of Outputs of the callback
+    :return str: the id
+    """
+    outputs = output if isinstance(output, (list, tuple)) else [output]
+    return ','.join(str(out) for out in outputs)
+
+
+class CallbackStats:
+    """
+    Thread safe store of the measurements of all callbacks.
+
+    :param int window: number of samples per callback to calculate percentiles from
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = OrderedDict()
+        self._totals = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, callback, error=False, **values):
+        """
+        Add a sample of a callback.
+
+        :param str callback: callback id
+        :param bool error: the callback raised an exception
+        :param values: a value for every metric in METRICS
+        """
+        with self._lock:
+            if callback not in self._samples:
+                self._samples[callback] = {name: deque(maxlen=self.window) for name in METRICS}
+                self._totals[callback] = dict({name: 0. for name in METRICS}, count=0, errors=0)
+
+            totals = self._totals[callback]
+            for name in METRICS:
+                self._samples[callback][name].append(values[name])
+                totals[name] += values[name]
+            totals['count'] += 1
+            totals['errors'] += int(error)
+
+    def callbacks(self):
+        with self._lock:
+            return list(self._samples)
+
+    def samples(self, callback, metric):
+        """The recent samples of one metric of a callback."""
+        with self._lock:
+            return list(self._samples[callback][metric])
+
+    def summary(self):
+        """
+        Calls, errors and the p50/p95/p99 of every metric per callback, slowest first.
+
+        :return pd.DataFrame: one row per callback
+        """
+        rows = []
+        with self._lock:
+            for callback, samples in self._samples.items():
+                row = OrderedDict(callback=callback,
+                                  calls=self._totals[callback]['count'],
+                                  errors=self._totals[callback]['errors'])
+                for name in METRICS:
+                    for q, value in zip(QUANTILES, percentiles(samples[name])):
+                        row[f'{name} p{int(100 * q)}'] = value
+                rows.append(row)
+
+        columns = ['callback', 'calls', 'errors'] + [f'{name} p{int(100 * q)}' for name in METRICS
+                                                     for q in QUANTILES]
+        summary = pd.DataFrame(rows, columns=columns)
+        return summary.sort_values('wall p95', ascending=False).reset_index(drop=True)
+
+    def prometheus(self, prefix='dash_callback'):
+        """
+        All measurements in the Prometheus text exposition format, as summaries per metric.
+
+        :param str prefix: prefix of the metric names
+        :return str: the text
+        """
+        lines = []
+        with self._lock:
+            for name, (description, unit) in METRICS.items():
+                metric = f'{prefix}_{name}_{unit}'
+                lines.append(f'# HELP {metric} {description}')
+                lines.append(f'# TYPE {metric} summary')
+                for callback, samples in self._samples.items():
+                    label = callback.replace('\\', '\\\\').replace('"', '\\"')
+                    for q, value in zip(QUANTILES, percentiles(samples[name])):
+                        lines.append(f'{metric}{{callback="{label}",quantile="{q}"}} {value:.6g}')
+                    lines.append(f'{metric}_sum{{callback="{label}"}} {self._totals[callback][name]:.6g}')
+                    lines.append(f'{metric}_count{{callback="{label}"}} {self._totals[callback]["count"]}')
+
+            metric = f'{prefix}_errors_total'
+            lines.append(f'# HELP {metric} Number of callbacks that raised an exception')
+            lines.append(f'# TYPE {metric} counter')
+            for callback, totals in self._totals.items():
+                label = callback.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{metric}{{callback="{label}"}} {totals["errors"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def instrument(app, stats=None):
+    """
+    Measure every callback that is registered on the app from now on.
+
+    :param dash.Dash app: the app
+    :param CallbackStats stats: where to record the measurements, default a new one
+    :return CallbackStats: the measurements, also available as app.callback_stats
+    """
+    stats = stats if stats is not None else CallbackStats()
+    register = app.callback
+
+    @functools.wraps(register)
+    def callback(*args, **kwargs):
+        decorator = register(*args, **kwargs)
+        name = callback_id(kwargs['output'] if 'output' in kwargs else args[0])
+
+        def wrap(func):
+
+            @functools.wraps(func)
+            def measured(*func_args, **func_kwargs):
+                start_wall, start_cpu = time.perf_counter(), time.thread_time()
+                error = False
+                try:
+                    return func(*func_args, **func_kwargs)
+                except dash.exceptions.PreventUpdate:
+                    raise
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    sample = dict(callback=name, error=error, wall=time.perf_counter() - start_wall,
+                                  cpu=time.thread_time() - start_cpu)
+                    if has_request_context():
+                        # recorded with the sizes when the response is ready
+                        g.callback_sample = sample
+                    else:
+                        stats.record(response=0, input=0, **sample)
+
+            return decorator(measured)
+
+        return wrap
+
+    @app.server.after_request
+    def record_sizes(response):
+        sample = g.pop('callback_sample', None)
+        if sample is not None:
+            stats.record(response=response.content_length or 0, input=request.content_length or 0, **sample)
+        return response
+
+    @app.server.teardown_request
+    def record_errors(exception):
+        # a callback that raised may not get to after_request
+        sample = g.pop('callback_sample', None)
+        if sample is not None:
+            stats.record(response=0, input=request.content_length or 0, **sample)
+
+    app.callback = callback
+    app.callback_stats = stats
+    return stats
+
+
+def metrics_response(stats, *others):
+    """
+    Flask view function that serves the measurements in the Prometheus text format, e.g.
+    ``server.add_url_rule('/metrics', 'metrics', metrics_response(stats))``.
+
+    :param CallbackStats stats: the measurements
+    :param others: other sources of metrics with a prometheus method, e.g. a FigureCache
+    :return: view function
+    """
+    def metrics():
+        return Response(''.join(source.prometheus() for source in (stats, *others)),
+                        mimetype='text/plain; version=0.0.4')
+
+    return metrics
+
+
+def record_requests(server, path):
+    """
+    Append the body of every callback request to a JSON lines file, to replay them
+    later with benchmarks/bench_load.py.
+
+    :param flask.Flask server: the Flask server of the app
+    :param str path: file to append to
+    """
+    lock = threading.Lock()
+
+    @server.before_request
+    def record():
+        if request.path.endswith('_dash-update-component') and request.method == 'POST':
+            line = json.dumps(request.get_json(silent=True))
+            with lock, open(path, 'a') as f:
+                f.write(line + '\n')
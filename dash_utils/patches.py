@@ -0,0 +1,123 @@
+"""
+Partial figure updates computed from the difference with the previous figure.
+
+A callback that outputs the 'figure' of a dcc.Graph normally sends the complete figure,
+even when only the bins of a histogram or the values of a heatmap changed. FigureStates
+keeps the last figure sent to every graph on the server and answers with a dash.Patch
+that only holds the properties that differ: changed layout properties, and per trace
+only the changed arrays.
+
+The browser and the server must agree on the previous figure. Every figure that is sent
+gets a new token, which the callback also writes to a dcc.Store next to the graph and
+reads back as State with the next request. When the token is unknown, e.g. after a page
+reload, a restart of the server or on another worker process, the complete figure is
+sent.
+
+    @app.callback([Output('fig', 'figure'), Output('fig_token', 'data')],
+                  [Input('bins', 'value')],
+                  [State('fig_token', 'data')])
+    def update(bins, token):
+        return figure_states.update(token, make_histogram(df, 'x', bins))
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+import dash
+import numpy as np
+
+
+def _equal(a, b):
+    """Equality of figure properties, which may be or contain NumPy arrays."""
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        a, b = np.asarray(a), np.asarray(b)
+        return a.shape == b.shape and a.dtype == b.dtype and np.array_equal(a, b, equal_nan=a.dtype.kind == 'f')
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_equal(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    if type(a) is not type(b) and not (np.isscalar(a) and np.isscalar(b)):
+        return False
+    return a == b
+
+
+def _as_dict(value):
+    return value.to_plotly_json() if hasattr(value, 'to_plotly_json') else dict(value)
+
+
+def _diff_properties(patch, previous, current):
+    """Patch the properties of a dict that changed, were added or were removed."""
+    n_operations = 0
+    for key, value in current.items():
+        if key not in previous or not _equal(previous[key], value):
+            patch[key] = value
+            n_operations += 1
+    for key in previous.keys() - current.keys():
+        del patch[key]
+        n_operations += 1
+    return n_operations
+
+
+def figure_patch(previous, figure):
+    """
+    The changes from one figure to the next.
+
+    :param dict previous: the figure in the browser
+    :param dict figure: the new figure
+    :return: dash.Patch, dash.no_update if nothing changed
+    """
+    patch = dash.Patch()
+    n_operations = _diff_properties(patch['layout'], _as_dict(previous.get('layout', {})),
+                                    _as_dict(figure.get('layout', {})))
+
+    previous_data = [_as_dict(trace) for trace in previous.get('data', [])]
+    data = [_as_dict(trace) for trace in figure.get('data', [])]
+    if len(previous_data) != len(data):
+        patch['data'] = figure['data']
+        n_operations += 1
+    else:
+        for i, (previous_trace, trace) in enumerate(zip(previous_data, data)):
+            if previous_trace.get('type') != trace.get('type'):
+                patch['data'][i] = trace
+                n_operations += 1
+            else:
+                n_operations += _diff_properties(patch['data'][i], previous_trace, trace)
+
+    return patch if n_operations else dash.no_update
+
+
+class FigureStates:
+    """
+    The last figure sent to every graph, by token, least recently used ones are dropped.
+
+    :param int max_entries: number of figures to keep
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, token, figure):
+        """
+        The update of a graph to a new figure, and the token of that figure.
+
+        :param str token: token of the figure in the browser, None for an unknown figure
+        :param dict figure: the new figure
+        :return: complete figure or dash.Patch (or dash.no_update), new token
+        """
+        with self._lock:
+            # a token is used once, a second request with it gets the complete figure
+            previous = self._figures.pop(token, None) if token is not None else None
+
+        new_token = uuid.uuid4().hex
+        with self._lock:
+            self._figures[new_token] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+
+        if previous is None:
+            return figure, new_token
+        return figure_patch(previous, figure), new_token
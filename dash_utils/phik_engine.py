@@ -0,0 +1,422 @@
+"""
+Engines for the phi_k correlation and significance calculations of the phik demo.
+
+Every column is binned once into integer codes (see dash_utils.binning); the
+contingency table of a pair is then a single bincount of the combined codes.
+The pairs are spread across a process pool and the results are collected as
+they finish, so a dashboard can show a partially filled matrix while the rest
+is computed.
+
+PhikMatrixService keeps the jobs of the binnings that are looked at and runs a
+limited number of them at a time. SignificanceService splits the Monte-Carlo
+simulations of a significance calculation over a process pool in batches with
+deterministic seeds, and gives an estimate after the first batch that improves
+as more batches finish. Both remember a bounded number of jobs: finished jobs
+are dropped first, and a job of another user keeps running when a new one is
+submitted.
+
+The jobs live in the server process that started them. A dashboard served by
+several worker processes polls the progress of a job on whichever worker
+answers, so it needs sticky sessions or a single worker for these pages.
+
+Requires the phik package, which is why this module is not imported by
+dash_utils itself: use ``from dash_utils import phik_engine``.
+"""
+import functools
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from phik.phik import phik_from_hist2d
+from phik.significance import (significance_from_hist2d, significance_from_chi2_asymptotic,
+                               significance_from_chi2_hybrid, significance_from_chi2_MC)
+from phik.simulation import sim_data
+from phik.statistics import get_chi2_using_dependent_frequency_estimates, get_dependent_frequency_estimates
+
+from .binning import BinnedColumnCache, contingency_table
+
+
+def trim_table(table):
+    """Remove the empty rows and columns of a contingency table."""
+    return table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+
+
+def phik_from_table(table, significance=True, **significance_kwargs):
+    """
+    Calculate phi_k and its significance from a contingency table. Empty rows and
+    columns are removed first, as they would not appear in phik's own crosstab.
+    The significance is calculated in this process; see SignificanceService for
+    the parallel calculation.
+
+    :param np.array table: contingency table
+    :param bool significance: also calculate the significance
+    :param significance_kwargs: passed on to phik.significance.significance_from_hist2d
+    :return: phi_k, significance (nan when not calculated or not defined)
+    """
+    table = trim_table(table)
+    if min(table.shape) < 2:
+        return np.nan, np.nan
+
+    phik_value = phik_from_hist2d(table)
+    if not significance:
+        return phik_value, np.nan
+
+    _, significance_value = significance_from_hist2d(table, **significance_kwargs)
+    return phik_value, significance_value
+
+
+# -- process pool workers receive the codes once, when they are started
+_WORKER_CODES = {}
+
+
+def _init_worker(codes):
+    _WORKER_CODES.clear()
+    _WORKER_CODES.update(codes)
+
+
+def _evaluate_pair(x, y, significance, significance_kwargs):
+    x_codes, n_x = _WORKER_CODES[x]
+    y_codes, n_y = _WORKER_CODES[y]
+    table = contingency_table(x_codes, y_codes, n_x, n_y)
+    return phik_from_table(table, significance, **significance_kwargs)
+
+
+class PhikMatrixJob:
+    """
+    All-pairs phi_k and significance evaluation running in a process pool.
+
+    Start the job with start(); the matrices can be read at any time and contain
+    nan for the pairs that have not finished yet.
+
+    :param pd.DataFrame df: input data
+    :param list columns: columns to correlate, default all columns
+    :param int bins: number of bins for interval columns
+    :param bool quantile: uniform bins (False) or bins based on quantiles (True)
+    :param bool significance: also calculate the significance of every pair
+    :param int max_workers: number of processes, default the number of cpus
+    :param BinnedColumnCache cache: binned columns of df to reuse, optional
+    :param significance_kwargs: passed on to phik.significance.significance_from_hist2d
+    """
+
+    def __init__(self, df, columns=None, bins=10, quantile=False, significance=True,
+                 max_workers=None, cache=None, **significance_kwargs):
+        self.columns = list(df.columns if columns is None else columns)
+        self.significance = significance
+        self.max_workers = max_workers
+        # parallelism is over the pairs, not within a significance calculation
+        self.significance_kwargs = {'njobs': 1, **significance_kwargs}
+
+        cache = cache if cache is not None else BinnedColumnCache(df)
+        self.codes = {col: cache.codes(col, cache.edges(col, bins, quantile) if cache.is_interval(col) else None)
+                      for col in self.columns}
+        self.pairs = list(itertools.combinations(self.columns, 2))
+
+        diagonal = np.where(np.eye(len(self.columns)), 1., np.nan)
+        self._phik = pd.DataFrame(diagonal, index=self.columns, columns=self.columns)
+        self._significance = pd.DataFrame(np.nan, index=self.columns, columns=self.columns)
+        self._n_done = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futures = []
+
+    @property
+    def started(self):
+        return self._executor is not None
+
+    def start(self):
+        """Submit all pairs to the process pool. Returns the job itself."""
+        if self._executor is not None:
+            return self
+
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             initializer=_init_worker,
+                                             initargs=(self.codes,))
+        for x, y in self.pairs:
+            future = self._executor.submit(_evaluate_pair, x, y, self.significance, self.significance_kwargs)
+            future.add_done_callback(functools.partial(self._collect, x, y))
+            self._futures.append(future)
+        self._executor.shutdown(wait=False)
+
+        return self
+
+    def _collect(self, x, y, future):
+        if future.cancelled():
+            return
+        if future.exception() is None:
+            phik_value, significance_value = future.result()
+        else:
+            # a failing pair should not keep the job from finishing
+            phik_value, significance_value = np.nan, np.nan
+        with self._lock:
+            self._phik.loc[x, y] = self._phik.loc[y, x] = phik_value
+            self._significance.loc[x, y] = self._significance.loc[y, x] = significance_value
+            self._n_done += 1
+
+    def cancel(self):
+        """Cancel all pairs that have not started yet."""
+        for future in self._futures:
+            future.cancel()
+
+    @property
+    def progress(self):
+        """Number of finished pairs and total number of pairs."""
+        return self._n_done, len(self.pairs)
+
+    @property
+    def done(self):
+        return self._n_done == len(self.pairs)
+
+    def matrices(self):
+        """
+        Return copies of the phi_k and significance matrices as they are now.
+
+        :return: phi_k DataFrame, significance DataFrame
+        """
+        with self._lock:
+            return self._phik.copy(), self._significance.copy()
+
+    def wait(self):
+        """Block until all pairs are finished and return the matrices."""
+        for future in self._futures:
+            if not future.cancelled():
+                future.exception()
+        return self.matrices()
+
+
+def _evict(jobs, max_jobs):
+    """
+    Drop the least recently used jobs beyond max_jobs, finished ones first.
+
+    A running job is only cancelled when all remembered jobs are still running.
+
+    :param OrderedDict jobs: jobs by key, least recently used first
+    :param int max_jobs: number of jobs to keep
+    """
+    while len(jobs) > max_jobs:
+        key = next((key for key, job in jobs.items() if job.done), next(iter(jobs)))
+        job = jobs.pop(key)
+        if not job.done:
+            job.cancel()
+
+
+class PhikMatrixService:
+    """
+    All-pairs jobs of a DataFrame by binning, with at most max_running of them computing at a time.
+
+    A job that is asked for while others are running waits until one of them has
+    finished; it is started by a later call of get, e.g. when its progress is polled.
+
+    :param pd.DataFrame df: input data
+    :param list columns: columns to correlate, default all columns
+    :param BinnedColumnCache cache: binned columns of df to reuse, optional
+    :param int max_running: number of jobs computing at the same time
+    :param int max_jobs: number of jobs to remember
+    :param kwargs: passed on to PhikMatrixJob, e.g. max_workers
+    """
+
+    def __init__(self, df, columns=None, cache=None, max_running=1, max_jobs=8, **kwargs):
+        self.df = df
+        self.columns = columns
+        self.cache = cache if cache is not None else BinnedColumnCache(df)
+        self.max_running = max_running
+        self.max_jobs = max_jobs
+        self.kwargs = kwargs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bins, quantile=False):
+        """
+        The job of a binning, created if needed, and start waiting jobs when there is room.
+
+        :param int bins: number of bins for interval columns
+        :param bool quantile: uniform bins (False) or bins based on quantiles (True)
+        :return PhikMatrixJob: the job, which may not have started yet
+        """
+        key = (bins, quantile)
+        with self._lock:
+            if key in self._jobs:
+                self._jobs.move_to_end(key)
+            else:
+                self._jobs[key] = PhikMatrixJob(self.df, self.columns, bins=bins, quantile=quantile,
+                                                cache=self.cache, **self.kwargs)
+            job = self._jobs[key]
+            _evict(self._jobs, self.max_jobs)
+
+            n_running = sum(other.started and not other.done for other in self._jobs.values())
+            for other in [job] + list(self._jobs.values()):
+                if n_running >= self.max_running:
+                    break
+                if not other.started:
+                    other.start()
+                    n_running += 1
+            return job
+
+
+def _simulate_chi2s(exp_dep, nsim, seed, lambda_, simulation_method):
+    # phik simulates with the global numpy random state, which is per process
+    np.random.seed(seed)
+    return [get_chi2_using_dependent_frequency_estimates(sim_data(exp_dep, method=simulation_method), lambda_)
+            for _ in range(nsim)]
+
+
+class SignificanceJob:
+    """
+    Significance of one contingency table, with its simulations running in a process pool.
+
+    Created by SignificanceService.submit. The simulations are split in batches with
+    seeds derived from the service seed, so the final result does not depend on the
+    number of workers or the order in which batches finish.
+    """
+
+    def __init__(self, table, executor, nsim, batch_size, seed, lambda_, simulation_method,
+                 significance_method):
+        self.table = trim_table(table)
+        self.lambda_ = lambda_
+        self.significance_method = significance_method
+        self._lock = threading.Lock()
+        self._first = threading.Event()
+        self._futures = []
+        self._batches = []
+        self.cancelled = False
+
+        if min(self.table.shape) < 2:
+            self.chi2 = np.nan
+        else:
+            self.chi2 = get_chi2_using_dependent_frequency_estimates(self.table, lambda_=lambda_)
+
+        if np.isnan(self.chi2) or significance_method == 'asymptotic':
+            # nothing to simulate
+            self._first.set()
+            return
+
+        sizes = [batch_size] * (nsim // batch_size) + ([nsim % batch_size] if nsim % batch_size else [])
+        self._batches = [None] * len(sizes)
+        exp_dep = get_dependent_frequency_estimates(self.table)
+        seeds = np.random.SeedSequence(seed).generate_state(len(sizes))
+        for i, (size, batch_seed) in enumerate(zip(sizes, seeds)):
+            future = executor.submit(_simulate_chi2s, exp_dep, size, int(batch_seed), lambda_, simulation_method)
+            future.add_done_callback(functools.partial(self._collect, i))
+            self._futures.append(future)
+
+    def _collect(self, i, future):
+        with self._lock:
+            # a cancelled or failing batch counts as finished without simulations
+            if future.cancelled() or future.exception() is not None:
+                self._batches[i] = []
+            else:
+                self._batches[i] = future.result()
+        self._first.set()
+
+    @property
+    def progress(self):
+        """Number of finished batches and total number of batches."""
+        with self._lock:
+            return sum(batch is not None for batch in self._batches), len(self._batches)
+
+    @property
+    def done(self):
+        """All batches have finished or were cancelled, see cancelled."""
+        n_done, n_total = self.progress
+        return n_done == n_total
+
+    def cancel(self):
+        """Cancel the batches that have not started yet; the job is done when the running ones finish."""
+        self.cancelled = True
+        for future in self._futures:
+            future.cancel()
+        self._first.set()
+
+    def estimate(self, wait=True, timeout=None):
+        """
+        Significance calculated from the simulations that have finished.
+
+        :param bool wait: wait until at least the first batch has finished
+        :param float timeout: maximum number of seconds to wait
+        :return: p-value, significance; nan if no estimate is available yet
+        """
+        if wait:
+            self._first.wait(timeout)
+
+        if np.isnan(self.chi2):
+            return np.nan, np.nan
+
+        if self.significance_method == 'asymptotic':
+            return significance_from_chi2_asymptotic(self.table, self.chi2)
+
+        with self._lock:
+            chi2s = [chi2 for batch in self._batches if batch for chi2 in batch]
+        if len(chi2s) < 2:
+            return np.nan, np.nan
+
+        if self.significance_method == 'MC':
+            return significance_from_chi2_MC(self.chi2, self.table, chi2s=chi2s)
+        return significance_from_chi2_hybrid(self.chi2, self.table, chi2s=chi2s)
+
+
+class SignificanceService:
+    """
+    Calculate phi_k significances with the Monte-Carlo simulations spread over a process pool.
+
+    Jobs are kept per contingency table, so asking again for the same table returns
+    the running or finished job instead of starting a new one. The jobs of all tables
+    share the process pool, so jobs of different users run side by side.
+
+    :param int max_workers: number of processes, default the number of cpus
+    :param int nsim: number of simulations per significance
+    :param int batch_size: number of simulations per batch; the first estimate is available
+                           after one batch
+    :param int seed: seed from which the seeds of the batches are derived
+    :param str lambda_: test statistic. Available options are [pearson, log-likelihood]
+    :param str simulation_method: simulation method, see phik.simulation.sim_data
+    :param str significance_method: significance method. Options: [asymptotic, MC, hybrid]
+    :param int max_jobs: number of jobs to remember
+    """
+
+    def __init__(self, max_workers=None, nsim=1000, batch_size=100, seed=42, lambda_='log-likelihood',
+                 simulation_method='multinominal', significance_method='hybrid', max_jobs=32):
+        self.max_workers = max_workers
+        self.nsim = nsim
+        self.batch_size = batch_size
+        self.seed = seed
+        self.lambda_ = lambda_
+        self.simulation_method = simulation_method
+        self.significance_method = significance_method
+        self.max_jobs = max_jobs
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, table):
+        """
+        Start the significance calculation of a contingency table, or return the job
+        of an identical table.
+
+        :param np.array table: contingency table
+        :return SignificanceJob: the job
+        """
+        table = np.asarray(table)
+        key = (table.shape, table.tobytes())
+
+        with self._lock:
+            if key in self._jobs:
+                self._jobs.move_to_end(key)
+                return self._jobs[key]
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+            job = SignificanceJob(table, self._executor, self.nsim, self.batch_size, self.seed, self.lambda_,
+                                  self.simulation_method, self.significance_method)
+            self._jobs[key] = job
+            _evict(self._jobs, self.max_jobs)
+            return job
+
+    def shutdown(self):
+        """Stop the process pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,119 @@
+"""
+Histograms that are re-binned in the browser.
+
+Dragging a bin slider used to call the server for every step, which binned the whole
+column again. histogram_counts instead counts a column once for every number of bins
+from 1 to MAX_BINS, per hue group, and a callback sends those counts to a dcc.Store.
+The clientside function dash_utils.histogram, in assets/dash_utils.js of the app,
+takes the counts of the number of bins of the slider and draws the histogram, so a
+drag costs no request at all. clientside_histogram registers that callback.
+
+The counts of all numbers of bins are stored one after the other, n bins starting at
+n * (n - 1) / 2, which is 5050 counts for MAX_BINS = 100. They are computed from the
+sorted values of the column with one searchsorted per number of bins, so every number
+of bins has exact, equally wide bins as np.histogram would give. Columns that are not
+binned (see is_interval) are counted per category and ignore the number of bins.
+"""
+import numpy as np
+import pandas as pd
+from dash.dependencies import ClientsideFunction, Input, Output
+
+from . import figures, theme
+from .binning import is_interval
+from .encoding import encode_array
+
+MAX_BINS = 100
+
+
+def _counts(codes, groups, n_groups, n_codes):
+    # one bincount for all groups together
+    valid = (codes >= 0) & (groups >= 0)
+    counts = np.bincount(groups[valid].astype(np.int64) * n_codes + codes[valid], minlength=n_groups * n_codes)
+    return counts.reshape(n_groups, n_codes)
+
+
+def _level_counts(sorted_values, low, high, max_bins):
+    """Counts of equally wide bins from low to high for every number of bins up to max_bins."""
+    levels = []
+    for n_bins in range(1, max_bins + 1):
+        edges = np.linspace(low, high, n_bins + 1)
+        positions = np.searchsorted(sorted_values, edges, side='left')
+        # the last bin includes high
+        positions[-1] = len(sorted_values)
+        levels.append(np.diff(positions))
+    return np.concatenate(levels)
+
+
+def level_offset(n_bins):
+    """Position of the counts of n_bins bins in the counts of histogram_counts."""
+    return n_bins * (n_bins - 1) // 2
+
+
+def histogram_counts(df, col, hue=None, colors=None, max_bins=MAX_BINS, **layout):
+    """
+    Bin counts of a column for every number of bins, for the clientside function dash_utils.histogram.
+
+    :param pd.DataFrame df: the data
+    :param str col: the column to count
+    :param str hue: column to count the groups of separately, None for one group
+    :param list colors: color of each group, e.g. from color_palette
+    :param int max_bins: largest number of bins
+    :param layout: layout properties of the figure
+    :return dict: the counts, with 'low', 'high', 'max_bins' and 'groups' for an interval
+                  column or 'categories' and 'groups' otherwise
+    """
+    series = df[col]
+    if hue is None:
+        groups, names = np.zeros(len(df), dtype=np.int64), [str(col)]
+    else:
+        groups, names = pd.factorize(df[hue], sort=True)
+        names = [str(name) for name in names]
+
+    result = {'layout': figures.layout(**{'template': theme.template(), **layout})}
+    if is_interval(series):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        low, high = (np.nanmin(values), np.nanmax(values)) if np.isfinite(values).any() else (0., 1.)
+        if high <= low:
+            high = low + 1.
+        finite = np.isfinite(values) & (groups >= 0)
+        counts = [_level_counts(np.sort(values[finite & (groups == i)]), low, high, max_bins)
+                  for i in range(len(names))]
+        result.update(low=float(low), high=float(high), max_bins=max_bins)
+        result['layout'].setdefault('bargap', 0)
+    else:
+        codes, categories = pd.factorize(series, sort=True)
+        counts = _counts(codes, groups, len(names), len(categories))
+        result['categories'] = [str(category) for category in categories]
+
+    result['groups'] = [{'name': name, 'counts': encode_array(group_counts)}
+                        for name, group_counts in zip(names, counts)]
+    if colors is not None:
+        for group, color in zip(result['groups'], colors):
+            group['marker'] = {'color': color}
+    return result
+
+
+def bin_counts(counts, n_bins):
+    """
+    Counts of n_bins bins from the counts of histogram_counts, as dash_utils.histogram takes them.
+
+    :param np.array counts: the counts of a group
+    :param int n_bins: number of bins
+    :return np.array: n_bins counts
+    """
+    return np.asarray(counts)[level_offset(n_bins):level_offset(n_bins + 1)]
+
+
+def clientside_histogram(app, graph_id, counts_id, bins_id):
+    """
+    Register the clientside callback that draws the histogram of a dcc.Store with
+    histogram_counts in a graph, for the number of bins of e.g. a slider.
+
+    :param app: the Dash app, with dash_utils.js in its assets folder
+    :param str graph_id: id of the dcc.Graph
+    :param str counts_id: id of the dcc.Store with the counts
+    :param str bins_id: id of the component with the number of bins as 'value'
+    """
+    app.clientside_callback(ClientsideFunction(namespace='dash_utils', function_name='histogram'),
+                            Output(graph_id, 'figure'),
+                            [Input(counts_id, 'data'), Input(bins_id, 'value')])
@@ -0,0 +1,284 @@
+"""
+Linked selections between figures.
+
+A selection is an array of row positions in the DataFrame (np.int64, sorted, unique),
+or None for 'no selection'. trace_rows splits the rows over the traces of a figure as
+the figure builders do; the points in the selectedData of a figure refer to positions within a
+trace, so they are mapped back to rows with the same split. Selections of several
+figures are combined by intersecting the row positions. The builders themselves only
+need the values of every trace, which trace_values groups without the row positions.
+
+Box selections on numeric axes can also be answered by the range index of a Dataset
+(range_selection), which does not depend on how the rows are split over traces.
+"""
+import numpy as np
+import pandas as pd
+
+# ranges with more than 1 / WIDE_RANGE_FRACTION of the rows are checked on whole columns
+WIDE_RANGE_FRACTION = 16
+# rows split over the traces at a time by trace_values
+TRACE_BLOCK = 2 ** 12
+
+
+def selection_positions(sel, n_rows):
+    """
+    Row positions of a selection given as positions or as a boolean mask.
+
+    :param sel: None, boolean mask of length n_rows or array of row positions
+    :param int n_rows: number of rows of the DataFrame
+    :return np.array: row positions, None if sel is None
+    """
+    if sel is None:
+        return None
+    sel = np.asarray(sel)
+    if sel.dtype == bool:
+        if len(sel) != n_rows:
+            raise ValueError(f"Selection mask has length {len(sel)}, expected {n_rows}")
+        return np.flatnonzero(sel)
+    return sel.astype(np.int64, copy=False)
+
+
+def _first_appearance(codes, n_codes):
+    """
+    Codes from 0 to n_codes - 1 that occur, in the order of their first appearance.
+    Usually all of them appear in the first rows, so the rows are read in growing blocks.
+    """
+    seen = np.zeros(n_codes, dtype=bool)
+    present = []
+    start, block = 0, 1024
+    while start < len(codes) and len(present) < n_codes:
+        block_codes = codes[start:start + block]
+        for code in pd.unique(block_codes[block_codes >= 0]):
+            if not seen[code]:
+                seen[code] = True
+                present.append(code)
+        start, block = start + block, min(2 * block, TRACE_BLOCK)
+    return np.array(present, dtype=np.int64)
+
+
+def _appearance_codes(series):
+    """
+    Codes of the values of a column in the order of their first appearance, like
+    series.unique(), in the smallest integer dtype. Missing values have code -1.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # the codes of a categorical column exist already, only renumber them
+        category_codes = series.cat.codes.to_numpy()
+        present = _first_appearance(category_codes, len(series.cat.categories))
+        renumber = np.full(len(series.cat.categories) + 1, -1, dtype=np.min_scalar_type(-len(present)))
+        renumber[present] = np.arange(len(present))
+        return renumber[category_codes], series.cat.categories[present]
+
+    codes, uniques = pd.factorize(series)
+    # small integer codes are sorted with a radix sort
+    return codes.astype(np.min_scalar_type(-len(uniques)), copy=False), uniques
+
+
+def trace_rows(df, color_filter=None, sel=None):
+    """
+    Row positions of every trace of a figure made by make_histogram or make_scatter.
+
+    :param pd.DataFrame df: the data
+    :param str color_filter: column with one trace per value, None for a single trace
+    :param sel: selection of rows to plot, see selection_positions
+    :return: list of row position arrays (None for all rows of a single trace), trace names
+    """
+    rows = selection_positions(sel, len(df))
+    if color_filter is None:
+        return [rows], [None]
+
+    codes, uniques = _appearance_codes(df[color_filter])
+    if rows is not None:
+        codes = codes[rows]
+
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    # missing values have code -1 and sort first
+    groups = np.split(order[len(codes) - counts.sum():], np.cumsum(counts)[:-1])
+    if rows is not None:
+        groups = [rows[group] for group in groups]
+    return groups, list(uniques)
+
+
+def _group_values(codes, n_groups, columns, block):
+    """
+    Values of columns grouped by their codes, in the order of the rows within a group.
+
+    The rows are grouped a block at a time, so no positions of all rows are kept:
+    the grouped values take the memory of the values only.
+    """
+    # counted a block at a time too, bincount would copy all codes to 64 bit integers
+    counts = np.zeros(n_groups, dtype=np.int64)
+    for start in range(0, len(codes), block):
+        block_codes = codes[start:start + block]
+        counts += np.bincount(block_codes[block_codes >= 0], minlength=n_groups)
+    fill = np.cumsum(counts) - counts
+    grouped = [np.empty(counts.sum(), dtype=values.dtype) for values in columns]
+    for start in range(0, len(codes), block):
+        block_codes = codes[start:start + block]
+        order = np.argsort(block_codes, kind='stable')
+        block_counts = np.bincount(block_codes[block_codes >= 0], minlength=n_groups)
+        # missing values have code -1 and sort first
+        order = order[len(order) - block_counts.sum():]
+        present = np.flatnonzero(block_counts)
+        for values, result in zip(columns, grouped):
+            block_values = values[start:start + block][order]
+            position = 0
+            for group in present:
+                count = block_counts[group]
+                result[fill[group]:fill[group] + count] = block_values[position:position + count]
+                position += count
+        fill += block_counts
+    if not n_groups:
+        return [[] for _ in columns]
+    return [np.split(result, np.cumsum(counts)[:-1]) for result in grouped]
+
+
+def trace_values(df, columns, color_filter=None, sel=None):
+    """
+    Values of columns for every trace of a figure made by make_histogram or make_scatter,
+    in the same order as the rows of trace_rows, without the row positions.
+
+    :param pd.DataFrame df: the data
+    :param list columns: the columns to plot
+    :param str color_filter: column with one trace per value, None for a single trace
+    :param sel: selection of rows to plot, see selection_positions
+    :return: list of the values of the columns per trace, trace names
+    """
+    # to_numpy, so categorical columns give plain arrays
+    values = [df[col].to_numpy() for col in columns]
+    if sel is not None:
+        sel = np.asarray(sel)
+        if sel.dtype == bool and len(sel) != len(df):
+            raise ValueError(f"Selection mask has length {len(sel)}, expected {len(df)}")
+        values = [column[sel] for column in values]
+    if color_filter is None:
+        return [values], [None]
+
+    codes, uniques = _appearance_codes(df[color_filter])
+    if sel is not None:
+        codes = codes[sel]
+    grouped = _group_values(codes, len(uniques), values, TRACE_BLOCK)
+    return [list(trace) for trace in zip(*grouped)], list(uniques)
+
+
+def selected_rows(selected_data, rows_per_trace, n_rows):
+    """
+    Row positions of the points in the selectedData of a figure.
+
+    :param dict selected_data: the selectedData property of a dcc.Graph
+    :param list rows_per_trace: row positions per trace, see trace_rows
+    :param int n_rows: number of rows of the DataFrame
+    :return np.array: sorted row positions, None if nothing is selected
+    """
+    if not selected_data or 'points' not in selected_data:
+        return None
+
+    selected = []
+    for point in selected_data['points']:
+        curve = point.get('curveNumber', 0)
+        if curve >= len(rows_per_trace):
+            continue
+        # histograms select bins with the positions of all their points, scatters single points
+        numbers = point.get('pointNumbers', point.get('pointNumber'))
+        if numbers is None:
+            continue
+        rows = rows_per_trace[curve]
+        numbers = np.atleast_1d(np.asarray(numbers, dtype=np.int64))
+        selected.append(numbers if rows is None else rows[numbers])
+
+    if not selected:
+        return np.array([], dtype=np.int64)
+    return np.unique(np.concatenate(selected))
+
+
+def intersect_selections(*selections):
+    """
+    Rows that are in all selections. A None selection does not restrict the rows.
+
+    :param selections: arrays of sorted unique row positions or None
+    :return np.array: sorted row positions, None if all selections are None
+    """
+    result = None
+    for selection in selections:
+        if selection is None:
+            continue
+        result = selection if result is None else np.intersect1d(result, selection, assume_unique=True)
+    return result
+
+
+def selected_ranges(selected_data, x=None, y=None):
+    """
+    Ranges of a box selection in the selectedData of a figure.
+
+    :param dict selected_data: the selectedData property of a dcc.Graph
+    :param str x: column on the x axis, None to ignore the x range
+    :param str y: column on the y axis, None to ignore the y range
+    :return dict: (low, high) by column, None if the selection is not a box
+    """
+    if not selected_data or 'range' not in selected_data:
+        return None
+
+    ranges = {}
+    for col, axis in ((x, 'x'), (y, 'y')):
+        if col is not None and axis in selected_data['range']:
+            low, high = selected_data['range'][axis]
+            ranges[col] = (min(low, high), max(low, high))
+    return ranges
+
+
+def _in_range(values, low, high):
+    keep = ~np.isnan(values)
+    if low is not None:
+        keep &= values >= low
+    if high is not None:
+        keep &= values <= high
+    return keep
+
+
+def _range_values(series, rows=None):
+    """
+    Values of a numeric column to compare with range bounds. Numpy columns, e.g. the
+    float32 columns of du.optimise_dtypes, are compared as they are, without a copy;
+    other columns are converted to float, only at the given rows.
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'fiu':
+        values = series.to_numpy()
+        return values if rows is None else values[rows]
+    if rows is not None:
+        series = series.iloc[rows]
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+
+def range_selection(dataset, ranges):
+    """
+    Rows within all ranges, e.g. the box selections of several figures.
+
+    The rows of every range are a slice of the range index of its column; the other
+    ranges are then only checked for the rows of the narrowest one. When even the
+    narrowest range holds a large part of the rows, comparing whole columns is cheaper
+    than gathering the values of those rows. No column is converted in full.
+
+    :param Dataset dataset: the data
+    :param dict ranges: (low, high) by column, a bound can be None
+    :return np.array: sorted row positions, None if there are no ranges
+    """
+    if not ranges:
+        return None
+
+    candidates = {col: dataset.range_rows(col, low, high) for col, (low, high) in ranges.items()}
+    col = min(candidates, key=lambda c: len(candidates[c]))
+    rows = candidates[col]
+
+    if len(rows) * WIDE_RANGE_FRACTION > len(dataset) and all(
+            isinstance(dataset.df[other].dtype, np.dtype) for other in ranges):
+        mask = None
+        for other, (low, high) in ranges.items():
+            keep = _in_range(_range_values(dataset.df[other]), low, high)
+            mask = keep if mask is None else mask & keep
+        return np.flatnonzero(mask)
+
+    for other, (low, high) in ranges.items():
+        if other != col:
+            rows = rows[_in_range(_range_values(dataset.df[other], rows), low, high)]
+    return np.sort(rows)
@@ -0,0 +1,149 @@
+"""
+Server-side paging, sorting and filtering of a DataTable.
+
+A table made with make_table(..., page_size=n) uses the 'custom' page, sort and filter
+actions: the browser sends page_current, page_size, sort_by and filter_query to a
+callback, which answers with table_page. Only the rows of the visible page are
+converted to records; sorting uses the cached sort order of the columns of the Dataset.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+# filter operators of the DataTable query syntax, longest first so '>=' is not read as '>'
+OPERATORS = [('ge', '>='), ('le', '<='), ('ne', '!='), ('lt', '<'), ('gt', '>'), ('eq', '='),
+             ('contains', 'contains'), ('datestartswith', 'datestartswith')]
+
+
+def split_filter_part(filter_part):
+    """
+    Split one condition of a filter query, e.g. ``{price} >= 100``.
+
+    :param str filter_part: the condition
+    :return: column name, operator name (see OPERATORS), value; Nones if it can not be parsed
+    """
+    for name, symbol in OPERATORS:
+        for token in (f' {symbol} ', f' {name} ', f' s{symbol} ', f' i{symbol} '):
+            if token not in filter_part:
+                continue
+            column, value = filter_part.split(token, 1)
+            column = column.strip()
+            if not (column.startswith('{') and column.endswith('}')):
+                continue
+            column = column[1:-1].replace('\\}', '}')
+
+            value = value.strip()
+            if value[:1] == value[-1:] and value[:1] in ('"', "'", '`') and len(value) > 1:
+                value = value[1:-1].replace('\\' + value[0], value[0])
+            else:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            return column, name, value
+
+    return None, None, None
+
+
+def _match_strings(strings, operator, value):
+    if operator == 'contains':
+        return strings.str.contains(str(value), regex=False)
+    return strings.str.startswith(str(value))
+
+
+def filter_mask(df, filter_query):
+    """
+    Rows that match a filter query. Conditions are combined with ``&&``; conditions that
+    can not be parsed or refer to unknown columns are ignored.
+
+    :param pd.DataFrame df: the data
+    :param str filter_query: the query of the DataTable
+    :return np.array: boolean mask, None if nothing is filtered
+    """
+    mask = None
+    for filter_part in (filter_query or '').split(' && '):
+        column, operator, value = split_filter_part(filter_part)
+        if column not in df.columns:
+            continue
+
+        series = df[column]
+        if operator in ('contains', 'datestartswith'):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # match the categories once instead of every row
+                matches = _match_strings(series.cat.categories.astype(str).to_series(), operator, value)
+                codes = series.cat.codes.to_numpy()
+                part = pd.Series(np.append(matches.to_numpy(dtype=bool), False)[codes], index=series.index)
+            else:
+                part = _match_strings(series.astype(str), operator, value) & series.notnull()
+        else:
+            try:
+                part = getattr(series, operator)(value)
+            except TypeError:
+                # e.g. a number compared with a text column
+                part = pd.Series(False, index=series.index)
+
+        part = part.to_numpy(dtype=bool, na_value=False)
+        mask = part if mask is None else mask & part
+
+    return mask
+
+
+def sorted_rows(dataset, sort_by):
+    """
+    Row positions in the order of the sort_by property of a DataTable.
+
+    :param Dataset dataset: the data
+    :param list sort_by: dicts with the column_id and direction ('asc' or 'desc')
+    :return np.array: row positions, None if the rows are not sorted
+    """
+    sort_by = [sort for sort in (sort_by or []) if sort['column_id'] in dataset.df.columns]
+    if not sort_by:
+        return None
+
+    if len(sort_by) == 1:
+        return dataset.sort_order(sort_by[0]['column_id'], sort_by[0]['direction'] == 'asc')
+
+    keys = []
+    for sort in sort_by:
+        ranks, n_unique = dataset.ranks(sort['column_id'])
+        if sort['direction'] != 'asc':
+            ranks = np.where(ranks < n_unique, n_unique - 1 - ranks, n_unique)
+        keys.append(ranks)
+    # the last key of lexsort is the primary one
+    return np.lexsort(keys[::-1])
+
+
+def table_page(dataset, page_current=0, page_size=20, sort_by=None, filter_query='', sel=None):
+    """
+    The records of one page of a table with custom paging, sorting and filtering.
+
+    :param Dataset dataset: the data
+    :param int page_current: page number, starting at 0
+    :param int page_size: rows per page
+    :param list sort_by: the sort_by property of the DataTable
+    :param str filter_query: the filter_query property of the DataTable
+    :param sel: rows to show, as a boolean mask or row positions (see du.selection). Default all rows
+    :return: list of records, number of pages
+    """
+    rows = sorted_rows(dataset, sort_by)
+    mask = filter_mask(dataset.df, filter_query)
+
+    if sel is not None:
+        sel = np.asarray(sel)
+        if sel.dtype != bool:
+            positions, sel = sel, np.zeros(len(dataset.df), dtype=bool)
+            sel[positions] = True
+        mask = sel if mask is None else mask & sel
+
+    if mask is not None:
+        rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+    n_rows = len(dataset.df) if rows is None else len(rows)
+
+    page_current = page_current or 0
+    start, stop = page_current * page_size, (page_current + 1) * page_size
+    rows = np.arange(start, min(stop, n_rows)) if rows is None else rows[start:stop]
+
+    page = dataset.df.iloc[rows]
+    records = page.astype(object).where(page.notnull(), None).to_dict('records')
+    return records, max(1, math.ceil(n_rows / page_size))
@@ -0,0 +1,68 @@
+"""
+Plotly templates for the dashboards.
+
+The colours, font and margins of the dashboards used to be put in the layout of every
+figure that a callback returned. Instead they are registered once as a named template
+with register_template. A dcc.Graph starts with base_figure, which carries the template
+to the browser. Callbacks then only send what changes, as a dash.Patch made by
+FigureStates (see dash_utils.patches); the template stays in the browser.
+
+Registered templates are also added to plotly.io.templates, so graph objects and
+plotly express accept them by name, e.g. go.Layout(template='eskapade').
+"""
+import copy
+
+import plotly.graph_objs as go
+import plotly.io as pio
+
+from . import figures
+
+DEFAULT_TEMPLATE = 'eskapade'
+
+COLORS = {'plot_bgcolor': '#263740', 'paper_bgcolor': '#1d2930', 'font': 'white'}
+
+_templates = {}
+
+
+def register_template(name, **layout):
+    """
+    Register a template with the layout properties that all figures share.
+
+    :param str name: name of the template
+    :param layout: layout properties, e.g. plot_bgcolor='#263740'
+    :return str: the name
+    """
+    _templates[name] = {'layout': layout}
+    pio.templates[name] = go.layout.Template(layout=layout)
+    return name
+
+
+def template(name=DEFAULT_TEMPLATE):
+    """
+    A registered template, as put in the layout of a figure.
+
+    :param str name: name of the template
+    :return dict: the template
+    """
+    if name not in _templates:
+        raise KeyError(f"No template {name!r}, known are {sorted(_templates)}")
+    return copy.deepcopy(_templates[name])
+
+
+def base_figure(title='', name=DEFAULT_TEMPLATE, **layout):
+    """
+    Empty figure with a template, for the initial 'figure' of a dcc.Graph.
+
+    :param str title: title of the figure
+    :param str name: name of the template
+    :param layout: other layout properties
+    :return dict: the figure
+    """
+    return figures.figure([], figures.layout(title=title, template=template(name), **layout))
+
+
+register_template(DEFAULT_TEMPLATE,
+                  plot_bgcolor=COLORS['plot_bgcolor'],
+                  paper_bgcolor=COLORS['paper_bgcolor'],
+                  font={'color': COLORS['font']},
+                  margin={'b': 30, 'l': 30, 'r': 30, 't': 40, 'pad': 5})
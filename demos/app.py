@@ -1,11 +1,34 @@
+import os
+
 import dash
+import dash_core_components as dcc
 import dash_html_components as html
 
+from dash_utils import DatasetStore, FigureCache, instrument, metrics_response, record_requests
+
 # external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
 app = dash.Dash(__name__)  # external_stylesheets=external_stylesheets)
 server = app.server
 app.config.suppress_callback_exceptions = True
 
+# latency and payload size of all callbacks, registered after this line
+callback_stats = instrument(app)
+
+# figures of all sessions, set DASH_FIGURE_CACHE=<directory> to also keep them on disk,
+# shared by the worker processes; DASH_FIGURE_CACHE_SECRET signs the files
+figure_cache = FigureCache(directory=os.environ.get('DASH_FIGURE_CACHE'),
+                           secret=os.environ.get('DASH_FIGURE_CACHE_SECRET'))
+server.add_url_rule('/metrics', 'metrics', metrics_response(callback_stats, figure_cache))
+
+# set DASH_RECORD_REQUESTS=requests.jsonl to record a session for benchmarks/bench_load.py
+if os.environ.get('DASH_RECORD_REQUESTS'):
+    record_requests(server, os.environ['DASH_RECORD_REQUESTS'])
+
+# parsed uploads, shared by the callbacks of all pages
+datasets = DatasetStore()
+
 data_container = html.Div([], id='data_container',  style={'display': 'none'})
-var_container = html.Div([], id='var_container', style={'display': 'none'})
\ No newline at end of file
+# key of the uploaded data in the DatasetStore, so callbacks find it without hashing the data
+data_key = dcc.Store(id='data_key')
+var_container = html.Div([], id='var_container', style={'display': 'none'})
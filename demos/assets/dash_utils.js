@@ -0,0 +1,70 @@
+/*
+ * Clientside callbacks of dash_utils, registered with e.g. du.clientside_histogram.
+ */
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    // plotly typed arrays, see dash_utils/encoding.py
+    var TYPED_ARRAYS = {
+        i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+        i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array
+    };
+
+    function decode(array) {
+        if (Array.isArray(array)) {
+            return array;
+        }
+        var bytes = Uint8Array.from(atob(array.bdata), function (c) { return c.charCodeAt(0); });
+        return new TYPED_ARRAYS[array.dtype](bytes.buffer);
+    }
+
+    // the counts of n bins start at n * (n - 1) / 2, like dash_utils.rebinning.bin_counts
+    function level(counts, bins) {
+        var start = bins * (bins - 1) / 2;
+        return Array.from(counts.slice(start, start + bins));
+    }
+
+    window.dash_clientside.dash_utils = {
+        /*
+         * Histogram of the counts of du.histogram_counts, in bins bins.
+         */
+        histogram: function (counts, bins) {
+            if (!counts) {
+                return window.dash_clientside.no_update;
+            }
+            bins = Math.max(1, Math.round(bins || 1));
+            if (counts.max_bins) {
+                bins = Math.min(bins, counts.max_bins);
+            }
+
+            var x, width;
+            if (counts.categories) {
+                x = counts.categories;
+            } else {
+                width = (counts.high - counts.low) / bins;
+                x = new Array(bins);
+                for (var i = 0; i < bins; i++) {
+                    x[i] = counts.low + (i + 0.5) * width;
+                }
+            }
+
+            var data = counts.groups.map(function (group) {
+                var values = decode(group.counts);
+                var trace = {
+                    type: 'bar',
+                    name: group.name,
+                    x: x,
+                    y: counts.categories ? Array.from(values) : level(values, bins)
+                };
+                if (width !== undefined) {
+                    trace.width = width;
+                }
+                if (group.marker) {
+                    trace.marker = group.marker;
+                }
+                return trace;
+            });
+            return {data: data, layout: counts.layout};
+        }
+    };
+})();
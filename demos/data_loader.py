@@ -1,9 +1,8 @@
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output, State
-from dash_utils import row
+from dash_utils import row, make_table, table_page, memory_size, cache_key
 import dash
-import base64
 import io
 import tqdm
 import json
@@ -11,7 +10,7 @@ import json
 import pandas as pd
 import numpy as np
 from pandas_profiling.model.describe import multiprocess_1d
-from app import data_container, var_container
+from app import data_container, data_key, var_container, datasets, figure_cache
 
 
 upload_button = dcc.Upload(html.A("Upload File"), id='upload_button', multiple=False)
@@ -21,9 +20,13 @@ upload_button = dcc.Upload(html.A("Upload File"), id='upload_button', multiple=F
 
 loading_container = html.Div([], id='loading_message', style={'color': 'white'})
 
+preview_table = make_table(id='data_preview', page_size=20,
+                           layout_kwargs={'style_table': {'overflowX': 'auto'}})
+
 layout = html.Div([
-    row([upload_button, data_container,
-         var_container, loading_container])
+    row([upload_button, data_container, data_key,
+         var_container, loading_container]),
+    row([preview_table])
 ])
 
 if __name__ == 'data_loader':
@@ -34,19 +37,19 @@ else:
     app.title = 'Upload file'
 
 
-@app.callback(Output('data_container', 'children'),
+@app.callback([Output('data_container', 'children'),
+               Output('data_key', 'data')],
               [Input('upload_button', 'contents')],
               [State('data_container', 'children')])
 def save_data(list_of_contents, data_kids):
 
     # dont overwrite
     if (list_of_contents is not None) and (data_kids == []):
-        decoded = base64.b64decode(list_of_contents.split(',')[1])
-        df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-
-        data = df.to_json(orient='split')
+        # a file that was uploaded before is not read again
+        data, key = datasets.upload(list_of_contents, lambda decoded: pd.read_csv(io.StringIO(decoded.decode('utf-8'))))
         # return f'''{data}'''
-        return data
+        return data, key
+    return dash.no_update, dash.no_update
 
 
 @app.callback(Output('loading_message', 'children'),
@@ -60,36 +63,76 @@ def get_load_message(data, variables):
         return '''Done!'''
 
 
+@app.callback([Output('data_preview', 'data'),
+               Output('data_preview', 'columns'),
+               Output('data_preview', 'page_count')],
+              [Input('data_container', 'children'),
+               Input('data_preview', 'page_current'),
+               Input('data_preview', 'page_size'),
+               Input('data_preview', 'sort_by'),
+               Input('data_preview', 'filter_query')],
+              [State('data_key', 'data')])
+def update_preview(raw_data, page_current, page_size, sort_by, filter_query, data_key):
+    dataset = datasets.get(raw_data, data_key)
+    if dataset is None:
+        return [], [], 1
+
+    # only the visible page is sent to the browser
+    records, page_count = table_page(dataset, page_current, page_size, sort_by, filter_query)
+    columns = [{'name': str(c), 'id': c} for c in dataset.df.columns]
+    return records, columns, page_count
+
+
+def profile_column(dataset, col):
+    """Profile of a column by pandas_profiling, computed once per column content"""
+    key = cache_key('multiprocess_1d', (col, dataset.column_hashes[col]), {})
+    return figure_cache.get('multiprocess_1d', key, lambda: multiprocess_1d(col, dataset.df[col]))
+
+
+def profile(dataset):
+    """Profiles of all columns, as stored in the variable container"""
+    df = dataset.df
+    variables = {}
+    for col in tqdm.tqdm(df.columns, total=len(df.columns)):
+        # only columns that were not profiled before are profiled
+        result = profile_column(dataset, col)
+        variables[result[0]] = result[1]
+
+    variables = {k: v for k, v in variables.items() if str(v['type'] != 'Variable.TYPE_UNSUPPORTED')}
+    variables = {K: {k: v for k, v in V.items() if not isinstance(v, pd.Series)} for K, V in variables.items()}
+    variables = {K: {k: (int(v) if isinstance(v, np.int64) else v) for k, v in V.items()} for K, V in variables.items()}
+    variables = {K: {k: (str(v).replace("Variable.", "") if k == 'type' else v) for k, v in V.items()}
+                 for K, V in variables.items()}
+    for col, (before, after) in (dataset.memory or {}).items():
+        if col in variables:
+            variables[col]['memorysize'] = memory_size(before, after)
+
+    cats = {col: {'CAT': variables[col]['type'],
+                  'n_unique': variables[col]['distinct_count'] if
+                  str(variables[col]['type']) == "Variable.TYPE_CAT" else 0}
+            for col in variables.keys()}
+    selected_options = [k for k, v in cats.items() if
+                        (str(v['CAT']) == 'Variable.TYPE_CAT') and (int(v['n_unique']) < 10)]
+    options = [k for k, v in cats.items()]
+    output = {"variables": {k: pd.DataFrame.from_dict(v, orient='index').to_json(orient='split') for k, v in variables.items()},
+              "options": options, "selected_options": selected_options}
+    # print(output)
+    # return f"{output}"
+    return json.dumps(output)
+
+
 @app.callback(Output('var_container', 'children'),
-              [Input('data_container', 'children')])
-def load_variables(children):
+              [Input('data_container', 'children')],
+              [State('data_key', 'data')])
+def load_variables(children, data_key):
 
     if children:
 
-        df = pd.read_json(children, orient='split')
-        variables = {}
-        for col, series in tqdm.tqdm(df.iteritems(), total=len(df.columns)):
-            result = multiprocess_1d(col, series)
-            variables[result[0]] = result[1]
-
-        variables = {k: v for k, v in variables.items() if str(v['type'] != 'Variable.TYPE_UNSUPPORTED')}
-        variables = {K: {k: v for k, v in V.items() if not isinstance(v, pd.Series)} for K, V in variables.items()}
-        variables = {K: {k: (int(v) if isinstance(v, np.int64) else v) for k, v in V.items()} for K, V in variables.items()}
-        variables = {K: {k: (str(v).replace("Variable.", "") if k == 'type' else v) for k, v in V.items()}
-                     for K, V in variables.items()}
-
-        cats = {col: {'CAT': variables[col]['type'],
-                      'n_unique': variables[col]['distinct_count'] if
-                      str(variables[col]['type']) == "Variable.TYPE_CAT" else 0}
-                for col in variables.keys()}
-        selected_options = [k for k, v in cats.items() if
-                            (str(v['CAT']) == 'Variable.TYPE_CAT') and (int(v['n_unique']) < 10)]
-        options = [k for k, v in cats.items()]
-        output = {"variables": {k: pd.DataFrame.from_dict(v, orient='index').to_json(orient='split') for k, v in variables.items()},
-                  "options": options, "selected_options": selected_options}
-        # print(output)
-        # return f"{output}"
-        return json.dumps(output)
+        # the dataset of the store has compact dtypes
+        dataset = datasets.get(children, data_key)
+        # the same data, e.g. a file that is uploaded again, is profiled once
+        key = cache_key('profile', (dataset.fingerprint,), {})
+        return figure_cache.get('profile', key, lambda: profile(dataset))
 
 if __name__ == '__main__':
     app.run_server(debug=True)
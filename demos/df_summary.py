@@ -2,12 +2,11 @@ import dash
 import dash_table
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import dash_utils as du
 
 import seaborn as sns
 import os
-import plotly.graph_objs as go
 
 from pandas_profiling.model.describe import describe as describe_df
 
@@ -31,9 +30,9 @@ hue_cols = [k for k, v in cats.items() if
 data_cols = [k for k, v in cats.items()]
 colnames = data_cols
 
-plt_bgcolor = '#263740'
-plt_papercolor = '#1d2930'
-text_color = 'white'
+plt_bgcolor = du.theme.COLORS['plot_bgcolor']
+plt_papercolor = du.theme.COLORS['paper_bgcolor']
+text_color = du.theme.COLORS['font']
 
 pdict = {x: str(x) for x in colnames}
 
@@ -41,10 +40,10 @@ layout = html.Div([
     html.H1('DataFrames: A summary'),
     html.Div([
         html.Div([
+            # drawn in the browser from the bin counts, see du.histogram_counts
             dcc.Graph(id='Histogram',
-                      figure={'layout': go.Layout(plot_bgcolor=plt_bgcolor,
-                                                  paper_bgcolor=plt_papercolor,
-                                                  font=dict(color=text_color))}),
+                      figure=du.base_figure()),
+            dcc.Store(id='Histogram_counts'),
             dcc.Slider(id='bin_slider1',
                        min=1,
                        max=100,
@@ -93,46 +92,20 @@ else:
     app.layout = layout
 # -- update functions
 
+
 @app.callback(
-    Output('Histogram', 'figure'),
+    Output('Histogram_counts', 'data'),
     [Input('x_dropdown', 'value'),
-     Input('hue_dropdown', 'value'),
-     Input('bin_slider1', 'value')])
-def update_plot(value_x, hue, bins):
-    if (hue != 0) & (value_x != 0):
-        pal = sns.palettes.color_palette('YlGnBu', n_colors=len(df[hue].unique()))
-        pal = pal.as_hex()
-        return {'data': [go.Histogram(
-                     x=df.loc[df[hue] == col, value_x],
-                     nbinsx=bins,
-                     name=str(col),
-                     marker=dict(color=pal[i]),
-                     text=df[value_x])
-                   for i, col in enumerate(df[hue].unique())],
-                'layout': go.Layout(
-                          xaxis={'title': pdict[value_x]},
-                          plot_bgcolor=plt_bgcolor,
-                          paper_bgcolor=plt_papercolor,
-                          font=dict(color=text_color))}
-    elif value_x != 0:
-        return {'data': [go.Histogram(
-                     x=df[value_x],
-                     nbinsx=bins,
-                     text=df[value_x])],
-                'layout': go.Layout(
-                          xaxis={'title': pdict[value_x]},
-                          plot_bgcolor=plt_bgcolor,
-                          paper_bgcolor=plt_papercolor,
-                          font=dict(color=text_color),
-                            )}
-    else:
-        return {'data': [],
-                'layout': go.Layout(
-                          xaxis={'title': ''},
-                          plot_bgcolor=plt_bgcolor,
-                          paper_bgcolor=plt_papercolor,
-                          font=dict(color=text_color),
-                            )}
+     Input('hue_dropdown', 'value')])
+def update_counts(value_x, hue):
+    if not value_x:
+        return None
+    colors = du.color_palette('YlGnBu', df[hue].nunique()) if hue else None
+    # counted once per column, the slider re-bins them in the browser
+    return du.histogram_counts(df, value_x, hue or None, colors, xaxis={'title': pdict[value_x]})
+
+
+du.clientside_histogram(app, 'Histogram', 'Histogram_counts', 'bin_slider1')
 
 
 @app.callback(Output('table', 'data'),
@@ -6,9 +6,8 @@ import dash_utils as du
 
 import seaborn as sns
 import json
-import plotly.graph_objs as go
 
-from app import app
+from app import app, datasets, figure_cache
 
 import pandas as pd
 
@@ -36,9 +35,9 @@ import pandas as pd
 #     from data_loader import data_container
 #     df = pd.read_json(data_container.children)
 #
-plt_bgcolor = '#263740'
-plt_papercolor = '#1d2930'
-text_color = 'white'
+plt_bgcolor = du.theme.COLORS['plot_bgcolor']
+plt_papercolor = du.theme.COLORS['paper_bgcolor']
+text_color = du.theme.COLORS['font']
 #
 # pdict = {x: str(x) for x in colnames}
 
@@ -46,10 +45,10 @@ layout = html.Div([
     html.H1('DataFrames: A summary'),
     html.Div([
         html.Div([
+            # drawn in the browser from the bin counts, see du.histogram_counts
             dcc.Graph(id='Histogram',
-                      figure={'layout': go.Layout(plot_bgcolor=plt_bgcolor,
-                                                  paper_bgcolor=plt_papercolor,
-                                                  font=dict(color=text_color))}),
+                      figure=du.base_figure()),
+            dcc.Store(id='Histogram_counts'),
             dcc.Slider(id='bin_slider1',
                        min=1,
                        max=100,
@@ -101,54 +100,29 @@ layout = html.Div([
 # # -- update functions
 
 
+# the same counts and tables are computed once for all sessions
+histogram_counts = figure_cache.memoize(du.histogram_counts)
+data_profile_tables = figure_cache.memoize(du.data_profile_tables)
+
+
 @app.callback(
-    Output('Histogram', 'figure'),
+    Output('Histogram_counts', 'data'),
     [Input('x_dropdown', 'value'),
-     Input('hue_dropdown', 'value'),
-     Input('bin_slider1', 'value')],
-     [State('data_container', 'children')])
-def update_plot(value_x, hue, bins, raw_data):
-    if raw_data:
-        df = pd.read_json(raw_data, orient='split')
-        colnames = df.columns
-        pdict = {x: str(x) for x in colnames}
-    else:
-        df = pd.DataFrame()
-        pdict = {}
-    if (hue != 0) & (value_x != 0):
-        pal = sns.palettes.color_palette('YlGnBu', n_colors=len(df[hue].unique()))
-        pal = pal.as_hex()
-        return {'data': [go.Histogram(
-                     x=df.loc[df[hue] == col, value_x],
-                     nbinsx=bins,
-                     name=str(col),
-                     marker=dict(color=pal[i]),
-                     text=df[value_x])
-                   for i, col in enumerate(df[hue].unique())],
-                'layout': go.Layout(
-                          xaxis={'title': pdict[value_x]},
-                          plot_bgcolor=plt_bgcolor,
-                          paper_bgcolor=plt_papercolor,
-                          font=dict(color=text_color))}
-    elif value_x != 0:
-        return {'data': [go.Histogram(
-                     x=df[value_x],
-                     nbinsx=bins,
-                     text=df[value_x])],
-                'layout': go.Layout(
-                          xaxis={'title': pdict[value_x]},
-                          plot_bgcolor=plt_bgcolor,
-                          paper_bgcolor=plt_papercolor,
-                          font=dict(color=text_color),
-                            )}
-    else:
-        return {'data': [],
-                'layout': go.Layout(
-                          xaxis={'title': ''},
-                          plot_bgcolor=plt_bgcolor,
-                          paper_bgcolor=plt_papercolor,
-                          font=dict(color=text_color),
-                            )}
+     Input('hue_dropdown', 'value')],
+    [State('data_container', 'children'),
+     State('data_key', 'data')])
+def update_counts(value_x, hue, raw_data, data_key):
+    # parsed once per upload, shared with the other pages
+    dataset = datasets.get(raw_data, data_key)
+    if dataset is None or not value_x:
+        return None
+    df = dataset.df
+    colors = du.color_palette('YlGnBu', df[hue].nunique()) if hue else None
+    # counted once per column, the slider re-bins them in the browser
+    return histogram_counts(df, value_x, hue or None, colors, xaxis={'title': str(value_x)})
+
+
+du.clientside_histogram(app, 'Histogram', 'Histogram_counts', 'bin_slider1')
 
 
 @app.callback(Output('table', 'data'),
@@ -157,7 +131,7 @@ def update_plot(value_x, hue, bins, raw_data):
 def update_describe(col, var_kids):
     variables = json.loads(var_kids)['variables'] if var_kids else {}
     if (col != 0) and (col is not None):
-        return du.data_profile_tables(variables, col).data
+        return data_profile_tables(variables, col).data
     else:
         return []
 
@@ -168,7 +142,7 @@ def update_describe(col, var_kids):
 def update_describe_cols(col, var_kids):
     variables = json.loads(var_kids)['variables'] if var_kids else {}
     if (col != 0) and (col is not None):
-        return du.data_profile_tables(variables, col).columns
+        return data_profile_tables(variables, col).columns
     else:
         return []
 
@@ -179,7 +153,7 @@ def update_describe_cols(col, var_kids):
 def update_describe_cols(col, var_kids):
     variables = json.loads(var_kids)['variables'] if var_kids else {}
     if (col != 0) and (col is not None):
-        return du.data_profile_tables(variables, col).style_data_conditional
+        return data_profile_tables(variables, col).style_data_conditional
     else:
         return []
 
@@ -0,0 +1,32 @@
+import dash_core_components as dcc
+import dash_html_components as html
+from dash.dependencies import Input, Output
+from dash_utils import row, make_table
+
+from app import app, callback_stats
+
+
+refresh_interval = dcc.Interval(id='diagnostics_interval', interval=5000)
+
+diagnostics_table = make_table(columns=list(callback_stats.summary().columns),
+                               id='diagnostics_table',
+                               layout_kwargs={'sort_action': 'native',
+                                              'style_cell': {'textAlign': 'left'}})
+
+layout = html.Div([
+    html.H3('Callback diagnostics', style={'color': 'white'}),
+    html.P('Percentiles over the last calls per callback. Times in seconds, sizes in bytes. '
+           'The same numbers are served in the Prometheus format at /metrics.',
+           style={'color': 'white'}),
+    row([diagnostics_table], className='row'),
+    refresh_interval,
+])
+
+
+@app.callback(Output('diagnostics_table', 'data'),
+              [Input('diagnostics_interval', 'n_intervals')])
+def update_diagnostics(n_intervals):
+    summary = callback_stats.summary()
+    # the diagnostics callback itself is not interesting
+    summary = summary[summary['callback'] != 'diagnostics_table.data']
+    return summary.round(4).to_dict('records')
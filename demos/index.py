@@ -6,11 +6,13 @@ from dash_utils import row
 #
 from data_loader import *
 from df_summary_multi import *
+from diagnostics import *
 # from template_app import *
 # from phik_frontend import *
 
 from data_loader import layout as dt_layout
 from df_summary_multi import layout as df_layout
+from diagnostics import layout as diag_layout
 # from template_app import layout as tmp_layout
 # from phik_frontend import layout as ph_layout
 
@@ -22,6 +24,7 @@ from app import app
 footer = row([
     html.A(html.Button('Home'), href='http://localhost:8050'),
     html.A(html.Button('DF Summary'), href='http://localhost:8050/apps/app1'),
+    html.A(html.Button('Diagnostics'), href='http://localhost:8050/apps/diagnostics'),
     # html.A(html.Button('Template app'), href='http://localhost:8050/apps/app2'),
     # html.A(html.Button('Phi K'), href='http://localhost:8050/apps/app3'),
 ])
@@ -32,7 +35,7 @@ app.layout = html.Div([
     html.Div([], id='bla', style={'display': 'none'}),
     dcc.Location(id='url', refresh=False),
     row([page_content]),
-    row([data_container, var_container]),
+    row([data_container, data_key, var_container]),
     row([footer], style={'position': 'fixed',
                          'left': 0,
                          'bottom': 0,
@@ -50,6 +53,8 @@ def display_page(pathname):
     #     return tmp_layout
     # elif pathname == '/apps/app3':
     #     return ph_layout
+    elif pathname == '/apps/diagnostics':
+        return diag_layout
     elif pathname == '/':
         return dt_layout
     else:
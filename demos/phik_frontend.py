@@ -2,20 +2,34 @@ import dash
 from dash.dependencies import Input, Output, State
 import dash_core_components as dcc
 import dash_html_components as html
-import plotly.graph_objs as go
-import plotly.figure_factory as ff
 
 import pandas as pd
 import numpy as np
 import seaborn as sns
 
 import phik, phik.binning
+from phik.outliers import outlier_significance_matrix_from_hist2d
 import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlencode
+
+import dash_utils as du
+from dash_utils import phik_engine
 
 
 df = sns.load_dataset('diamonds')
 columns = df.columns
 
+# binned code columns, shared by all callbacks
+binned = du.BinnedColumnCache(df)
+# contingency tables that follow the slider edges, by (x_col, y_col), least recently used ones are dropped
+engines = OrderedDict()
+engines_lock = threading.Lock()
+MAX_ENGINES = 8
+# Monte-Carlo significance, simulated in a process pool
+significance_service = phik_engine.SignificanceService()
+
 mathjax = 'https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.4/MathJax.js?config=TeX-MML-AM_CHTML'
 
 # in place so we can reuse this script in multipage app. If run stand-alone, new all is initialized
@@ -30,6 +44,7 @@ class Ids:
     """Container for ID strings"""
 
     heatmap = "heatmap"
+    heatmap_token = "heatmap_token"
 
     x_col = "x_col"
     x_slider = "x_slider"
@@ -47,16 +62,19 @@ class Ids:
 
     phik_display = "phik_display"
     significance_display = "significance_display"
+    significance_interval = "significance_interval"
 
+    location = "location"
+    page_content = "page_content"
 
-class GlobalState:
-    """Container for global state variables"""
-
-    X_BINS_ADD_CLICKS = 0
-    Y_BINS_ADD_CLICKS = 0
+    matrix_heatmap = "matrix_heatmap"
+    matrix_interval = "matrix_interval"
+    matrix_progress = "matrix_progress"
+    matrix_bins = "matrix_bins"
+    matrix_binning_radio = "matrix_binning_radio"
+    matrix_value_radio = "matrix_value_radio"
 
-    X_BINS_REMOVE_CLICKS = 0
-    Y_BINS_REMOVE_CLICKS = 0
+    session_store = "session_store"
 
 
 def min_max(arr):
@@ -68,33 +86,56 @@ def get_edges(bin_list):
     return [t[0] for t in bin_list] + [bin_list[-1][-1]]
 
 
-def make_matrix(x, y, bins=None, quantile=False):
+def column_edges(col, bins=10, quantile=False):
+    """Bin edges of an interval column, or None for a categorical column.
+
+    :param str col: name of the column
+    :param bins: number of bins or list of bin edges
+    :param bool quantile: uniform bins (False) or bins based on quantiles (True)
+    """
+    if not binned.is_interval(col):
+        return None
+    if isinstance(bins, int):
+        return binned.edges(col, bins, quantile)
+    return np.asarray(bins, dtype=float)
+
+
+def pair_table(x, y, x_edges, y_edges):
+    """Contingency table of a pair, updated incrementally when slider edges move"""
+    with engines_lock:
+        if (x, y) in engines:
+            engines.move_to_end((x, y))
+        else:
+            engines[(x, y)] = du.ContingencyEngine(binned, x, y, x_edges, y_edges)
+            if len(engines) > MAX_ENGINES:
+                engines.popitem(last=False)
+        engine = engines[(x, y)]
+    # the engine has its own lock, the tables of other pairs are updated meanwhile
+    return engine.update(x_edges, y_edges)
+
 
-    df_tmp = df[[x, y]]
-    df_tmp.columns = ["x", "y"]
+def make_matrix(x, y, bins=None, quantile=False):
 
     if isinstance(bins, int):
-        bins_arg = bins
+        bins_x = bins_y = bins
     elif isinstance(bins, tuple) or isinstance(bins, list):
-        bins_arg = {"x": bins[0], "y": bins[1]}
+        bins_x, bins_y = bins
     else:
-        bins_arg = 10
+        bins_x = bins_y = 10
 
-    corr_matrix, binning = phik.outlier_significance_matrix(
-        df_tmp, retbins=True, bins=bins_arg, quantile=quantile
-    )
+    x_edges = column_edges(x, bins_x, quantile)
+    y_edges = column_edges(y, bins_y, quantile)
 
-    if "x" in binning:
-        x_edges = get_edges(binning["x"])
-    else:
-        x_edges = corr_matrix.index.values
+    table = pair_table(x, y, x_edges, y_edges)
+    _, corr_matrix = outlier_significance_matrix_from_hist2d(table)
 
-    if "y" in binning:
-        y_edges = get_edges(binning["y"])
-    else:
-        y_edges = corr_matrix.columns.values
+    if x_edges is None:
+        x_edges = binned.labels(x)
+
+    if y_edges is None:
+        y_edges = binned.labels(y)
 
-    return corr_matrix.values, x_edges, y_edges
+    return corr_matrix, x_edges, y_edges
 
 
 def heatmap_kwargs(z, x, y, **extra_kwargs):
@@ -108,10 +149,7 @@ def heatmap_kwargs(z, x, y, **extra_kwargs):
     else:
         centers_y = y[:-1] + np.diff(y) / 2
 
-    text = np.empty_like(z)
-    for i, row in enumerate(z):
-        for j, val in enumerate(row):
-            text[i, j] = f"{val:.3g}"
+    text = np.char.mod("%.3g", z)
 
     colorscale = [
         [0, "rgb(163, 6, 42)"],
@@ -120,51 +158,72 @@ def heatmap_kwargs(z, x, y, **extra_kwargs):
     ]
 
     return dict(
-        x=list(centers_x),
-        y=list(centers_y),
-        z=z.T.tolist(),
-        annotation_text=text.T.tolist(),
+        # arrays, encode_figure sends them as typed arrays
+        x=np.asarray(centers_x),
+        y=np.asarray(centers_y),
+        z=z.T,
+        annotation_text=text.T,
         colorscale=colorscale,
         **extra_kwargs,
     )
 
 
-def heatmap_figure(z, x, y):
-    kw = heatmap_kwargs(z, x, y)
-
-    figure = ff.create_annotated_heatmap(**kw, showscale=True)
-
-    figure.layout.xaxis.showgrid = False
-    figure.layout.yaxis.showgrid = False
+# the static part of the layout of the heatmaps, sent once with the initial figure
+du.register_template(
+    "phik",
+    paper_bgcolor="#11191d",
+    plot_bgcolor="#11191d",
+    font={"color": "white"},
+    xaxis={"showgrid": False, "showline": False, "zeroline": False, "tickmode": "auto", "side": "bottom"},
+    yaxis={"showgrid": False, "showline": False, "zeroline": False, "tickmode": "auto"},
+)
 
-    figure.layout.xaxis.tickmode = "auto"
-    figure.layout.yaxis.tickmode = "auto"
 
-    figure.layout.xaxis.showline = False
-    figure.layout.yaxis.showline = False
+def heatmap_annotations(kw):
+    """Text of every cell, like ff.create_annotated_heatmap"""
+    # both ends of the colorscale are dark, so the text is white everywhere
+    return [
+        {
+            "text": str(text),
+            "x": x,
+            "y": y,
+            "xref": "x",
+            "yref": "y",
+            "font": {"color": "#FFFFFF"},
+            "showarrow": False,
+        }
+        for row, y in zip(kw["annotation_text"], kw["y"])
+        for text, x in zip(row, kw["x"])
+    ]
 
-    figure.layout.xaxis.side = "bottom"
 
-    figure.layout.paper_bgcolor = "#11191d"
-    figure.layout.plot_bgcolor = "#11191d"
-    figure.layout.title = f"Outlier Significance Heatmap"
-    figure.layout.font = {"color": "white"}
+def heatmap_figure(z, x, y):
+    kw = heatmap_kwargs(z, x, y)
 
     z_clipped = np.clip(z, -8, 8)
 
-    return dict(
-        data=[
-            go.Heatmap(
-                x=x,
-                y=y,
-                z=z_clipped,
-                xgap=1,
-                ygap=1,
-                colorscale=kw.get("colorscale", "Viridis"),
-                transpose=True,
-            )
-        ],
-        layout=figure.layout,
+    # z only sets the colours, float32 is precise enough
+    return du.encode_figure(
+        du.figures.figure(
+            [
+                du.figures.trace(
+                    "heatmap",
+                    x=np.asarray(x),
+                    y=np.asarray(y),
+                    z=z_clipped,
+                    xgap=1,
+                    ygap=1,
+                    colorscale=kw.get("colorscale", "Viridis"),
+                    transpose=True,
+                )
+            ],
+            du.figures.layout(
+                title="Outlier Significance Heatmap",
+                template=du.theme.template("phik"),
+                annotations=heatmap_annotations(kw),
+            ),
+        ),
+        float32=True,
     )
 
 
@@ -202,146 +261,276 @@ def column_dropdown(cols, first_value=None, **kwargs):
     )
 
 
-first_heatmap, first_edges_x, first_edges_y = make_matrix(
-    columns[0], columns[1]
-)
-first_heatmap_kwargs = heatmap_kwargs(
-    first_heatmap, first_edges_x, first_edges_y
-)
+def pair_layout(x_col, y_col, session=None):
+    """Layout of the single pair page, starting with the (x_col, y_col) pair.
+
+    :param dict session: binning of this browser session, see save_session
+    """
+    session = session or {}
+    quantile = session.get("quantile", False)
+    edges = session.get("edges", {})
+    bins = (edges.get(x_col, 10), edges.get(y_col, 10))
+
+    first_heatmap, first_edges_x, first_edges_y = make_matrix(
+        x_col, y_col, bins=bins, quantile=quantile
+    )
+
+    return html.Div(
+        children=[
+            html.H1(
+                "\( \phi_k \) Demo",
+                style={"marginLeft": "5%", "textAlign": "center"},
+            ),
+            html.A(
+                "All pairs",
+                href="/matrix",
+                style={"marginLeft": "5%", "color": "white"},
+            ),
+            html.Div(
+                children=[
+                    html.P(
+                        "correlation",
+                        className="three offset-by-three columns",
+                        style={
+                            "color": "white",
+                            "fontSize": "16pt",
+                            "textAlign": "center",
+                            "border": "2px solid #FFFFFF",
+                        },
+                        id=Ids.phik_display,
+                    ),
+                    html.P(
+                        "significance",
+                        className="three columns",
+                        style={
+                            "color": "white",
+                            "fontSize": "16pt",
+                            "textAlign": "center",
+                            "border": "2px solid #FFFFFF",
+                        },
+                        id=Ids.significance_display,
+                    ),
+                    dcc.Interval(
+                        id=Ids.significance_interval,
+                        interval=500,
+                        disabled=True,
+                    ),
+                ],
+                className="row",
+                style={},
+            ),
+            html.Div(
+                children=[
+                    html.Div(
+                        children=[
+                            column_dropdown(columns, y_col, id=Ids.y_col),
+                            html.Button(
+                                "+",
+                                id=Ids.y_bin_add_button,
+                                style={"marginBottom": "25px"},
+                            ),
+                            html.Div(
+                                id=Ids.y_slider_container,
+                                children=[
+                                    range_slider(
+                                        id=Ids.y_slider,
+                                        edges=first_edges_y,
+                                        vertical=True,
+                                    )
+                                ],
+                                style={"height": "100%"},
+                            ),
+                            html.Button(
+                                "-",
+                                id=Ids.y_bin_remove_button,
+                                style={"marginTop": "25px"},
+                            ),
+                        ],
+                        className="one columns",
+                        style={
+                            "height": "350px",
+                            "marginLeft": "2%",
+                            "marginTop": "50px",
+                        },
+                    ),
+                    dcc.Graph(
+                        id=Ids.heatmap,
+                        figure=heatmap_figure(
+                            first_heatmap, first_edges_x, first_edges_y
+                        ),
+                        className="ten columns",
+                        style={"minHeight": "500px"},
+                    ),
+                    dcc.Store(id=Ids.heatmap_token),
+                ],
+                className="row",
+            ),
+            html.Div(
+                children=[
+                    html.Div("", className="one columns"),
+                    html.Button(
+                        "-", id=Ids.x_bin_remove_button, className="one columns"
+                    ),
+                    html.Div(
+                        id=Ids.x_slider_container,
+                        children=[
+                            range_slider(id=Ids.x_slider, edges=first_edges_x)
+                        ],
+                        className="eight columns",
+                    ),
+                    html.Button(
+                        "+", id=Ids.x_bin_add_button, className="one columns"
+                    ),
+                    column_dropdown(
+                        columns, x_col, id=Ids.x_col, className="one columns"
+                    ),
+                ],
+                className="row",
+                style={"marginLeft": "5%", "marginRight": "5%"},
+            ),
+            html.Div(
+                children=[
+                    # "Binning Style:",
+                    dcc.RadioItems(
+                        id=Ids.binning_radio,
+                        options=[
+                            dict(label="Equal Interval\t", value=False),
+                            dict(label="Quantile", value=True),
+                        ],
+                        value=quantile,
+                        labelStyle={
+                            "display": "inline-block",
+                            "marginLeft": "1em",
+                            "marginRight": "1em",
+                        },
+                        className="four offset-by-four columns",
+                    )
+                ],
+                className="row",
+                style={"paddingLeft": "5%", "color": "white"},
+            ),
+        ]
+    )
+
+
+# -- all pairs matrix
+
+# all pairs jobs by (bins, quantile), one computing at a time so that every job finishes
+matrix_service = phik_engine.PhikMatrixService(df, columns, cache=binned)
+
+
+def matrix_figure(matrix, title):
+    values = matrix.values
+    text = np.where(np.isnan(values), "", np.char.mod("%.2f", values))
+
+    # the hover text shows the values, z only sets the colours
+    return du.encode_figure(
+        du.figures.figure(
+            [
+                du.figures.trace(
+                    "heatmap",
+                    x=np.asarray(matrix.columns),
+                    y=np.asarray(matrix.index),
+                    z=values,
+                    text=text,
+                    hoverinfo="x+y+text",
+                    xgap=1,
+                    ygap=1,
+                    colorscale="Viridis",
+                )
+            ],
+            du.figures.layout(
+                title=title,
+                template=du.theme.template("phik"),
+                yaxis={"autorange": "reversed"},
+            ),
+        ),
+        float32=True,
+    )
 
-layout = html.Div(
+
+matrix_layout = html.Div(
     children=[
         html.H1(
-            "\( \phi_k \) Demo",
+            "\( \phi_k \) Correlation Matrix",
             style={"marginLeft": "5%", "textAlign": "center"},
         ),
         html.Div(
             children=[
                 html.P(
-                    "correlation",
-                    className="three offset-by-three columns",
-                    style={
-                        "color": "white",
-                        "fontSize": "16pt",
-                        "textAlign": "center",
-                        "border": "2px solid #FFFFFF",
-                    },
-                    id=Ids.phik_display,
-                ),
-                html.P(
-                    "significance",
-                    className="three columns",
-                    style={
-                        "color": "white",
-                        "fontSize": "16pt",
-                        "textAlign": "center",
-                        "border": "2px solid #FFFFFF",
-                    },
-                    id=Ids.significance_display,
+                    "",
+                    id=Ids.matrix_progress,
+                    className="four columns",
                 ),
-            ],
-            className="row",
-            style={},
-        ),
-        html.Div(
-            children=[
-                html.Div(
-                    children=[
-                        column_dropdown(columns, columns[0], id=Ids.y_col),
-                        html.Button(
-                            "+",
-                            id=Ids.y_bin_add_button,
-                            style={"marginBottom": "25px"},
-                        ),
-                        html.Div(
-                            id=Ids.y_slider_container,
-                            children=[
-                                range_slider(
-                                    id=Ids.y_slider,
-                                    edges=first_edges_y,
-                                    vertical=True,
-                                )
-                            ],
-                            style={"height": "100%"},
-                        ),
-                        html.Button(
-                            "-",
-                            id=Ids.y_bin_remove_button,
-                            style={"marginTop": "25px"},
-                        ),
+                dcc.RadioItems(
+                    id=Ids.matrix_value_radio,
+                    options=[
+                        dict(label="Correlation", value="phik"),
+                        dict(label="Significance", value="significance"),
                     ],
-                    className="one columns",
-                    style={
-                        "height": "350px",
-                        "marginLeft": "2%",
-                        "marginTop": "50px",
-                    },
-                ),
-                dcc.Graph(
-                    id=Ids.heatmap,
-                    figure=heatmap_figure(
-                        first_heatmap, first_edges_x, first_edges_y
-                    ),
-                    className="ten columns",
-                    style={"minHeight": "500px"},
-                ),
-            ],
-            className="row",
-        ),
-        html.Div(
-            children=[
-                html.Div("", className="one columns"),
-                html.Button(
-                    "-", id=Ids.x_bin_remove_button, className="one columns"
+                    value="phik",
+                    labelStyle={"display": "inline-block", "marginRight": "1em"},
+                    className="four columns",
                 ),
-                html.Div(
-                    id=Ids.x_slider_container,
-                    children=[
-                        range_slider(id=Ids.x_slider, edges=first_edges_x)
+                dcc.RadioItems(
+                    id=Ids.matrix_binning_radio,
+                    options=[
+                        dict(label="Equal Interval\t", value=False),
+                        dict(label="Quantile", value=True),
                     ],
-                    className="eight columns",
-                ),
-                html.Button(
-                    "+", id=Ids.x_bin_add_button, className="one columns"
-                ),
-                column_dropdown(
-                    columns, columns[1], id=Ids.x_col, className="one columns"
+                    value=False,
+                    labelStyle={"display": "inline-block", "marginRight": "1em"},
+                    className="four columns",
                 ),
             ],
             className="row",
-            style={"marginLeft": "5%", "marginRight": "5%"},
+            style={"paddingLeft": "5%", "color": "white"},
         ),
         html.Div(
             children=[
-                # "Binning Style:",
-                dcc.RadioItems(
-                    id=Ids.binning_radio,
-                    options=[
-                        dict(label="Equal Interval\t", value=False),
-                        dict(label="Quantile", value=True),
-                    ],
-                    value=False,
-                    labelStyle={
-                        "display": "inline-block",
-                        "marginLeft": "1em",
-                        "marginRight": "1em",
-                    },
-                    className="four offset-by-four columns",
+                dcc.Slider(
+                    id=Ids.matrix_bins,
+                    min=2,
+                    max=50,
+                    step=1,
+                    value=10,
+                    marks={i: str(i) for i in (2, 10, 20, 30, 40, 50)},
                 )
             ],
             className="row",
-            style={"paddingLeft": "5%", "color": "white"},
+            style={"marginLeft": "5%", "marginRight": "5%"},
+        ),
+        dcc.Graph(
+            id=Ids.matrix_heatmap,
+            style={"minHeight": "700px"},
+        ),
+        dcc.Interval(id=Ids.matrix_interval, interval=1000),
+        html.P(
+            "Click a cell to inspect the pair.",
+            style={"color": "white", "textAlign": "center"},
         ),
     ]
 )
 
+layout = pair_layout(columns[1], columns[0])
+
 # --  app
 # in place so we can reuse this script in multipage app. If run stand-alone, new all is initialized
 if __name__ == "df_summary":
     from app import app
 else:
     app = dash.Dash(__name__)
-    app.layout = layout
+    app.config.suppress_callback_exceptions = True
+    du.instrument(app)
+    app.server.add_url_rule(
+        "/metrics", "metrics", du.metrics_response(app.callback_stats)
+    )
+    app.layout = html.Div(
+        [dcc.Location(id=Ids.location, refresh=False),
+         # interaction state of the browser session, so no server worker has to keep it
+         dcc.Store(id=Ids.session_store, storage_type="session"),
+         html.Div(id=Ids.page_content, children=layout)]
+    )
     app.scripts.append_script({"external_url": mathjax})
     app.title = "Phi_K demo"
 # -- update functions
@@ -374,14 +563,23 @@ def y_slider_labels_callback(values, y_col):
         return {v: f"{v:.2f}" for v in values}
 
 
+# the heatmaps last sent to the browsers
+heatmap_states = du.FigureStates()
+
+
 @app.callback(
-    Output(Ids.heatmap, "figure"),
+    [Output(Ids.heatmap, "figure"), Output(Ids.heatmap_token, "data")],
     inputs=[Input(Ids.x_slider, "value"), Input(Ids.y_slider, "value")],
-    state=[State(Ids.x_col, "value"), State(Ids.y_col, "value")],
+    state=[
+        State(Ids.x_col, "value"),
+        State(Ids.y_col, "value"),
+        State(Ids.heatmap_token, "data"),
+    ],
 )
-def heatmap_edges_callback(edges_x, edges_y, x_col, y_col):
+def heatmap_edges_callback(edges_x, edges_y, x_col, y_col, token):
     z, x, y = make_matrix(x_col, y_col, bins=(edges_x, edges_y))
-    return heatmap_figure(z, x, y)
+    # only the changed z, axes and annotations are sent, the template stays in the browser
+    return heatmap_states.update(token, heatmap_figure(z, x, y))
 
 
 @app.callback(
@@ -394,7 +592,7 @@ def update_x_col(x_col, current_edges, quantile):
     if isinstance(df[x_col].iloc[0], str):
         new_edges = np.sort(np.unique(df[x_col]))
     else:
-        new_edges = phik.binning.bin_edges(df[x_col], n_edges - 1, quantile)
+        new_edges = binned.edges(x_col, n_edges - 1, quantile)
     return [range_slider(id=Ids.x_slider, edges=new_edges.tolist())]
 
 
@@ -408,7 +606,7 @@ def update_y_col(y_col, current_edges, quantile):
     if isinstance(df[y_col].iloc[0], str):
         new_edges = np.sort(np.unique(df[y_col]))
     else:
-        new_edges = phik.binning.bin_edges(df[y_col], n_edges - 1, quantile)
+        new_edges = binned.edges(y_col, n_edges - 1, quantile)
     return [
         range_slider(id=Ids.y_slider, edges=new_edges.tolist(), vertical=True)
     ]
@@ -427,27 +625,26 @@ def update_x_bins(n_add, n_remove, quantile, edges_x_old, x_col):
     if isinstance(df[x_col].values[0], str):
         return edges_x_old
 
+    # decide on what triggered the callback, not on click counts kept in the process
+    triggered = du.triggered_ids()
     current_n_edges = len(edges_x_old)
 
-    n_add = n_add or 0
-    n_remove = n_remove or 0
-
-    if n_add != GlobalState.X_BINS_ADD_CLICKS:
+    if Ids.x_bin_add_button in triggered:
         new_n_edges = current_n_edges + 1
-        GlobalState.X_BINS_ADD_CLICKS = n_add
-    elif n_remove != GlobalState.X_BINS_REMOVE_CLICKS:
+    elif Ids.x_bin_remove_button in triggered:
         new_n_edges = current_n_edges - 1
-        GlobalState.X_BINS_REMOVE_CLICKS = n_remove
-    else:
+    elif Ids.binning_radio in triggered:
         new_n_edges = current_n_edges
+    else:
+        # initial call: keep the edges of the layout, which may come from the session
+        return dash.no_update
 
     if new_n_edges <= 0:
         return edges_x_old
 
     # x = np.linspace(*min_max(edges_x_old), new_n_edges)
 
-    x = phik.binning.bin_edges(df[x_col], new_n_edges - 1, quantile)
-    print(f'!!!! --- NEW X:{x}')
+    x = binned.edges(x_col, new_n_edges - 1, quantile)
     return x.tolist()
 
 
@@ -464,26 +661,26 @@ def update_y_bins(n_add, n_remove, quantile, edges_y_old, y_col):
     if isinstance(df[y_col].values[0], str):
         return edges_y_old
 
+    # decide on what triggered the callback, not on click counts kept in the process
+    triggered = du.triggered_ids()
     current_n_edges = len(edges_y_old)
 
-    n_add = n_add or 0
-    n_remove = n_remove or 0
-
-    if n_add != GlobalState.Y_BINS_ADD_CLICKS:
+    if Ids.y_bin_add_button in triggered:
         new_n_edges = current_n_edges + 1
-        GlobalState.Y_BINS_ADD_CLICKS = n_add
-    elif n_remove != GlobalState.Y_BINS_REMOVE_CLICKS:
+    elif Ids.y_bin_remove_button in triggered:
         new_n_edges = current_n_edges - 1
-        GlobalState.Y_BINS_REMOVE_CLICKS = n_remove
-    else:
+    elif Ids.binning_radio in triggered:
         new_n_edges = current_n_edges
+    else:
+        # initial call: keep the edges of the layout, which may come from the session
+        return dash.no_update
 
     if new_n_edges <= 0:
         return edges_y_old
 
     # y = np.linspace(*min_max(edges_y_old), new_n_edges)
 
-    y = phik.binning.bin_edges(df[y_col], new_n_edges - 1, quantile)
+    y = binned.edges(y_col, new_n_edges - 1, quantile)
 
     return y.tolist()
 
@@ -494,43 +691,130 @@ def update_y_bins(n_add, n_remove, quantile, edges_y_old, y_col):
     state=[State(Ids.x_col, "value"), State(Ids.y_col, "value")],
 )
 def update_phik_display(x_bins, y_bins, x_col, y_col):
-    num_vars = []
-    if not isinstance(df[x_col].iloc[0], str):
-        num_vars.append("x")
-
-    if not isinstance(df[y_col].iloc[0], str):
-        num_vars.append("y")
-
-    new_phik = phik.phik_from_array(
-        df[x_col], df[y_col], num_vars, bins={"x": x_bins, "y": y_bins}
+    table = pair_table(
+        x_col, y_col, column_edges(x_col, x_bins), column_edges(y_col, y_bins)
     )
+    new_phik, _ = phik_engine.phik_from_table(table, significance=False)
 
     return f"correlation = {new_phik:.3g}"
 
 
 @app.callback(
-    Output(Ids.significance_display, "children"),
-    inputs=[Input(Ids.x_slider, "value"), Input(Ids.y_slider, "value")],
+    [
+        Output(Ids.significance_display, "children"),
+        Output(Ids.significance_interval, "disabled"),
+    ],
+    inputs=[
+        Input(Ids.x_slider, "value"),
+        Input(Ids.y_slider, "value"),
+        Input(Ids.significance_interval, "n_intervals"),
+    ],
     state=[State(Ids.x_col, "value"), State(Ids.y_col, "value")],
 )
-def update_significance_display(x_bins, y_bins, x_col, y_col):
-    num_vars = []
-    if not isinstance(df[x_col].iloc[0], str):
-        num_vars.append("x")
-
-    if not isinstance(df[y_col].iloc[0], str):
-        num_vars.append("y")
+def update_significance_display(x_bins, y_bins, n_intervals, x_col, y_col):
+    table = pair_table(
+        x_col, y_col, column_edges(x_col, x_bins), column_edges(y_col, y_bins)
+    )
 
     try:
-        _, new_sig = phik.significance_from_array(
-            df[x_col], df[y_col], num_vars, bins={"x": x_bins, "y": y_bins}
-        )
+        # the callback does not wait for the simulations: the interval polls
+        # the job and refines the estimate until all batches are done
+        job = significance_service.submit(table)
+        _, new_sig = job.estimate(wait=False)
+
+        if job.done:
+            return f"significance = {new_sig:.3g}", True
 
-        return f"significance = {new_sig:.3g}"
+        n_done, n_total = job.progress
+        if np.isnan(new_sig):
+            return f"significance: computing\u2026 ({n_done}/{n_total})", False
+        return f"significance \u2248 {new_sig:.3g} ({n_done}/{n_total})", False
 
     except Exception as e:
         logging.exception("Error in significance calculation")
-        return "significance <error>"
+        return "significance <error>", True
+
+
+@app.callback(
+    Output(Ids.page_content, "children"),
+    inputs=[Input(Ids.location, "pathname"), Input(Ids.location, "search")],
+    state=[State(Ids.session_store, "data")],
+)
+def display_page(pathname, search, session):
+    if pathname == "/matrix":
+        return matrix_layout
+
+    query = parse_qs((search or "").lstrip("?"))
+    x_col = query.get("x", [columns[1]])[0]
+    y_col = query.get("y", [columns[0]])[0]
+    if x_col not in columns or y_col not in columns:
+        x_col, y_col = columns[1], columns[0]
+    return pair_layout(x_col, y_col, session)
+
+
+@app.callback(
+    Output(Ids.session_store, "data"),
+    inputs=[
+        Input(Ids.x_slider, "value"),
+        Input(Ids.y_slider, "value"),
+        Input(Ids.binning_radio, "value"),
+    ],
+    state=[
+        State(Ids.x_col, "value"),
+        State(Ids.y_col, "value"),
+        State(Ids.session_store, "data"),
+    ],
+)
+def save_session(x_edges, y_edges, quantile, x_col, y_col, session):
+    """Remember the binning and the edges per interval column for this browser session"""
+    session = session or {}
+    edges = dict(session.get("edges", {}))
+    for col, col_edges in ((x_col, x_edges), (y_col, y_edges)):
+        if binned.is_interval(col) and col_edges:
+            edges[col] = col_edges
+    return {"quantile": quantile, "edges": edges}
+
+
+@app.callback(
+    [
+        Output(Ids.matrix_heatmap, "figure"),
+        Output(Ids.matrix_progress, "children"),
+        Output(Ids.matrix_interval, "disabled"),
+    ],
+    inputs=[
+        Input(Ids.matrix_interval, "n_intervals"),
+        Input(Ids.matrix_bins, "value"),
+        Input(Ids.matrix_binning_radio, "value"),
+        Input(Ids.matrix_value_radio, "value"),
+    ],
+)
+def update_matrix(n_intervals, bins, quantile, value):
+    job = matrix_service.get(bins, quantile)
+    phik_matrix, significance_matrix = job.matrices()
+
+    if value == "significance":
+        figure = matrix_figure(significance_matrix, "Significance Matrix")
+    else:
+        figure = matrix_figure(phik_matrix, "Correlation Matrix")
+
+    n_done, n_total = job.progress
+    if not job.started:
+        return figure, f"waiting for other matrices ({n_total} pairs)", False
+    return figure, f"{n_done} / {n_total} pairs", job.done
+
+
+@app.callback(
+    Output(Ids.location, "href"),
+    inputs=[Input(Ids.matrix_heatmap, "clickData")],
+)
+def open_pair(click_data):
+    if not click_data:
+        return dash.no_update
+
+    point = click_data["points"][0]
+    if point["x"] == point["y"]:
+        return dash.no_update
+    return "/?" + urlencode({"x": point["x"], "y": point["y"]})
 
 
 if __name__ == "__main__":
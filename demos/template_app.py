@@ -1,9 +1,7 @@
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Output, Input, State
-
-import plotly.graph_objs as go
+from dash.dependencies import ALL, Output, Input, State
 
 import dash_utils as du
 from dash_utils import row, column
@@ -61,18 +59,14 @@ else:
     selected_options = []
     variables = {}
 # -- SETTINGS
-layout_kwargs = dict(plot_bgcolor='#263740',
-                     paper_bgcolor='#1d2930',
-                     font=dict(color='white'),
-                     margin=go.layout.Margin(b=30, l=30,
-                                             r=30, t=40,
-                                             pad=5))
-
-table_layout_kwargs = dict(style_header={'backgroundColor': layout_kwargs['plot_bgcolor'],
+# the colours of the figures are in the registered template, see du.theme
+colors = du.theme.COLORS
+
+table_layout_kwargs = dict(style_header={'backgroundColor': colors['plot_bgcolor'],
                                          'fontWeight': 'bold',
                                          'fontSize': '2em'},
-                           style_cell={'backgroundColor': layout_kwargs['paper_bgcolor'],
-                                       'color': layout_kwargs['font']['color'],
+                           style_cell={'backgroundColor': colors['paper_bgcolor'],
+                                       'color': colors['font'],
                                        'fontSize': '.7em',
                                        'height': '5px'},
                            style_cell_conditional=[{'if': {'column_id': 'var'},
@@ -80,19 +74,27 @@ table_layout_kwargs = dict(style_header={'backgroundColor': layout_kwargs['plot_
 
 
 # -- FIGURES AND CONTROLS
+# one callback per grid serves all its graphs, see du.FigureGrid
+histograms = du.FigureGrid('histogram', 2, fig_names=['Graph 0', 'Graph 1'])
+scatters = du.FigureGrid('scatter', 1, fig_names=['Graph 2'])
+# histogram 0 and the scatter are used to select rows, histogram 1 shows the selected rows
+SELECTING = {('histogram', 0), ('scatter', 0)}
+
 # options = [{'label': x, 'value': x} for x in df.columns.values]
-controls = du.make_control_list([dict(name='Dropdown', args={'options': options, 'value': None, 'id': 'dropdown_0'}),
-                                 dict(name='Slider', args=dict(min=0, max=100, value=50, step=1, id="slider_0")),
-                                 dict(name='Dropdown', args={'options': options, 'value': None, 'id': 'dropdown_1'}),
-                                 dict(name='Slider', args=dict(min=0, max=100, value=50, step=1, id="slider_1")),
-                                 dict(name='Dropdown', args={'options': options, 'value': None, 'id': 'dropdown_2'}),
-                                 dict(name='Dropdown', args={'options': options, 'value': None, 'id': 'dropdown_3'})])
+histogram_x = histograms.controls('x', dcc.Dropdown, options=options, value=None)
+histogram_bins = histograms.controls('bins', dcc.Slider, min=0, max=100, value=50, step=1)
+scatter_x = scatters.controls('x', dcc.Dropdown, options=options, value=None)
+scatter_y = scatters.controls('y', dcc.Dropdown, options=options, value=None)
+controls = [*(control for pair in zip(histogram_x, histogram_bins) for control in pair), *scatter_x, *scatter_y]
 
 # -- make grids
-figure_childs = du.figure_grid(3, layout_kwargs=layout_kwargs)
+figure_childs = du.grid_layout([*histograms.graphs(), *scatters.graphs()])
 filter_controls = [dcc.Dropdown(options=[{'label': x, 'value': x} for x in selected_options],
                                 id='filter_dropdown',
-                                value=None)]
+                                value=None),
+                   # rows with any of these values of the filter column are shown
+                   dcc.Dropdown(options=[], id='filter_values', value=[], multi=True,
+                                placeholder='All values')]
 
 
 # -- LAYOUT
@@ -109,60 +111,129 @@ layout = html.Div([
 # -- APP
 # in place so we can reuse this script in multipage app. If run stand-alone, new all is initialized
 if __name__ == 'template_app':
-    from app import app
+    from app import app, datasets, figure_cache
 else:
     app = dash.Dash(__name__,
                     assets_folder=os.path.join(os.path.dirname(__file__)))
     app.layout = layout
     app.title = 'Dash template'
+    datasets = du.DatasetStore()
+    figure_cache = du.FigureCache()
+
+# the same figure is built once for all sessions
+make_histogram = figure_cache.memoize(du.make_histogram)
+make_scatter = figure_cache.memoize(du.make_scatter)
+data_profile_tables = figure_cache.memoize(du.data_profile_tables)
+
+# complete figures are sent when the server does not know the figure in the browser
+figure_layout = {'template': du.theme.template()}
 
 # -- CALLBACKS
 
 
-@app.callback(Output('fig_0', 'figure'),
-              [Input('dropdown_0', 'value'),
-               Input('slider_0', 'value'),
-               Input('filter_dropdown', 'value')],
-              [State('data_container', 'children')])
-def make_histogram1(col, bins, color_filter, raw_data):
-    print(raw_data)
-    if raw_data:
-        dff = pd.read_json(raw_data, orient='split')
-        return du.make_histogram(dff, col, bins, color_filter, layout_kwargs)
+def category_filter(dataset, color_filter, values):
+    """Rows with one of the selected values of the filter column, None for all rows"""
+    if color_filter is None:
+        return None
+    return du.filter_rows(dataset, {'column': color_filter, 'values': values})
 
 
-@app.callback(Output('fig_1', 'figure'),
-              [Input('dropdown_1', 'value'),
-               Input('slider_1', 'value'),
-               Input('filter_dropdown', 'value')],
-              [State('data_container', 'children')]
-              )
-def make_histogram2(col, bins, color_filter, raw_data):
-    if raw_data:
-        dff = pd.read_json(raw_data[0], orient='split')
-        return du.make_histogram(dff, col, bins, color_filter, layout_kwargs)
+def figure_selection(dataset, selected_data, rows_per_trace, x=None, y=None):
+    """Rows selected in a figure; box selections on numeric axes use the range index"""
+    numeric = [col if col is not None and pd.api.types.is_numeric_dtype(dataset.df[col]) else None for col in (x, y)]
+    ranges = du.selected_ranges(selected_data, *numeric)
+    if ranges:
+        return du.range_selection(dataset, ranges)
+    return du.selected_rows(selected_data, rows_per_trace, len(dataset))
 
 
-@app.callback(Output('fig_2', 'figure'),
-              [Input('dropdown_2', 'value'),
-               Input('dropdown_3', 'value'),
-               Input('filter_dropdown', 'value')],
-              [State('data_container', 'children')]
-              )
-def make_scatter1(x, y, color_filter, raw_data):
-    if raw_data:
-        dff = pd.read_json(raw_data[0], orient='split')
-        return du.make_scatter(dff, x, y, color_filter, layout_kwargs)
+@app.callback(Output('filter_values', 'options'),
+              [Input('filter_dropdown', 'value')],
+              [State('data_container', 'children'),
+               State('data_key', 'data')])
+def update_filter_values(color_filter, raw_data, data_key):
+    dataset = datasets.get(raw_data, data_key)
+    if dataset is None or color_filter is None:
+        return []
+    values = dataset.category_index(color_filter).values
+    if len(values) > du.filters.MAX_BITMAP_VALUES:
+        # a column like an identifier is not offered value by value
+        return []
+    return [{'label': '(missing)' if v is None else str(v), 'value': v.item() if hasattr(v, 'item') else v}
+            for v in values]
+
+
+def figure_layout_of(grid, index):
+    """Layout of a figure; the figures that select rows start in select mode"""
+    if (grid.name, index) in SELECTING:
+        return dict(figure_layout, dragmode='select')
+    return figure_layout
+
+
+@histograms.callback(app,
+                     [Input(histograms.id('x'), 'value'),
+                      Input(histograms.id('bins'), 'value'),
+                      Input('filter_dropdown', 'value'),
+                      Input('filter_values', 'value'),
+                      Input(histograms.id('graph', ALL), 'selectedData'),
+                      Input(scatters.id('graph', ALL), 'selectedData')],
+                     [State(histograms.id('x', ALL), 'value'),
+                      State(scatters.id('x', ALL), 'value'),
+                      State(scatters.id('y', ALL), 'value'),
+                      State('data_container', 'children'),
+                      State('data_key', 'data')])
+def make_histograms(index, col, bins, color_filter, values, histogram_selections, scatter_selections,
+                    histogram_cols, scatter_xs, scatter_ys, raw_data, data_key):
+    dataset = datasets.get(raw_data, data_key)
+    if dataset is None:
+        return None
+    triggered = du.triggered_grid_ids()
+    if triggered and all(i['kind'] == 'graph' for i in triggered):
+        # a selection only changes the figures that show the selected rows
+        if ('histogram', index) in SELECTING or not any((i['grid'], i['index']) in SELECTING for i in triggered):
+            return None
+
+    dff = dataset.df
+    filtered = category_filter(dataset, color_filter, values)
+    sel = None
+    if ('histogram', index) not in SELECTING:
+        # the selecting figures show the filtered rows, split in traces by the color filter
+        rows_per_trace, _ = du.trace_rows(dff, color_filter, filtered)
+        sel = du.intersect_selections(
+            *(figure_selection(dataset, histogram_selections[i], rows_per_trace, x=histogram_cols[i])
+              for i in range(histograms.n_figures) if ('histogram', i) in SELECTING),
+            *(figure_selection(dataset, scatter_selections[i], rows_per_trace, x=scatter_xs[i], y=scatter_ys[i])
+              for i in range(scatters.n_figures) if ('scatter', i) in SELECTING))
+        if sel is not None and filtered is not None:
+            # box selections are answered for all rows, keep the filtered ones
+            sel = sel[filtered[sel]]
+    return make_histogram(dff, col, bins, color_filter, figure_layout_of(histograms, index),
+                          sel=filtered if sel is None else sel)
+
+
+@scatters.callback(app,
+                   [Input(scatters.id('x'), 'value'),
+                    Input(scatters.id('y'), 'value'),
+                    Input('filter_dropdown', 'value'),
+                    Input('filter_values', 'value')],
+                   [State('data_container', 'children'),
+                    State('data_key', 'data')])
+def make_scatters(index, x, y, color_filter, values, raw_data, data_key):
+    dataset = datasets.get(raw_data, data_key)
+    if dataset is None:
+        return None
+    return make_scatter(dataset.df, x, y, color_filter, figure_layout_of(scatters, index),
+                        sel=category_filter(dataset, color_filter, values))
 
 
 @app.callback(Output('ta_table', 'data'),
-              [Input('dropdown_0', 'value')],
+              [Input(histograms.id('x', 0), 'value')],
               [State('var_container', 'children')]
               )
 def update_describe(col, var_string):
 
     if (col != 0) and (col is not None):
-        return du.data_profile_tables(var_string, col).data
+        return data_profile_tables(var_string, col).data
     else:
         return []
 
@@ -0,0 +1,93 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestBinning(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.df = pd.DataFrame({'a': rng.normal(size=1000),
+                                'b': rng.normal(size=1000),
+                                'c': rng.choice(['x', 'y', 'z'], 1000)})
+        self.df.loc[::10, 'a'] = np.nan
+
+    def test_code_dtype(self):
+
+        self.assertTrue(du.binning.code_dtype(10) == np.uint8)
+        self.assertTrue(du.binning.code_dtype(255) == np.uint16)
+
+    def test_bin_codes_missing(self):
+
+        codes = du.bin_codes(np.array([0.5, 1., 1.5, 5., np.nan]), [0., 1., 2.])
+        self.assertTrue(codes.tolist() == [0, 0, 1, 255, 255])
+
+    def test_bin_codes_underflow(self):
+
+        codes = du.bin_codes(np.array([-1., 0.]), [0., 1., 2.])
+        self.assertTrue(codes.tolist() == [255, 255])
+
+    def test_contingency_matches_crosstab(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        edges = cache.edges('a', 5)
+        table = cache.contingency('a', 'c', x_edges=edges)
+
+        binned = pd.cut(self.df['a'], edges)
+        expected = pd.crosstab(binned, self.df['c']).values
+        self.assertTrue((table == expected).all())
+
+    def test_cache_reuses_codes(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        codes, n_bins = cache.codes('a', cache.edges('a', 5))
+        self.assertTrue(n_bins == 5)
+        self.assertIs(cache.codes('a', cache.edges('a', 5))[0], codes)
+        self.assertTrue(list(cache.labels('c')) == ['x', 'y', 'z'])
+
+    def test_contingency_engine_moves_edge(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        edges = cache.edges('a', 5).copy()
+        engine = du.ContingencyEngine(cache, 'a', 'c', x_edges=edges)
+
+        edges[2] += 0.1
+        table = engine.update(x_edges=edges)
+        self.assertTrue((table == cache.contingency('a', 'c', x_edges=edges)).all())
+
+        edges[0] += 0.5
+        table = engine.update(x_edges=edges)
+        self.assertTrue((table == cache.contingency('a', 'c', x_edges=edges)).all())
+
+    def test_contingency_engine_moves_edges_of_both_axes(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        x_edges, y_edges = np.linspace(-2., 2., 6), np.linspace(-1.5, 2.5, 5)
+        engine = du.ContingencyEngine(cache, 'a', 'b', x_edges=x_edges, y_edges=y_edges)
+        axes = engine.x_axis, engine.y_axis
+
+        def histogram2d():
+            valid = self.df[['a', 'b']].dropna()
+            return np.histogram2d(valid['a'], valid['b'], bins=[x_edges, y_edges])[0]
+
+        x_edges[2] += 0.3
+        self.assertTrue((engine.update(x_edges=x_edges, y_edges=y_edges) == histogram2d()).all())
+        # the codes of the other axis follow the edge moved on it
+        y_edges[1] -= 0.4
+        self.assertTrue((engine.update(x_edges=x_edges, y_edges=y_edges) == histogram2d()).all())
+        x_edges[0] += 0.2
+        y_edges[-1] -= 0.5
+        self.assertTrue((engine.update(x_edges=x_edges, y_edges=y_edges) == histogram2d()).all())
+        # without rebuilding the table
+        self.assertTrue(engine.x_axis is axes[0] and engine.y_axis is axes[1])
+
+    def test_contingency_engine_rebuilds(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        engine = du.ContingencyEngine(cache, 'a', 'c', x_edges=cache.edges('a', 5))
+
+        edges = cache.edges('a', 8)
+        table = engine.update(x_edges=edges)
+        self.assertTrue(table.shape == (8, 3))
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+import dash
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.df = pd.DataFrame({'x': np.arange(1000.), 'c': np.arange(1000) % 3})
+
+    def test_memoize(self):
+
+        cache = du.FigureCache()
+        make_histogram = cache.memoize(du.make_histogram)
+        figure = make_histogram(self.df, 'x', 10, 'c', sel=np.arange(500))
+        cached = make_histogram(self.df.copy(), 'x', 10, 'c', sel=np.arange(500))
+        self.assertTrue(du.figure_patch(figure, cached) is dash.no_update)
+        # every caller gets its own copy
+        self.assertTrue(make_histogram(self.df, 'x', 10, 'c', sel=np.arange(500)) is not figure)
+        make_histogram(self.df, 'x', 20, 'c', sel=np.arange(500))
+        make_histogram(self.df, 'x', 10, 'c', sel=np.arange(400))
+
+        summary = cache.summary()
+        self.assertTrue(summary.loc[0, 'builder'] == 'make_histogram')
+        self.assertTrue(list(summary.loc[0, ['calls', 'memory_hits', 'misses']]) == [5, 2, 3])
+        self.assertTrue(cache.hit_rate == 0.4)
+        self.assertTrue('dash_figure_cache_requests_total{builder="make_histogram",outcome="memory"} 2'
+                        in cache.prometheus())
+
+    def test_fingerprint(self):
+
+        dataset = du.Dataset(self.df, key='abc')
+        self.assertTrue(du.fingerprint(dataset.df) == dataset.fingerprint)
+        self.assertTrue(du.fingerprint(self.df.copy()) == du.fingerprint(self.df.copy()))
+        self.assertTrue(du.fingerprint(self.df.iloc[1:]) != du.fingerprint(self.df.copy()))
+
+        self.assertTrue(du.cache_key('f', (self.df.copy(), {'a': 1, 'b': 2}), {})
+                        == du.cache_key('f', (self.df.copy(), {'b': 2, 'a': 1}), {}))
+        self.assertTrue(du.cache_key('f', (np.arange(3),), {}) != du.cache_key('f', (np.arange(3.),), {}))
+
+    def test_max_bytes(self):
+
+        cache = du.FigureCache(max_bytes=30000)
+        make_scatter = cache.memoize(du.make_scatter)
+        for y in ['x', 'c', 'x']:
+            make_scatter(self.df, 'x', y)
+        # the first figure was dropped to make room for the second
+        self.assertTrue(list(cache.summary().loc[0, ['memory_hits', 'misses']]) == [0, 3])
+
+    def test_disk(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            make_histogram = du.FigureCache(directory=directory).memoize(du.make_histogram)
+            figure = make_histogram(self.df, 'x', 10)
+            self.assertTrue(len(os.listdir(directory)) == 1)
+
+            # a new process finds the result on disk
+            cache = du.FigureCache(directory=directory)
+            cached = cache.memoize(du.make_histogram)(self.df, 'x', 10)
+            self.assertTrue(du.figure_patch(figure, cached) is dash.no_update)
+            self.assertTrue(cache.summary().loc[0, 'disk_hits'] == 1)
+
+            cache.clear()
+            self.assertTrue(os.listdir(directory) == [])
+
+    def test_disk_shared(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            # two worker processes that started with an empty directory
+            first, second = du.FigureCache(directory=directory), du.FigureCache(directory=directory)
+            first.memoize(du.make_histogram)(self.df, 'x', 10)
+            second.memoize(du.make_histogram)(self.df, 'x', 10)
+            self.assertTrue(second.summary().loc[0, 'disk_hits'] == 1)
+
+            # the limit holds for the directory, not per process
+            size = os.path.getsize(os.path.join(directory, os.listdir(directory)[0]))
+            first.max_disk_bytes = second.max_disk_bytes = int(2.5 * size)
+            for i, cache in enumerate([first, second, first, second]):
+                cache.memoize(du.make_histogram)(self.df, 'x', 11 + i)
+            self.assertTrue(sum(os.path.getsize(os.path.join(directory, name))
+                                for name in os.listdir(directory)) <= 2.5 * size)
+
+    def test_signed(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            du.FigureCache(directory=directory, secret='abc').memoize(du.make_histogram)(self.df, 'x', 10)
+
+            cache = du.FigureCache(directory=directory, secret='abc')
+            cache.memoize(du.make_histogram)(self.df, 'x', 10)
+            self.assertTrue(cache.summary().loc[0, 'disk_hits'] == 1)
+
+            # a result that is not signed with the secret is not loaded
+            for secret in ('other', None):
+                cache = du.FigureCache(directory=directory, secret=secret)
+                cache.memoize(du.make_histogram)(self.df, 'x', 10)
+                self.assertTrue(cache.summary().loc[0, 'disk_hits'] == 0)
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestDtypes(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        cut = pd.Series(rng.choice(['Ideal', 'Good', 'Fair'], 1000), dtype=object)
+        cut[3] = None
+        self.df = pd.DataFrame({'price': rng.randint(300, 20000, 1000),
+                                'depth': rng.randint(-100, 100, 1000),
+                                'half': rng.randint(0, 100, 1000) / 2,
+                                'carat': rng.normal(size=1000),
+                                'cut': cut,
+                                'id': [f'row {i}' for i in range(1000)]})
+
+    def test_optimise_dtypes(self):
+
+        df, memory = du.optimise_dtypes(self.df)
+        self.assertTrue(df['price'].dtype == np.uint16)
+        self.assertTrue(df['depth'].dtype == np.int8)
+        self.assertTrue(df['half'].dtype == np.float32)
+        # float32 would change the values
+        self.assertTrue(df['carat'].dtype == np.float64)
+        self.assertTrue(isinstance(df['cut'].dtype, pd.CategoricalDtype))
+        self.assertFalse(isinstance(df['id'].dtype, pd.CategoricalDtype))
+
+        for col in self.df.columns:
+            self.assertTrue((df[col].astype(object).isna() == self.df[col].isna()).all())
+            self.assertTrue((df[col].astype(object) == self.df[col]).sum() == self.df[col].notnull().sum())
+            before, after = memory[col]
+            self.assertTrue(before == self.df[col].memory_usage(index=False, deep=True))
+            self.assertTrue(after <= before)
+        self.assertTrue(self.df['price'].dtype == np.int64)
+
+    def test_memory_size(self):
+
+        self.assertTrue(du.format_bytes(512) == '512 B')
+        self.assertTrue(du.format_bytes(3 * 1024 ** 2) == '3.0 MiB')
+        self.assertTrue(du.memory_size(4096, 1024) == '1.0 KiB (was 4.0 KiB, -75%)')
+        self.assertTrue(du.memory_size(1024, 1024) == '1.0 KiB')
+
+    def test_dataset_store(self):
+
+        dataset = du.DatasetStore().get(self.df.to_json(orient='split'))
+        self.assertTrue(isinstance(dataset.df['cut'].dtype, pd.CategoricalDtype))
+        self.assertTrue(set(dataset.memory) == set(self.df.columns))
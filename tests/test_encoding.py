@@ -0,0 +1,53 @@
+import json
+import unittest
+import numpy as np
+import pandas as pd
+import plotly
+
+import dash_utils as du
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_encode_array(self):
+
+        for array in (np.linspace(-1, 1, 10), np.arange(12, dtype=np.int16).reshape(3, 4),
+                      np.array([0, 2 ** 31], dtype=np.int64), np.array([np.nan, 1.5], dtype=np.float32)):
+            encoded = du.encode_array(array)
+            self.assertTrue(np.array_equal(du.decode_array(encoded), array, equal_nan=True))
+        self.assertTrue(du.encode_array(np.zeros((3, 4)))['shape'] == '3, 4')
+        self.assertTrue(du.encode_array(np.arange(3, dtype=np.int64))['dtype'] == 'u1')
+        self.assertTrue(du.encode_array(np.array([-1, 2 ** 16]))['dtype'] == 'i4')
+        self.assertTrue(du.encode_array(np.linspace(0, 1, 3), float32=True)['dtype'] == 'f4')
+
+    def test_whole_numbers(self):
+
+        counts = np.array([[0., 3.], [1000., 2.]])
+        encoded = du.encode_array(counts)
+        self.assertTrue(encoded['dtype'] == 'u2' and np.array_equal(du.decode_array(encoded), counts))
+        # a histogram of counts is smaller than as a JSON list
+        counts = np.random.RandomState(42).poisson(50, (100, 100)).astype(float)
+        self.assertTrue(len(json.dumps(du.encode_array(counts))) < len(json.dumps(counts.tolist())) / 3)
+        for array in (np.array([0., 0.5]), np.array([0., np.nan]), np.array([0., 2. ** 40])):
+            self.assertTrue(du.encode_array(array)['dtype'] == 'f8')
+        with self.assertRaises(TypeError):
+            du.encode_array(np.array(['a', 'b']))
+
+    def test_encode_figure(self):
+
+        rng = np.random.RandomState(42)
+        df = pd.DataFrame({'x': rng.normal(size=100), 'y': rng.normal(size=100),
+                           'hue': rng.choice(['a', 'b'], 100)})
+        figure = du.make_scatter(df, 'x', 'y', color_filter='hue')
+        encoded = du.encode_figure(figure)
+
+        self.assertTrue(encoded['layout'] is figure['layout'])
+        for trace, encoded_trace in zip(figure['data'], encoded['data']):
+            self.assertTrue(encoded_trace['x']['dtype'] == 'f8')
+            self.assertTrue(np.array_equal(du.decode_array(encoded_trace['x']), trace['x']))
+            self.assertTrue(encoded_trace['name'] == trace['name'])
+
+        # text stays as it is, and the figure is still valid JSON for dash
+        histogram = du.encode_figure(du.make_histogram(df, 'hue', 2))
+        self.assertTrue(list(histogram['data'][0]['x']) == list(df['hue']))
+        json.dumps(encoded, cls=plotly.utils.PlotlyJSONEncoder)
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestFigures(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.df = pd.DataFrame({'x': rng.normal(size=100),
+                                'y': rng.normal(size=100),
+                                'hue': rng.choice(['a', 'b', 'c'], 100)})
+
+    def test_builders_are_valid(self):
+
+        layout_kwargs = dict(plot_bgcolor='#263740', font=dict(color='white'), xaxis={'title': 'x'})
+        values = np.arange(16.).reshape(4, 4)
+        with du.strict_figures():
+            figures = [du.make_histogram(self.df, 'x', 10, layout_kwargs=layout_kwargs),
+                       du.make_histogram(self.df, 'x', 10, color_filter='hue'),
+                       du.make_histogram(self.df, None, 10),
+                       du.make_scatter(self.df, 'x', 'y', layout_kwargs=layout_kwargs),
+                       du.make_scatter(self.df, 'x', 'y', color_filter='hue'),
+                       du.make_heatmap(values, 4, 4, values.astype(str), colorscale=[0, 15], cmap=None),
+                       du.make_heatmap(values, None, None, None, colorscale=[0, 15], cmap='magma')]
+
+        for figure in figures:
+            self.assertIsInstance(figure, dict)
+            self.assertIsInstance(figure['layout']['title'], dict)
+            for trace in figure['data']:
+                self.assertIsInstance(trace, dict)
+        self.assertTrue(figures[0]['layout']['xaxis'] == {'title': {'text': 'x'}})
+        self.assertTrue([trace['name'] for trace in figures[1]['data']] == list(self.df['hue'].unique()))
+
+    def test_strict_mode(self):
+
+        trace = du.figures.trace('histogram', x=[1, 2], nbins=10)
+        # without validation the mistake is not noticed
+        du.figures.figure([trace], du.figures.layout(title='a'))
+        with du.strict_figures():
+            with self.assertRaises(ValueError):
+                du.figures.figure([trace], du.figures.layout(title='a'))
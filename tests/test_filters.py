@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestFilters(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.df = pd.DataFrame({'cut': rng.choice(['Ideal', 'Good', 'Fair'], 1001),
+                                'color': rng.choice(['D', 'E', 'F', 'G'], 1001),
+                                'n': rng.randint(0, 3, 1001)})
+        self.dataset = du.Dataset(self.df)
+
+    def test_or_within_column(self):
+
+        mask = du.filter_rows(self.dataset, {'column': 'cut', 'values': ['Ideal', 'Fair']})
+        self.assertTrue((mask == self.df['cut'].isin(['Ideal', 'Fair']).values).all())
+
+    def test_and_shorthand(self):
+
+        mask = du.filter_rows(self.dataset, {'cut': ['Good'], 'color': ['D', 'E'], 'n': [1]})
+        expected = (self.df['cut'] == 'Good') & self.df['color'].isin(['D', 'E']) & (self.df['n'] == 1)
+        self.assertTrue((mask == expected.values).all())
+
+    def test_nested_not(self):
+
+        expression = {'or': [{'column': 'cut', 'values': ['Fair']},
+                             {'not': {'column': 'color', 'values': ['D']}}]}
+        mask = du.filter_rows(self.dataset, expression)
+        expected = (self.df['cut'] == 'Fair') | (self.df['color'] != 'D')
+        self.assertTrue(len(mask) == 1001 and (mask == expected.values).all())
+
+    def test_no_values(self):
+
+        self.assertIsNone(du.filter_rows(self.dataset, {'column': 'cut', 'values': []}))
+        self.assertIsNone(du.filter_rows(self.dataset, None))
+        self.assertFalse(du.filter_rows(self.dataset, {'column': 'cut', 'values': ['x']}).any())
+
+    def test_missing_values(self):
+
+        df = pd.DataFrame({'c': ['a', None, 'b', None, 'a'], 'x': [1., np.nan, 2., 3., np.nan]})
+        dataset = du.Dataset(df)
+        self.assertTrue(dataset.category_index('c').values == ['a', 'b', None])
+        mask = du.filter_rows(dataset, {'column': 'c', 'values': [None, 'b']})
+        self.assertTrue(mask.tolist() == [False, True, True, True, False])
+        # as the browser sends nan back
+        mask = du.filter_rows(dataset, {'column': 'x', 'values': [np.nan]})
+        self.assertTrue(mask.tolist() == [False, True, False, False, True])
+
+    def test_bitmaps(self):
+
+        index = du.CategoryIndex(self.df['color'])
+        for i, value in enumerate(index.values):
+            self.assertTrue((index.bitmaps[i] == np.packbits(self.df['color'].values == value)).all())
+
+    def test_high_cardinality(self):
+
+        ids = pd.Series(np.arange(1001) % 500)
+        index = du.CategoryIndex(ids)
+        # no bitmap per value
+        self.assertTrue(index.bitmaps is None)
+        mask = du.filters.to_mask(index.bitmap([3, 7, 1000]), len(ids))
+        self.assertTrue((mask == ids.isin([3, 7]).values).all())
+
+    def test_filter_builders(self):
+
+        mask = du.filter_rows(self.dataset, {'column': 'cut', 'values': ['Ideal']})
+        hist = du.make_histogram(self.df, 'n', 3, color_filter='cut', sel=mask)
+        self.assertTrue(sum(len(trace['x']) for trace in hist['data']) == mask.sum())
+
+        records, _ = du.table_page(self.dataset, 0, 2000, sel=mask)
+        self.assertTrue(len(records) == mask.sum())
@@ -0,0 +1,108 @@
+import json
+import unittest
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+import numpy as np
+import pandas as pd
+from dash.dependencies import Input
+
+import dash_utils as du
+
+
+class TestGrid(unittest.TestCase):
+
+    def test_layout(self):
+
+        grid = du.FigureGrid('histogram', 5)
+        rows = grid.layout(n_columns=2)
+        self.assertTrue(len(rows) == 3)
+        graph = rows[2].children[0].children[0]
+        self.assertTrue(graph.id == {'grid': 'histogram', 'kind': 'graph', 'index': 4})
+        self.assertTrue(rows[0].children[0].className == 'five columns')
+
+        bins = grid.controls('bins', dcc.Slider, values=[10, 20, 30, 40, 50], min=1, max=100)
+        self.assertTrue([control.value for control in bins] == [10, 20, 30, 40, 50])
+        self.assertTrue(bins[1].id == grid.id('bins', 1))
+
+    def test_callback(self):
+
+        df = pd.DataFrame({'x': np.arange(100.), 'y': np.arange(100.) % 10})
+        grid = du.FigureGrid('histogram', 12)
+        app = dash.Dash(__name__)
+        app.layout = html.Div([*grid.layout(), *grid.controls('bins', dcc.Slider, min=1, max=100, value=10)])
+
+        calls = []
+
+        @grid.callback(app, [Input(grid.id('bins'), 'value')])
+        def make_histograms(index, bins):
+            calls.append(index)
+            return du.make_histogram(df, 'xy'[index % 2], bins)
+
+        # one callback serves all graphs
+        self.assertTrue(len(app.callback_map) == 1)
+
+        client = app.server.test_client()
+        client.get('/')
+
+        def key(kind, index):
+            # dash writes dict ids as JSON with sorted keys
+            return json.dumps(grid.id(kind, index), sort_keys=True, separators=(',', ':'))
+
+        def request(index, bins, token=None):
+            outputs = [{'id': grid.id(kind, index), 'property': prop} for kind, prop in
+                       (('graph', 'figure'), ('token', 'data'))]
+            body = dict(output=list(app.callback_map)[0], outputs=outputs,
+                        inputs=[{'id': grid.id('bins', index), 'property': 'value', 'value': bins}],
+                        state=[{'id': grid.id('token', index), 'property': 'data', 'value': token}],
+                        changedPropIds=[key('bins', index) + '.value'])
+            response = client.post('/_dash-update-component', json=body).get_json()['response']
+            return response[key('graph', index)]['figure'], response[key('token', index)]['data']
+
+        figure, token = request(7, 10)
+        self.assertTrue(calls == [7] and figure['data'][0]['nbinsx'] == 10)
+        # the next update of the same graph only has the changes
+        patch, _ = request(7, 20, token)
+        self.assertTrue([operation['location'] for operation in patch['operations']] == [['data', 0, 'nbinsx']])
+
+    def test_tabs(self):
+
+        df = pd.DataFrame({'x': np.arange(100.)})
+        grid = du.FigureGrid('histogram', 6, per_tab=4)
+        app = dash.Dash(__name__)
+        app.layout = html.Div([*grid.layout(), *grid.controls('bins', dcc.Slider, min=1, max=100, value=10)])
+        self.assertTrue([tab.value for tab in grid.layout()[0].children] == ['0', '1'])
+
+        calls = []
+
+        @grid.callback(app, [Input(grid.id('bins'), 'value')])
+        def make_histograms(index, bins):
+            calls.append(index)
+            return du.make_histogram(df, 'x', bins)
+
+        client = app.server.test_client()
+        client.get('/')
+        key = [key for key in app.callback_map if 'graph' in key][0]
+
+        def request(index, bins, visible, stale, changed):
+            outputs = [{'id': grid.id(kind, index), 'property': prop} for kind, prop in
+                       (('graph', 'figure'), ('token', 'data'), ('stale', 'data'))]
+            body = dict(output=key, outputs=outputs,
+                        inputs=[{'id': grid.id('bins', index), 'property': 'value', 'value': bins},
+                                {'id': grid.id('visible', index), 'property': 'data', 'value': visible}],
+                        state=[{'id': grid.id('token', index), 'property': 'data', 'value': None},
+                               {'id': grid.id('stale', index), 'property': 'data', 'value': stale}],
+                        changedPropIds=[json.dumps(grid.id(changed, index), sort_keys=True, separators=(',', ':'))
+                                        + ('.value' if changed == 'bins' else '.data')])
+            response = client.post('/_dash-update-component', json=body).get_json() or {}
+            # outputs without an update are left out of the response
+            return response.get('response', {}).get(json.dumps(grid.id('stale', index), sort_keys=True,
+                                                                separators=(',', ':')), {})
+
+        # a graph on a closed tab is only marked stale
+        self.assertTrue(request(5, 20, False, False, 'bins') == {'data': True} and calls == [])
+        # and computed when its tab opens
+        self.assertTrue(request(5, 20, True, True, 'visible') == {'data': False} and calls == [5])
+        # but not again when nothing changed
+        self.assertTrue(request(5, 20, True, False, 'visible') == {} and calls == [5])
+        self.assertTrue(request(5, 20, False, False, 'visible') == {} and calls == [5])
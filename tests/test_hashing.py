@@ -0,0 +1,84 @@
+import base64
+import io
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestHashing(unittest.TestCase):
+
+    def setUp(self):
+
+        self.df = pd.DataFrame({'x': np.arange(100.),
+                                'n': pd.array(np.arange(100), dtype='Int64'),
+                                's': [str(i % 7) for i in range(100)],
+                                'c': pd.Categorical([str(i % 3) for i in range(100)]),
+                                'd': pd.date_range('2020-01-01', periods=100),
+                                'b': np.arange(100) % 2 == 0})
+
+    def test_column_hashes(self):
+
+        hashes = du.column_hashes(self.df)
+        self.assertTrue(list(hashes) == list(self.df.columns))
+        self.assertTrue(hashes == du.column_hashes(self.df.copy()))
+
+        # a changed value only changes the hash of its column
+        changed = self.df.copy()
+        changed.loc[50, 's'] = 'changed'
+        changed.loc[50, 'n'] = pd.NA
+        changed_hashes = du.column_hashes(changed)
+        self.assertTrue([col for col in hashes if hashes[col] != changed_hashes[col]] == ['n', 's'])
+
+        # the name and the dtype are part of the hash
+        self.assertTrue(du.content_hash(self.df['x'], name='y') != hashes['x'])
+        self.assertTrue(du.content_hash(self.df['x'].astype('float32'), name='x') != hashes['x'])
+
+    def test_fingerprint(self):
+
+        dataset = du.Dataset(self.df)
+        self.assertTrue(dataset.column_hashes == du.column_hashes(self.df))
+        self.assertTrue(dataset.fingerprint == du.fingerprint(self.df.copy()))
+        self.assertTrue(dataset.fingerprint != du.Dataset(self.df[['s', 'x']]).fingerprint)
+        self.assertTrue(dataset.fingerprint != du.Dataset(self.df.iloc[::-1]).fingerprint)
+
+    def test_upload(self):
+
+        csv = self.df[['x', 's']].to_csv(index=False).encode()
+        contents = 'data:text/csv;base64,' + base64.b64encode(csv).decode()
+        upload_hash, decoded = du.hash_upload(contents, chunk_size=64)
+        self.assertTrue(decoded == csv)
+        # the hash does not depend on the size of the slices
+        self.assertTrue(upload_hash == du.hash_upload(contents)[0])
+
+        reads = []
+
+        def read(data):
+            reads.append(data)
+            return pd.read_csv(io.BytesIO(data))
+
+        store = du.DatasetStore()
+        raw_data, key = store.upload(contents, read)
+        # the same file is not read again
+        self.assertTrue(store.upload(contents, read) == (raw_data, key) and len(reads) == 1)
+        self.assertTrue(list(store.get(raw_data).df.columns) == ['x', 's'])
+
+        other = 'data:text/csv;base64,' + base64.b64encode(csv + b'1.0,a\n').decode()
+        self.assertTrue(len(store.get(*store.upload(other, read))) == 101 and len(reads) == 2)
+
+    def test_get_by_key(self):
+
+        store = du.DatasetStore()
+        raw_data = self.df[['x', 's']].to_json(orient='split')
+        dataset = store.get(raw_data)
+        self.assertTrue(dataset.key == du.DatasetStore.make_key(raw_data))
+
+        # a known key is found without hashing or parsing the data
+        with mock.patch.object(du.DatasetStore, 'make_key', side_effect=AssertionError):
+            self.assertTrue(store.get(raw_data, dataset.key) is dataset)
+            self.assertTrue(store.get(None, dataset.key) is dataset)
+        # an unknown key, e.g. of another process, falls back to the data
+        self.assertTrue(len(store.get(raw_data, 'unknown')) == 100)
+        self.assertTrue(store.get(None, 'unknown') is None)
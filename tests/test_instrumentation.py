@@ -0,0 +1,45 @@
+import unittest
+import dash
+import dash_html_components as html
+from dash.dependencies import Input, Output
+
+import dash_utils as du
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_stats_summary(self):
+
+        stats = du.CallbackStats(window=10)
+        for i in range(20):
+            stats.record('graph.figure', wall=i, cpu=i, response=100, input=10)
+
+        summary = stats.summary()
+        self.assertTrue(summary.loc[0, 'calls'] == 20)
+        # only the last 10 samples are used for the percentiles
+        self.assertTrue(summary.loc[0, 'wall p50'] == 14.5)
+        self.assertTrue('dash_callback_wall_seconds_count{callback="graph.figure"} 20' in stats.prometheus())
+
+    def test_instrument_callback(self):
+
+        app = dash.Dash(__name__)
+        app.layout = html.Div([html.Div(id='in'), html.Div(id='out')])
+        stats = du.instrument(app)
+        app.server.add_url_rule('/metrics', 'metrics', du.metrics_response(stats))
+
+        @app.callback(Output('out', 'children'), [Input('in', 'children')])
+        def echo(value):
+            return value * 2
+
+        client = app.server.test_client()
+        client.get('/')
+        body = dict(output='out.children', outputs={'id': 'out', 'property': 'children'},
+                    inputs=[{'id': 'in', 'property': 'children', 'value': 'abc'}], changedPropIds=['in.children'])
+        response = client.post('/_dash-update-component', json=body)
+        self.assertTrue(response.status_code == 200)
+
+        self.assertTrue(stats.callbacks() == ['out.children'])
+        # the sizes of the HTTP messages
+        self.assertTrue(stats.samples('out.children', 'response') == [len(response.get_data())])
+        self.assertTrue(stats.samples('out.children', 'input')[0] > len('"abc"'))
+        self.assertTrue('out.children' in client.get('/metrics').get_data(as_text=True))
@@ -0,0 +1,73 @@
+import unittest
+import dash
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+def locations(patch):
+    return [operation['location'] for operation in patch.to_plotly_json()['operations']]
+
+
+class TestPatches(unittest.TestCase):
+
+    def setUp(self):
+
+        self.df = pd.DataFrame({'x': np.arange(100.), 'y': np.arange(100.) % 7, 'c': np.arange(100) % 3})
+        self.layout = {'template': du.theme.template(), 'dragmode': 'select'}
+
+    def test_unknown_token(self):
+
+        states = du.FigureStates()
+        figure = du.make_histogram(self.df, 'x', 10, layout_kwargs=self.layout)
+        update, token = states.update(None, figure)
+        self.assertTrue(update is figure)
+        update, _ = states.update('unknown', figure)
+        self.assertTrue(update is figure)
+
+        # a token is only used once
+        update, _ = states.update(token, figure)
+        self.assertTrue(update is dash.no_update)
+        update, _ = states.update(token, figure)
+        self.assertTrue(update is figure)
+
+    def test_bins(self):
+
+        states = du.FigureStates()
+        _, token = states.update(None, du.encode_figure(du.make_histogram(self.df, 'x', 10, layout_kwargs=self.layout)))
+        update, _ = states.update(token, du.encode_figure(du.make_histogram(self.df, 'x', 20,
+                                                                            layout_kwargs=self.layout)))
+        # neither the layout nor the values of x are sent again
+        self.assertTrue(locations(update) == [['data', 0, 'nbinsx']])
+
+    def test_layout(self):
+
+        previous = du.figures.figure([du.figures.trace('histogram', x=np.arange(10.))],
+                                     du.figures.layout(title='a', height=300, **self.layout))
+        figure = du.figures.figure([du.figures.trace('histogram', x=np.arange(10.))],
+                                   du.figures.layout(title='b', **self.layout))
+        update = du.figure_patch(previous, figure)
+        self.assertTrue(locations(update) == [['layout', 'title'], ['layout', 'height']])
+        operations = update.to_plotly_json()['operations']
+        self.assertTrue(operations[0]['params']['value'] == {'text': 'b'})
+        self.assertTrue(operations[1]['operation'] == 'Delete')
+
+    def test_traces(self):
+
+        previous = du.make_scatter(self.df, 'x', 'y', 'c', self.layout)
+        figure = du.make_scatter(self.df, 'x', 'y', None, self.layout)
+        self.assertTrue(len(previous['data']) != len(figure['data']))
+        self.assertTrue(['data'] in locations(du.figure_patch(previous, figure)))
+
+        figure = du.make_histogram(self.df, 'x', 10, layout_kwargs=self.layout)
+        changed = du.figures.figure([du.figures.trace('box', x=np.arange(10.))], figure['layout'])
+        self.assertTrue(locations(du.figure_patch(figure, changed)) == [['data', 0]])
+
+    def test_max_entries(self):
+
+        states = du.FigureStates(max_entries=2)
+        figure = du.make_histogram(self.df, 'x', 10)
+        tokens = [states.update(None, figure)[1] for _ in range(3)]
+        self.assertTrue(states.update(tokens[0], figure)[0] is figure)
+        self.assertTrue(states.update(tokens[2], figure)[0] is dash.no_update)
@@ -0,0 +1,120 @@
+import unittest
+import numpy as np
+import pandas as pd
+import phik
+
+import dash_utils as du
+from dash_utils import phik_engine
+
+
+class TestPhikEngine(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.df = pd.DataFrame({'a': rng.normal(size=2000),
+                                'c': rng.choice(['x', 'y', 'z'], 2000)})
+        self.df['b'] = self.df['a'] + rng.normal(size=2000)
+
+    def test_phik_matches_phik_from_array(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        table = cache.contingency('a', 'b', cache.edges('a', 10), cache.edges('b', 10))
+        value, _ = phik_engine.phik_from_table(table, significance=False)
+
+        expected = phik.phik_from_array(self.df['a'].values, self.df['b'].values, ['x', 'y'])
+        self.assertAlmostEqual(value, expected)
+
+    def test_matrix_job(self):
+
+        job = phik_engine.PhikMatrixJob(self.df, max_workers=2, significance_method='asymptotic').start()
+        phik_matrix, significance_matrix = job.wait()
+        self.assertTrue(job.done)
+        self.assertTrue(phik_matrix.shape == (3, 3))
+        self.assertFalse(phik_matrix.isnull().values.any())
+
+    def test_significance_service(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        table = cache.contingency('a', 'c', x_edges=cache.edges('a', 5))
+
+        service = phik_engine.SignificanceService(max_workers=2, nsim=200, batch_size=50)
+        try:
+            job = service.submit(table)
+            self.assertIs(service.submit(table.copy()), job)
+            _, first = job.estimate()
+            self.assertFalse(np.isnan(first))
+
+            for future in job._futures:
+                future.result()
+            self.assertTrue(job.progress == (4, 4))
+            _, final = job.estimate()
+        finally:
+            service.shutdown()
+
+        # the result does not depend on the number of workers
+        service = phik_engine.SignificanceService(max_workers=1, nsim=200, batch_size=50)
+        try:
+            job = service.submit(table)
+            for future in job._futures:
+                future.result()
+            self.assertAlmostEqual(job.estimate()[1], final)
+        finally:
+            service.shutdown()
+
+    def test_matrix_service(self):
+
+        service = phik_engine.PhikMatrixService(self.df, max_workers=1, max_jobs=2,
+                                                significance_method='asymptotic')
+        first = service.get(5)
+        # a second binning waits for the first instead of cancelling it
+        second = service.get(10, quantile=True)
+        self.assertTrue(first.started and not second.started)
+        self.assertIs(service.get(5), first)
+
+        first.wait()
+        self.assertTrue(service.get(10, quantile=True).started)
+        second.wait()
+        self.assertTrue(first.done and second.done)
+
+        # finished jobs are forgotten first
+        service.get(20)
+        self.assertTrue(list(service._jobs) == [(10, True), (20, False)])
+
+    def test_significance_jobs_are_not_cancelled(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        tables = [cache.contingency('a', 'c', x_edges=cache.edges('a', bins)) for bins in (4, 5, 6)]
+
+        service = phik_engine.SignificanceService(max_workers=1, nsim=200, batch_size=50, max_jobs=2)
+        try:
+            jobs = [service.submit(table) for table in tables[:2]]
+            # the first job of another user keeps running
+            for future in jobs[0]._futures:
+                future.result()
+            self.assertTrue(jobs[0].done)
+
+            # beyond max_jobs the finished job is forgotten, not the running one
+            third = service.submit(tables[2])
+            self.assertTrue(service.submit(tables[1]) is jobs[1])
+            self.assertFalse(any(future.cancelled() for future in jobs[1]._futures + third._futures))
+            self.assertTrue(service.submit(tables[0]) is not jobs[0])
+        finally:
+            service.shutdown()
+
+    def test_cancelled_job_is_done(self):
+
+        cache = du.BinnedColumnCache(self.df)
+        table = cache.contingency('a', 'c', x_edges=cache.edges('a', 5))
+
+        service = phik_engine.SignificanceService(max_workers=1, nsim=2000, batch_size=50)
+        try:
+            job = service.submit(table)
+            job.cancel()
+            # the batch that was running when the job was cancelled still finishes
+            for future in job._futures:
+                if not future.cancelled():
+                    future.result()
+            self.assertTrue(job.cancelled and job.done)
+            self.assertTrue(any(future.cancelled() for future in job._futures))
+        finally:
+            service.shutdown()
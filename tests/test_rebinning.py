@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestRebinning(unittest.TestCase):
+
+    def setUp(self):
+
+        rng = np.random.default_rng(1)
+        self.df = pd.DataFrame({'x': rng.normal(size=1000),
+                                'c': rng.choice(['a', 'b', 'c'], size=1000),
+                                'h': rng.choice(['u', 'v'], size=1000)})
+        self.df.loc[::100, 'x'] = np.nan
+
+    def test_bin_counts(self):
+
+        counts = du.histogram_counts(self.df, 'x')
+        values = du.decode_array(counts['groups'][0]['counts'])
+        self.assertTrue(len(values) == du.MAX_BINS * (du.MAX_BINS + 1) // 2)
+
+        # the same counts as np.histogram for every number of bins
+        for n_bins in range(1, du.MAX_BINS + 1):
+            edges = np.linspace(counts['low'], counts['high'], n_bins + 1)
+            expected = np.histogram(self.df['x'].dropna(), edges)[0]
+            self.assertTrue(np.array_equal(du.bin_counts(values, n_bins), expected))
+
+    def test_groups(self):
+
+        colors = du.color_palette('YlGnBu', 2)
+        counts = du.histogram_counts(self.df, 'x', 'h', colors, xaxis={'title': 'x'})
+        self.assertTrue([group['name'] for group in counts['groups']] == ['u', 'v'])
+        self.assertTrue(counts['groups'][1]['marker'] == {'color': colors[1]})
+        self.assertTrue(counts['layout']['template'] == du.theme.template())
+        self.assertTrue(counts['layout']['xaxis'] == {'title': {'text': 'x'}})
+
+        values = [du.decode_array(group['counts']) for group in counts['groups']]
+        self.assertTrue(du.bin_counts(values[0], 1)[0] == (self.df['x'].notna() & (self.df['h'] == 'u')).sum())
+
+    def test_categories(self):
+
+        counts = du.histogram_counts(self.df, 'c')
+        self.assertTrue(counts['categories'] == ['a', 'b', 'c'] and 'low' not in counts)
+        self.assertTrue(list(du.decode_array(counts['groups'][0]['counts'])) ==
+                        list(self.df['c'].value_counts().sort_index()))
@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import unittest
+import pandas as pd
+
+# loaded from its file: the eskapade_viz package needs eskapade to be imported
+_path = os.path.join(os.path.dirname(__file__), '..', 'archive', '_python', 'eskapade_viz', 'links',
+                     'residuals_cache.py')
+_spec = importlib.util.spec_from_file_location('residuals_cache', _path)
+residuals_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(residuals_cache)
+
+
+class TestResidualsCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.cache = residuals_cache.ResidualsCache(max_entries=3)
+        self.ab = pd.DataFrame({'normResid': [1., 2.]})
+        self.ac = pd.DataFrame({'normResid': [3., 4.]})
+        self.bc = pd.DataFrame({'normResid': [5., 6.]})
+        self.cache.put('a', 'b', 10, 10, self.ab)
+        self.cache.put('a', 'c', 10, 5, self.ac)
+        self.cache.put('b', 'c', 10, 5, self.bc)
+
+    def test_hit(self):
+
+        self.assertTrue(self.cache.get('a', 'b', 10, 10) is self.ab)
+        # in either order
+        self.assertTrue(self.cache.get('c', 'a', 5, 10) is self.ac)
+        # but only for the binning they were computed with
+        self.assertTrue(self.cache.get('a', 'b', 10, 11) is None)
+
+    def test_rebinning(self):
+
+        # residuals of another binning of a are kept next to the earlier ones
+        ab = pd.DataFrame({'normResid': [7., 8.]})
+        self.cache.get('a', 'b', 10, 10)
+        self.cache.put('a', 'b', 12, 10, ab)
+        self.assertTrue(self.cache.get('b', 'a', 10, 12) is ab)
+        self.assertTrue(self.cache.get('a', 'b', 10, 10) is self.ab)
+
+        # the least recently used pair was dropped
+        self.assertTrue(len(self.cache) == 3 and self.cache.get('a', 'c', 10, 5) is None)
@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestSelection(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.df = pd.DataFrame({'x': rng.normal(size=100),
+                                'y': rng.normal(size=100),
+                                'hue': rng.choice(['b', 'a', 'c'], 100)})
+
+    def test_trace_rows(self):
+
+        rows_per_trace, names = du.trace_rows(self.df, 'hue')
+        self.assertTrue(names == list(self.df['hue'].unique()))
+        for rows, name in zip(rows_per_trace, names):
+            self.assertTrue((rows == np.flatnonzero(self.df['hue'] == name)).all())
+
+    def test_trace_values(self):
+
+        df = self.df.copy()
+        df.loc[[3, 50], 'hue'] = None
+        positions = np.arange(0, 100, 3)
+        mask = np.zeros(100, dtype=bool)
+        mask[positions] = True
+        for sel in (None, mask, positions):
+            rows_per_trace, names = du.trace_rows(df, 'hue', sel)
+            # in blocks of 7 rows, so the traces are filled over several blocks
+            with mock.patch.object(du.selection, 'TRACE_BLOCK', 7):
+                values_per_trace, value_names = du.trace_values(df, ['x', 'y'], 'hue', sel)
+            self.assertTrue(value_names == names)
+            for rows, (x, y) in zip(rows_per_trace, values_per_trace):
+                self.assertTrue((x == df['x'].values[rows]).all() and (y == df['y'].values[rows]).all())
+
+    def test_selected_rows_scatter(self):
+
+        rows_per_trace, _ = du.trace_rows(self.df, 'hue')
+        selected_data = {'points': [{'curveNumber': 1, 'pointNumber': 0},
+                                    {'curveNumber': 0, 'pointNumber': 2}]}
+        rows = du.selected_rows(selected_data, rows_per_trace, len(self.df))
+        self.assertTrue(rows.tolist() == sorted([rows_per_trace[1][0], rows_per_trace[0][2]]))
+        self.assertIsNone(du.selected_rows(None, rows_per_trace, len(self.df)))
+
+    def test_return_selection(self):
+
+        hist = {'points': [{'curveNumber': 0, 'pointNumbers': [1, 2, 3, 4]}]}
+        scatter = {'points': [{'curveNumber': 0, 'pointNumber': i} for i in (3, 4, 5)]}
+        self.assertTrue(du.dash_utils._return_selection(hist, scatter, self.df).tolist() == [3, 4])
+        self.assertTrue(len(du.dash_utils._return_selection(None, None, self.df)) == 100)
+
+    def test_histogram_sel(self):
+
+        mask = (self.df['x'] > 0).values
+        hist = du.make_histogram(self.df, 'x', 10, color_filter='hue', sel=mask)
+        self.assertTrue(sum(len(trace['x']) for trace in hist['data']) == mask.sum())
+
+        scatter = du.make_scatter(self.df, 'x', 'y', sel=np.flatnonzero(mask))
+        self.assertTrue((scatter['data'][0]['x'] > 0).all())
+
+    def test_range_selection(self):
+
+        df = self.df.copy()
+        df.loc[[5, 6], 'x'] = np.nan
+        dataset = du.Dataset(df)
+
+        rows = np.sort(dataset.range_rows('x', -0.5, 0.5))
+        self.assertTrue(rows.tolist() == np.flatnonzero((df['x'] >= -0.5) & (df['x'] <= 0.5)).tolist())
+        self.assertTrue(len(dataset.range_rows('x')) == 98)
+
+        selected_data = {'range': {'x': [0.5, -0.5], 'y': [0, 1]}}
+        ranges = du.selected_ranges(selected_data, 'x', 'y')
+        self.assertTrue(ranges == {'x': (-0.5, 0.5), 'y': (0, 1)})
+        self.assertIsNone(du.selected_ranges({'points': []}, 'x'))
+
+        rows = du.range_selection(dataset, ranges)
+        expected = (df['x'].between(-0.5, 0.5) & df['y'].between(0, 1)).to_numpy()
+        self.assertTrue(rows.tolist() == np.flatnonzero(expected).tolist())
+        self.assertIsNone(du.range_selection(dataset, {}))
+
+        # the wide range is only checked for the rows of the narrow one
+        rows = du.range_selection(dataset, {'x': (0, 0.05), 'y': (None, 5)})
+        expected = (df['x'].between(0, 0.05) & (df['y'] <= 5)).to_numpy()
+        self.assertTrue(rows.tolist() == np.flatnonzero(expected).tolist())
+
+        # compact columns, see du.optimise_dtypes
+        compact = du.Dataset(df.astype({'x': 'float32', 'y': 'float32'}))
+        rows = du.range_selection(compact, {'x': (None, None), 'y': (-1, 1)})
+        expected = (df['x'].notna() & df['y'].astype('float32').between(-1, 1)).to_numpy()
+        self.assertTrue(rows.tolist() == np.flatnonzero(expected).tolist())
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+import dash_utils as du
+
+
+class TestTableQuery(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.df = pd.DataFrame({'a': rng.randint(0, 5, 100).astype(float),
+                                'b': rng.normal(size=100),
+                                'c': rng.choice(['x', 'y', 'zz'], 100)})
+        self.df.loc[::7, 'a'] = np.nan
+        self.dataset = du.Dataset(self.df)
+
+    def test_split_filter_part(self):
+
+        self.assertTrue(du.table_query.split_filter_part('{a} >= 2') == ('a', 'ge', 2.))
+        self.assertTrue(du.table_query.split_filter_part('{c} contains "z"') == ('c', 'contains', 'z'))
+        self.assertTrue(du.table_query.split_filter_part('{a} s= 3') == ('a', 'eq', 3.))
+
+    def test_filter_mask(self):
+
+        mask = du.filter_mask(self.df, '{a} > 2 && {c} contains z')
+        expected = (self.df['a'] > 2) & (self.df['c'] == 'zz')
+        self.assertTrue((mask == expected.values).all())
+        self.assertIsNone(du.filter_mask(self.df, ''))
+
+    def test_sort_order(self):
+
+        order = self.dataset.sort_order('a', ascending=False)
+        expected = self.df.sort_values('a', ascending=False, kind='stable', na_position='last').index
+        self.assertTrue((order == expected.values).all())
+
+    def test_multi_sort_page(self):
+
+        sort_by = [{'column_id': 'c', 'direction': 'desc'}, {'column_id': 'b', 'direction': 'asc'}]
+        records, page_count = du.table_page(self.dataset, 1, 10, sort_by, '{a} >= 1')
+
+        expected = self.df[self.df['a'] >= 1].sort_values(['c', 'b'], ascending=[False, True])
+        self.assertTrue(page_count == int(np.ceil(len(expected) / 10)))
+        self.assertTrue([r['b'] for r in records] == list(expected['b'].iloc[10:20]))
+
+    def test_make_table_page_size(self):
+
+        table = du.make_table(columns=list(self.df.columns), data=self.df, page_size=20)
+        self.assertTrue(len(table.data) == 20)
+        self.assertTrue(table.page_count == 5 and table.page_action == 'custom')
+
+    def test_dataset_store(self):
+
+        store = du.DatasetStore()
+        raw = self.df.to_json(orient='split')
+        self.assertIs(store.get(raw), store.get(raw))
+        self.assertIsNone(store.get(None))
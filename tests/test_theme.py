@@ -0,0 +1,28 @@
+import unittest
+import plotly.graph_objs as go
+import plotly.io as pio
+
+import dash_utils as du
+
+
+class TestTheme(unittest.TestCase):
+
+    def test_register_template(self):
+
+        du.register_template('test_theme', plot_bgcolor='#000000')
+        self.assertTrue(pio.templates['test_theme'].layout.plot_bgcolor == '#000000')
+        self.assertTrue(go.Layout(template='test_theme').template.layout.plot_bgcolor == '#000000')
+
+        figure = du.base_figure('a', name='test_theme')
+        self.assertTrue(figure['layout']['template'] == {'layout': {'plot_bgcolor': '#000000'}})
+        # the registered template can not be changed through a figure
+        figure['layout']['template']['layout']['plot_bgcolor'] = '#ffffff'
+        self.assertTrue(du.theme.template('test_theme')['layout']['plot_bgcolor'] == '#000000')
+        with self.assertRaises(KeyError):
+            du.theme.template('unknown')
+
+    def test_figure_grid(self):
+
+        graph = du.figure_grid(2)[0].children[0]
+        self.assertTrue(graph.figure['layout']['template'] == du.theme.template())
+
@@ -87,6 +87,24 @@ class TestUtils(unittest.TestCase):
         colorscale = du.matplotlib_to_plotly(cmap, 3)
         self.assertTrue(len(colorscale) == 3)
 
+    def test_matplotlib_to_plotly_cached(self):
+        colorscale = du.matplotlib_to_plotly('viridis', 4)
+        self.assertTrue(colorscale[0] == [0., 'rgb(68, 1, 84)'] and colorscale[-1][0] == 1.)
+        colorscale[0][1] = 'changed'
+        self.assertTrue(du.matplotlib_to_plotly('viridis', 4)[0][1] == 'rgb(68, 1, 84)')
+
+    def test_matplotlib_to_plotly_same_name(self):
+        from matplotlib.colors import LinearSegmentedColormap
+        red = LinearSegmentedColormap.from_list('from_list', ['black', 'red'])
+        blue = LinearSegmentedColormap.from_list('from_list', ['black', 'blue'])
+        self.assertTrue(du.matplotlib_to_plotly(red, 2)[1][1] == 'rgb(255, 0, 0)')
+        self.assertTrue(du.matplotlib_to_plotly(blue, 2)[1][1] == 'rgb(0, 0, 255)')
+
+    def test_color_palette(self):
+        palette = du.color_palette('viridis', 3)
+        self.assertTrue(len(palette) == 3)
+        self.assertIs(du.color_palette('viridis', 3), palette)
+
     def test_data_profile_tables(self):
 
         table = du.data_profile_tables({})